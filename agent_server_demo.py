@@ -1,6 +1,6 @@
 import logging
-import asyncio
 import os
+import sys
 from dotenv import load_dotenv
 
 _ = load_dotenv(override=True)
@@ -9,13 +9,26 @@ logger = logging.getLogger("voice-agent")
 logger.setLevel(logging.INFO)
 
 from livekit import agents
-from livekit.agents import Agent, AgentSession
-from livekit.plugins import openai, silero, minimax
+from livekit.agents import Agent, AgentSession, JobExecutorType
+from livekit.plugins import silero
 
-from providers.qwen_asr_stt import STT as QwenSTT
-from providers.local_indexTTS import IndexTTS
-from providers.local_indextts_chaos import TTS as LocalTTS
-from providers.kokoro_tts import TTS as KokoroTTS
+from providers import worker_state
+from providers.keep_warm import DEFAULT_INTERVAL as DEFAULT_KEEP_WARM_INTERVAL
+from providers.keep_warm import KeepWarm
+from providers.registry import ProviderConfig
+from providers.session_lifetime import SessionLifetime
+from providers.worker_load import DEFAULT_MAX_SESSIONS, WorkerLoad, monitor_event_loop
+
+# 单个 worker 同时承载的会话上限，达到后拒绝新的 job
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS") or DEFAULT_MAX_SESSIONS)
+# 本地 TTS 后端的保温间隔（秒），设为 0 关闭
+KEEP_WARM_INTERVAL = float(os.getenv("KEEP_WARM_INTERVAL") or DEFAULT_KEEP_WARM_INTERVAL)
+
+# 按 STT_PROVIDER / LLM_PROVIDER / TTS_PROVIDER 选择后端（见 providers/registry.py），
+# 只在 prewarm 第一次创建实例时导入用到的模块。TTS_PROVIDER 可写多个，
+# 例如 "kokoro,indextts,minimax"，按健康度自动切换：某个服务卡住或报错时换下一个，
+# 不会让会话静音
+PROVIDERS = ProviderConfig.from_env(stt="qwen", llm="siliconflow", tts="kokoro")
 
 
 class Assistant(Agent):
@@ -30,6 +43,18 @@ class Assistant(Agent):
         )
 
 
+def prewarm(proc: agents.JobProcess):
+    """
+    进程预热：在 job 分配之前加载 VAD 模型并创建 STT/LLM/TTS，存入 proc.userdata。
+
+    worker 会提前启动空闲进程并执行预热，接起通话时只需创建会话级的对象。
+    """
+    proc.userdata["vad"] = silero.VAD.load()
+    proc.userdata["stt"] = PROVIDERS.create_stt()
+    proc.userdata["llm"] = PROVIDERS.create_llm()
+    proc.userdata["tts"] = PROVIDERS.create_tts()
+
+
 async def entrypoint(ctx: agents.JobContext):
     await ctx.connect()  # 首先连接到房间
 
@@ -38,44 +63,26 @@ async def entrypoint(ctx: agents.JobContext):
     # 创建助手实例
     agent = Assistant()
 
-    stt = QwenSTT(
-        model="qwen3-asr-flash",
-        language="zh",
-        enable_itn=True,  # 启用逆文本规范化
-        api_key=os.environ.get("DASHSCOPE_API_KEY"),
-    )
-
-    llm = openai.LLM.with_deepseek(model="Qwen/Qwen3-8B", base_url="https://api.siliconflow.cn/v1", api_key=os.environ.get("SILICONFLOW_API_KEY"))
-    # tts = minimax.TTS(
-    #     base_url="https://api.minimaxi.com",
-    #     model="speech-2.6-hd",
-    #     voice="Chinese (Mandarin)_Gentleman",
-    # )
-
-    # 使用本地 TTS 服务
-    # tts = IndexTTS(
-    #     base_url="http://localhost:6006",  # 你的本地 TTS 服务地址
-    #     voice="jay_klee",  # 替换为你的 speaker.json 中的角色名
-    #     response_format="wav",
-    #     timeout=30.0,
-    # )
-
-    tts = KokoroTTS()
-
-    # tts = LocalTTS(
-    #     speaker="忧伤女声.pt",  # 选择你的说话人模型
-    #     volume=1.9,
-    #     base_url="http://198.18.0.1:9880",  # 本地 TTS 服务地址
-    # )
-
-    # 创建会话
+    # 创建会话：VAD 与 provider 来自预热阶段，这里只创建会话级状态
+    userdata = ctx.proc.userdata
     session = AgentSession(
-        stt=stt,
-        llm=llm,
-        tts=tts,
-        vad=silero.VAD.load(),
+        stt=userdata["stt"],
+        llm=userdata["llm"],
+        tts=userdata["tts"],
+        vad=userdata["vad"],
     )
 
+    # 会话关闭或房间断开即结束 job。清理注册为 shutdown 回调，由框架等待完成：
+    # 每个 job 进程（线程）只运行一个 job，预热的 provider 随 job 关闭并释放连接池
+    lifetime = SessionLifetime(session, ctx.room)
+    for key in ("stt", "llm", "tts"):
+        lifetime.add_cleanup(key, userdata[key].aclose)
+    ctx.add_shutdown_callback(lifetime.aclose)
+
+    # 事件循环延迟计入 worker 负载
+    lifetime.create_task(monitor_event_loop(), name="loop_lag_monitor")
+
+    reason = "entrypoint exited"
     try:
         await session.start(
             room=ctx.room,
@@ -86,15 +93,39 @@ async def entrypoint(ctx: agents.JobContext):
             instructions="向用户打招呼，简短介绍自己，然后询问用户的问题。"
         )
 
-        # 保持会话运行
-        while True:
-            await asyncio.sleep(1)
+        # 等待会话结束
+        reason = await lifetime.wait()
 
     except Exception as e:
         logger.error(f"会话运行出错: {e}")
+        reason = "session error"
     finally:
-        logger.info("语音会话结束")
+        # 会话先于房间结束时由这里结束 job；房间已断开时框架已在关闭，重复调用无影响
+        ctx.shutdown(reason=reason)
+        logger.info(f"语音会话结束: {reason}")
 
 
 if __name__ == "__main__":
-    agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint, port=8083))
+    # 综合会话数、CPU、事件循环延迟和进行中的 STT/TTS 请求上报负载
+    worker_load = WorkerLoad(max_sessions=MAX_SESSIONS)
+    # 每个通话一个 job 进程：延迟分布等状态交给主进程保存，后续通话从中载入
+    worker_state.listen()
+    worker_options = agents.WorkerOptions(
+        entrypoint_fnc=entrypoint,
+        request_fnc=worker_load.request_fnc,
+        prewarm_fnc=prewarm,
+        load_fnc=worker_load,
+        port=8083,
+    )
+    # console 模式与 Windows 下 job 在本进程的其他线程中运行，livekit 插件须先在主线程导入
+    if (
+        worker_options.job_executor_type == JobExecutorType.THREAD
+        or sys.argv[1:2] == ["console"]
+    ):
+        PROVIDERS.preload()
+    server = agents.AgentServer.from_server_options(worker_options)
+    # 通话间隙让本地 TTS 服务端保留说话人模型：每个 worker 一个，在主进程中运行，只用
+    # 服务地址与说话人，不创建 TTS；job 的连接由各自进程建立。长时间没有请求时自动暂停
+    if KEEP_WARM_INTERVAL > 0:
+        KeepWarm(interval=KEEP_WARM_INTERVAL).start_with_worker(server, PROVIDERS.warm_targets())
+    agents.cli.run_app(server)
@@ -1,10 +1,14 @@
 import logging
 import asyncio
+import dataclasses
 import os
+import sys
 import json
 import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import Callable, Literal, Optional
 from dotenv import load_dotenv
 import websockets
 
@@ -14,30 +18,265 @@ logger = logging.getLogger("voice-agent")
 logger.setLevel(logging.INFO)
 
 from livekit import agents
-from livekit.agents import Agent, AgentSession
-from livekit.plugins import (
-    openai,
-    minimax,
-    silero,
-)
-
-from adapter.qwen_asr_stt import STT as QwenSTT
+from livekit.agents import Agent, AgentSession, JobExecutorType, MetricsCollectedEvent
+from livekit.plugins import silero
+from prometheus_client import REGISTRY
+
+from providers import worker_state
+from providers.histogram import HistogramStore
+from providers.keep_warm import DEFAULT_INTERVAL as DEFAULT_KEEP_WARM_INTERVAL
+from providers.keep_warm import START_LATENCY, KeepWarm
+from providers.qwen_asr_stt import UploadSTTMetrics
+from providers.registry import ProviderConfig
+from providers.session_lifetime import SessionLifetime
+from providers.worker_load import DEFAULT_MAX_SESSIONS, WorkerLoad, monitor_event_loop
 from livekit.agents.metrics import LLMMetrics, STTMetrics, TTSMetrics, EOUMetrics
 
+# 设置后在该端口的 /metrics 暴露 Prometheus 指标（p50/p95/p99 延迟等）
+METRICS_PORT = os.getenv("METRICS_PORT")
+# 设为 0 关闭每条指标的控制台输出
+PRINT_METRICS = os.getenv("PRINT_METRICS", "1") != "0"
+# 单个 worker 同时承载的会话上限，达到后拒绝新的 job
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS") or DEFAULT_MAX_SESSIONS)
+# 本地 TTS 后端的保温间隔（秒），设为 0 关闭
+KEEP_WARM_INTERVAL = float(os.getenv("KEEP_WARM_INTERVAL") or DEFAULT_KEEP_WARM_INTERVAL)
+# 按 STT_PROVIDER / LLM_PROVIDER / TTS_PROVIDER 选择后端，只在 prewarm 中导入用到的模块
+PROVIDERS = ProviderConfig.from_env(stt="qwen", llm="deepseek", tts="minimax")
+
+# 延迟直方图，按 worker 和 provider 聚合。job 进程中的样本经本机 UDP 转发到
+# worker 主进程（见 HistogramStore.listen），由主进程的 Prometheus 端点统一输出
+LATENCY_HISTOGRAMS = HistogramStore(report_env="VOICE_AGENT_LATENCY_HISTOGRAMS_ADDR")
+for _name, _doc in (
+    ("voice_agent_llm_ttft_seconds", "LLM time to first token"),
+    ("voice_agent_tts_ttfb_seconds", "TTS time to first audio byte"),
+    ("voice_agent_stt_duration_seconds", "STT recognition duration"),
+    ("voice_agent_eou_delay_seconds", "End of speech to end of turn decision"),
+    ("voice_agent_stt_real_time_factor", "STT duration / audio duration"),
+    ("voice_agent_tts_real_time_factor", "TTS duration / audio duration"),
+    ("voice_agent_turn_latency_seconds", "End of user speech to first agent audio"),
+):
+    LATENCY_HISTOGRAMS.describe_metric(_name, _doc)
+REGISTRY.register(LATENCY_HISTOGRAMS)
+# 本地 TTS 冷/热启动的首包延迟（voice_agent_tts_start_ttfb_seconds）
+REGISTRY.register(START_LATENCY)
+
+
+def _provider_label(metrics) -> str:
+    if metrics.metadata and metrics.metadata.model_provider:
+        return metrics.metadata.model_provider
+    return getattr(metrics, "label", "") or "unknown"
+
+
+def record_histograms(metrics, worker: str):
+    """把一条指标写入延迟直方图"""
+    labels = {"worker": worker, "provider": _provider_label(metrics)}
+    observe = LATENCY_HISTOGRAMS.observe
+    if isinstance(metrics, LLMMetrics):
+        observe("voice_agent_llm_ttft_seconds", metrics.ttft, **labels)
+    elif isinstance(metrics, TTSMetrics):
+        observe("voice_agent_tts_ttfb_seconds", metrics.ttfb, **labels)
+        if metrics.audio_duration > 0:
+            rtf = metrics.duration / metrics.audio_duration
+            observe("voice_agent_tts_real_time_factor", rtf, **labels)
+    elif isinstance(metrics, STTMetrics):
+        observe("voice_agent_stt_duration_seconds", metrics.duration, **labels)
+        if metrics.audio_duration > 0:
+            rtf = metrics.duration / metrics.audio_duration
+            observe("voice_agent_stt_real_time_factor", rtf, **labels)
+    elif isinstance(metrics, EOUMetrics):
+        observe("voice_agent_eou_delay_seconds", metrics.end_of_utterance_delay, **labels)
+
+
+@dataclass
+class TurnTrace:
+    """
+    单轮对话的端到端延迟：从用户停止说话到智能体第一帧音频。
+
+    关键路径依次为：转写（transcription）→ 轮次判定（endpointing）→
+    on_user_turn_completed 回调 → LLM 首 token → 等待首句文本（llm_to_tts）→ TTS 首包。
+    开场白等没有用户输入的轮次，EOU 相关字段为 None。
+    """
+
+    speech_id: str
+    transcription_delay: Optional[float] = None
+    end_of_utterance_delay: Optional[float] = None
+    on_user_turn_completed_delay: Optional[float] = None
+    stt_duration: Optional[float] = None
+    llm_ttft: Optional[float] = None
+    llm_to_tts: Optional[float] = None
+    tts_ttfb: Optional[float] = None
+    end_to_end: Optional[float] = None  # 按各指标时间戳计算
+
+    def breakdown(self) -> dict[str, float]:
+        stages = {
+            "transcription": self.transcription_delay,
+            "endpointing": (
+                self.end_of_utterance_delay - self.transcription_delay
+                if self.end_of_utterance_delay is not None
+                and self.transcription_delay is not None
+                else None
+            ),
+            "on_user_turn_completed": self.on_user_turn_completed_delay,
+            "llm_ttft": self.llm_ttft,
+            "llm_to_tts": self.llm_to_tts,
+            "tts_ttfb": self.tts_ttfb,
+        }
+        return {k: max(v, 0.0) for k, v in stages.items() if v is not None}
+
+    @property
+    def critical_stage(self) -> Optional[str]:
+        stages = self.breakdown()
+        return max(stages, key=stages.get) if stages else None
+
+    def to_dict(self) -> dict:
+        data = dataclasses.asdict(self)
+        data["breakdown"] = self.breakdown()
+        data["critical_stage"] = self.critical_stage
+        return data
+
+
+@dataclass
+class _PendingTurn:
+    eou: Optional[EOUMetrics] = None
+    stt: Optional[STTMetrics] = None
+    llm: Optional[LLMMetrics] = None
+    tts: Optional[TTSMetrics] = None
+
+
+class TurnTracer:
+    """
+    按 speech_id 关联 EOU、LLM、TTS 指标，生成每轮的 TurnTrace。
+
+    STT 指标不带 speech_id，最终转写总是先于轮次判定完成，
+    因此归入其后第一条 EOU 指标所在的轮次。同一轮收到 LLM 和首个 TTS 指标后立即输出。
+    """
+
+    def __init__(self, on_trace: Callable[[TurnTrace], None], max_pending: int = 16):
+        self._on_trace = on_trace
+        self._max_pending = max_pending
+        self._turns: OrderedDict[str, _PendingTurn] = OrderedDict()
+        self._last_stt: Optional[STTMetrics] = None
+
+    def on_metrics(self, metrics) -> None:
+        if isinstance(metrics, STTMetrics):
+            self._last_stt = metrics
+            return
+        if not isinstance(metrics, (EOUMetrics, LLMMetrics, TTSMetrics)):
+            return
+        if not metrics.speech_id:
+            return
+
+        turn = self._turns.get(metrics.speech_id)
+        if turn is None:
+            turn = self._turns[metrics.speech_id] = _PendingTurn()
+            while len(self._turns) > self._max_pending:
+                # 被打断的轮次可能永远收不到 TTS 指标
+                self._emit(*self._turns.popitem(last=False))
+
+        if isinstance(metrics, EOUMetrics):
+            turn.eou = metrics
+            turn.stt, self._last_stt = self._last_stt, None
+        elif isinstance(metrics, LLMMetrics):
+            turn.llm = turn.llm or metrics
+        elif isinstance(metrics, TTSMetrics):
+            turn.tts = turn.tts or metrics
+
+        if turn.llm and turn.tts:
+            self._emit(metrics.speech_id, self._turns.pop(metrics.speech_id))
+
+    def flush(self) -> None:
+        """输出尚未完成的轮次（会话结束时调用）"""
+        while self._turns:
+            self._emit(*self._turns.popitem(last=False))
+
+    def _emit(self, speech_id: str, turn: _PendingTurn) -> None:
+        trace = TurnTrace(speech_id=speech_id)
+        end_of_speech = first_token = first_audio = None
+
+        if turn.eou:
+            trace.transcription_delay = turn.eou.transcription_delay
+            trace.end_of_utterance_delay = turn.eou.end_of_utterance_delay
+            trace.on_user_turn_completed_delay = turn.eou.on_user_turn_completed_delay
+            # EOU 指标在 on_user_turn_completed 返回、回复开始调度后发出
+            end_of_speech = (
+                turn.eou.timestamp
+                - turn.eou.on_user_turn_completed_delay
+                - turn.eou.end_of_utterance_delay
+            )
+        if turn.stt:
+            trace.stt_duration = turn.stt.duration
+        if turn.llm:
+            trace.llm_ttft = turn.llm.ttft
+            first_token = turn.llm.timestamp - turn.llm.duration + turn.llm.ttft
+        if turn.tts:
+            trace.tts_ttfb = turn.tts.ttfb
+            tts_start = turn.tts.timestamp - turn.tts.duration
+            first_audio = tts_start + turn.tts.ttfb
+            if first_token is not None:
+                trace.llm_to_tts = tts_start - first_token
+        if end_of_speech is not None and first_audio is not None:
+            trace.end_to_end = first_audio - end_of_speech
+
+        self._on_trace(trace)
+
+
+@dataclass
+class MetricsPipelineStats:
+    """指标管道计数"""
+
+    queued: int = 0  # 累计入队的事件数
+    sent: int = 0  # 累计发送成功的事件数
+    dropped: int = 0  # 队列满或关闭时未发出而丢弃的事件数
+    batches: int = 0  # 发送的 websocket 帧数
+    send_failures: int = 0
+    pending: int = 0  # 当前队列中等待发送的事件数
+
 
 class MetricsCollector:
-    """指标收集器，负责收集并发送性能指标到监控服务"""
+    """
+    指标收集器，负责收集并发送性能指标到监控服务。
+
+    指标回调只把事件放入有界队列（不阻塞、不创建任务），后台 flusher 按
+    batch_size 条或 flush_interval 秒合批，每批作为一个 JSON 数组通过一帧
+    websocket 发送。监控服务不可用时事件留在队列中等待重连，队列满时按
+    drop_policy 丢弃最旧（drop_oldest）或最新（drop_newest）的事件。
+    """
 
     def __init__(
-        self, session_id: str, monitor_server_url: str = "ws://localhost:8001/ws"
+        self,
+        session_id: str,
+        monitor_server_url: str = "ws://localhost:8001/ws",
+        *,
+        max_queue_size: int = 1000,
+        batch_size: int = 50,
+        flush_interval: float = 0.5,
+        drop_policy: Literal["drop_oldest", "drop_newest"] = "drop_oldest",
+        reconnect_interval: float = 2.0,
     ):
         self.session_id = session_id
         self.monitor_server_url = monitor_server_url
         self.websocket: Optional[websockets.WebSocketServerProtocol] = None
         self.is_connected = False
 
+        self._max_queue_size = max_queue_size
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._drop_policy = drop_policy
+        self._reconnect_interval = reconnect_interval
+
+        self._queue: deque[dict] = deque()
+        self._has_data = asyncio.Event()
+        self._batch_ready = asyncio.Event()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._stats = MetricsPipelineStats()
+
+    @property
+    def stats(self) -> MetricsPipelineStats:
+        self._stats.pending = len(self._queue)
+        return dataclasses.replace(self._stats)
+
     async def connect(self):
-        """连接到监控服务"""
+        """连接到监控服务并启动后台 flusher"""
         try:
             self.websocket = await websockets.connect(self.monitor_server_url)
             self.is_connected = True
@@ -46,35 +285,108 @@ class MetricsCollector:
             logger.error(f"连接监控服务失败: {e}")
             self.is_connected = False
 
-    async def disconnect(self):
-        """断开连接"""
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def disconnect(self, timeout: float = 2.0):
+        """尽量发出队列中剩余的指标，然后断开连接"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+
+        try:
+            async with asyncio.timeout(timeout):
+                while self._queue and self.is_connected:
+                    await self._flush()
+        except TimeoutError:
+            pass
+
+        if self._queue:
+            self._stats.dropped += len(self._queue)
+            self._queue.clear()
+
         if self.websocket and self.is_connected:
             await self.websocket.close()
             self.is_connected = False
             logger.info("已断开监控服务连接")
 
-    async def send_metric(self, metric_type: str, data: dict):
-        """发送指标数据"""
-        if not self.is_connected or not self.websocket:
-            # 尝试重新连接
-            await self.connect()
-            if not self.is_connected:
-                logger.warning("无法连接到监控服务，跳过指标发送")
-                return
+        stats = self.stats
+        logger.info(
+            f"指标管道统计: 入队 {stats.queued}，发送 {stats.sent}，"
+            f"丢弃 {stats.dropped}，批次 {stats.batches}"
+        )
 
-        try:
-            metric_data = {
+    def send_metric(self, metric_type: str, data: dict):
+        """将指标放入发送队列，可在同步回调中直接调用"""
+        self._queue.append(
+            {
                 "timestamp": datetime.now().isoformat(),
                 "metric_type": metric_type,
                 "session_id": self.session_id,
                 "data": data,
             }
-            await self.websocket.send(json.dumps(metric_data))
+        )
+        self._stats.queued += 1
+        self._trim()
+        self._has_data.set()
+        if len(self._queue) >= self._batch_size:
+            self._batch_ready.set()
+
+    def _trim(self):
+        while len(self._queue) > self._max_queue_size:
+            if self._drop_policy == "drop_newest":
+                self._queue.pop()
+            else:
+                self._queue.popleft()
+            self._stats.dropped += 1
+
+    async def _flush_loop(self):
+        while True:
+            await self._has_data.wait()
+            try:
+                # 攒够一批或等到 flush_interval 后发送
+                await asyncio.wait_for(self._batch_ready.wait(), self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+
+            if not self.is_connected:
+                await self.connect()
+                if not self.is_connected:
+                    await asyncio.sleep(self._reconnect_interval)
+                    continue
+
+            await self._flush()
+
+    async def _flush(self):
+        n = min(self._batch_size, len(self._queue))
+        batch = [self._queue.popleft() for _ in range(n)]
+        if not self._queue:
+            self._has_data.clear()
+        if len(self._queue) < self._batch_size:
+            self._batch_ready.clear()
+        if not batch:
+            return
+
+        try:
+            await self.websocket.send(json.dumps(batch))
         except Exception as e:
             logger.error(f"发送指标数据失败: {e}")
             self.is_connected = False
+            self._stats.send_failures += 1
+            # 放回队首，等待重连后重发
+            self._queue.extendleft(reversed(batch))
+            self._trim()
+            self._has_data.set()
+            return
 
-    async def send_llm_metrics(self, metrics: LLMMetrics):
+        self._stats.sent += len(batch)
+        self._stats.batches += 1
+
+    def send_llm_metrics(self, metrics: LLMMetrics):
         """发送LLM指标"""
         data = {
             "prompt_tokens": metrics.prompt_tokens,
@@ -82,9 +394,9 @@ class MetricsCollector:
             "tokens_per_second": metrics.tokens_per_second,
             "ttft": metrics.ttft,
         }
-        await self.send_metric("llm", data)
+        self.send_metric("llm", data)
 
-    async def send_stt_metrics(self, metrics: STTMetrics):
+    def send_stt_metrics(self, metrics: STTMetrics):
         """发送STT指标"""
         data = {
             "duration": metrics.duration,
@@ -96,17 +408,28 @@ class MetricsCollector:
                 else 0
             ),
         }
-        await self.send_metric("stt", data)
-
-    async def send_eou_metrics(self, metrics: EOUMetrics):
+        # Qwen3-ASR 非流式识别会附带上传编码信息
+        if isinstance(metrics, UploadSTTMetrics):
+            data["upload_codec"] = metrics.upload_codec
+            data["upload_bytes"] = metrics.upload_bytes
+            data["bytes_saved"] = metrics.bytes_saved
+            data["trimmed_audio_duration"] = metrics.trimmed_audio_duration
+            data["hedged"] = metrics.hedged
+        self.send_metric("stt", data)
+
+    def send_eou_metrics(self, metrics: EOUMetrics):
         """发送EOU指标"""
         data = {
             "end_of_utterance_delay": metrics.end_of_utterance_delay,
             "transcription_delay": metrics.transcription_delay,
         }
-        await self.send_metric("eou", data)
+        self.send_metric("eou", data)
+
+    def send_turn_trace(self, trace: TurnTrace):
+        """发送单轮端到端延迟"""
+        self.send_metric("turn", trace.to_dict())
 
-    async def send_tts_metrics(self, metrics: TTSMetrics):
+    def send_tts_metrics(self, metrics: TTSMetrics):
         """发送TTS指标"""
         data = {
             "ttfb": metrics.ttfb,
@@ -119,7 +442,7 @@ class MetricsCollector:
                 else 0
             ),
         }
-        await self.send_metric("tts", data)
+        self.send_metric("tts", data)
 
 
 class MetricsAssistant(Agent):
@@ -156,6 +479,20 @@ class Assistant(Agent):
         )
 
 
+def prewarm(proc: agents.JobProcess):
+    """
+    进程预热：在 job 分配之前加载 VAD 模型并创建 STT/LLM/TTS，存入 proc.userdata。
+
+    worker 会提前启动空闲进程并执行预热，接起通话时只需创建会话级的对象
+    （助手、指标收集器、轮次追踪）。
+    """
+    proc.userdata["vad"] = silero.VAD.load()
+    # Qwen3-ASR 长语音按上行带宽压缩为 FLAC/Opus 上传
+    proc.userdata["stt"] = PROVIDERS.create_stt(qwen={"upload_codec": "auto"})
+    proc.userdata["llm"] = PROVIDERS.create_llm()
+    proc.userdata["tts"] = PROVIDERS.create_tts()
+
+
 async def entrypoint(ctx: agents.JobContext):
     await ctx.connect()  # 首先连接到房间
 
@@ -167,24 +504,12 @@ async def entrypoint(ctx: agents.JobContext):
     agent = MetricsAssistant(session_id)
     await agent.start_session()
 
-    # 获取各个组件的引用用于指标收集
-    stt = QwenSTT(
-        model="qwen3-asr-flash",
-        language="zh",
-        enable_itn=True,  # 启用逆文本规范化
-        api_key=os.environ.get("DASHSCOPE_API_KEY"),
-    )
-
-    llm = openai.LLM.with_deepseek(model="deepseek-chat")
-    tts = minimax.TTS(
-        base_url="https://api.minimaxi.com",
-        model="speech-2.6-hd",
-        voice="Chinese (Mandarin)_Gentleman",
-    )
-
     # 设置指标收集回调
     def llm_metrics_wrapper(metrics: LLMMetrics):
-        asyncio.create_task(agent.metrics_collector.send_llm_metrics(metrics))
+        agent.metrics_collector.send_llm_metrics(metrics)
+        record_histograms(metrics, ctx.worker_id)
+        if not PRINT_METRICS:
+            return
         # 同时打印到控制台用于调试
         print(f"\n--- 大模型(LLM)指标 [{session_id[:8]}...] ---")
         print(f"提示词Tokens数量: {metrics.prompt_tokens}")
@@ -194,7 +519,10 @@ async def entrypoint(ctx: agents.JobContext):
         print("-----------------------\n")
 
     def stt_metrics_wrapper(metrics: STTMetrics):
-        asyncio.create_task(agent.metrics_collector.send_stt_metrics(metrics))
+        agent.metrics_collector.send_stt_metrics(metrics)
+        record_histograms(metrics, ctx.worker_id)
+        if not PRINT_METRICS:
+            return
         print(f"\n--- 语音转文本(STT)指标 [{session_id[:8]}...] ---")
         print(f"推理耗时: {metrics.duration:.4f}秒")
         print(f"音频时长: {metrics.audio_duration:.4f}秒")
@@ -202,17 +530,29 @@ async def entrypoint(ctx: agents.JobContext):
             f"实时因子: {metrics.duration / metrics.audio_duration if metrics.audio_duration > 0 else 0:.4f}"
         )
         print(f"是否流式处理: {'是' if metrics.streamed else '否'}")
+        if isinstance(metrics, UploadSTTMetrics):
+            print(f"裁剪静音后时长: {metrics.trimmed_audio_duration:.4f}秒")
+            print(
+                f"上传编码: {metrics.upload_codec}，上传 {metrics.upload_bytes} 字节，"
+                f"节省 {metrics.bytes_saved} 字节"
+            )
         print("--------------------------\n")
 
     def eou_metrics_wrapper(metrics: EOUMetrics):
-        asyncio.create_task(agent.metrics_collector.send_eou_metrics(metrics))
+        agent.metrics_collector.send_eou_metrics(metrics)
+        record_histograms(metrics, ctx.worker_id)
+        if not PRINT_METRICS:
+            return
         print(f"\n--- 语句结束(EOU)指标 [{session_id[:8]}...] ---")
         print(f"语句结束延迟: {metrics.end_of_utterance_delay:.4f}秒")
         print(f"转录延迟: {metrics.transcription_delay:.4f}秒")
         print("---------------------------\n")
 
     def tts_metrics_wrapper(metrics: TTSMetrics):
-        asyncio.create_task(agent.metrics_collector.send_tts_metrics(metrics))
+        agent.metrics_collector.send_tts_metrics(metrics)
+        record_histograms(metrics, ctx.worker_id)
+        if not PRINT_METRICS:
+            return
         print(f"\n--- 文本转语音(TTS)指标 [{session_id[:8]}...] ---")
         print(f"首包延迟: {metrics.ttfb:.4f}秒")
         print(f"推理耗时: {metrics.duration:.4f}秒")
@@ -223,20 +563,69 @@ async def entrypoint(ctx: agents.JobContext):
         print(f"是否流式处理: {'是' if metrics.streamed else '否'}")
         print("--------------------------\n")
 
-    # 注册指标回调
-    llm.on("metrics_collected", llm_metrics_wrapper)
-    stt.on("metrics_collected", stt_metrics_wrapper)
-    stt.on("eou_metrics_collected", eou_metrics_wrapper)
-    tts.on("metrics_collected", tts_metrics_wrapper)
+    def on_turn_trace(trace: TurnTrace):
+        agent.metrics_collector.send_turn_trace(trace)
+        if trace.end_to_end is not None:
+            LATENCY_HISTOGRAMS.observe(
+                "voice_agent_turn_latency_seconds",
+                trace.end_to_end,
+                worker=ctx.worker_id,
+                provider="pipeline",
+            )
+        if not PRINT_METRICS:
+            return
+        print(f"\n--- 单轮端到端延迟 [{session_id[:8]}...] ---")
+        if trace.end_to_end is not None:
+            print(f"用户停止说话到首帧音频: {trace.end_to_end:.4f}秒")
+        for stage, seconds in trace.breakdown().items():
+            print(f"  {stage}: {seconds:.4f}秒")
+        print(f"关键阶段: {trace.critical_stage}")
+        print("--------------------------\n")
 
-    # 创建会话
+    turn_tracer = TurnTracer(on_turn_trace)
+
+    def on_metrics_collected(ev: MetricsCollectedEvent):
+        metrics = ev.metrics
+        turn_tracer.on_metrics(metrics)
+        if isinstance(metrics, LLMMetrics):
+            llm_metrics_wrapper(metrics)
+        elif isinstance(metrics, STTMetrics):
+            stt_metrics_wrapper(metrics)
+        elif isinstance(metrics, EOUMetrics):
+            eou_metrics_wrapper(metrics)
+        elif isinstance(metrics, TTSMetrics):
+            tts_metrics_wrapper(metrics)
+
+    # 创建会话：VAD 与 provider 来自预热阶段
+    userdata = ctx.proc.userdata
     session = AgentSession(
-        stt=stt,
-        llm=llm,
-        tts=tts,
-        vad=silero.VAD.load(),
+        stt=userdata["stt"],
+        llm=userdata["llm"],
+        tts=userdata["tts"],
+        vad=userdata["vad"],
     )
 
+    # 注册指标回调。EOU 指标只由 session 发出，LLM/TTS 指标经 session 转发时已带上 speech_id
+    session.on("metrics_collected", on_metrics_collected)
+
+    # 会话关闭或房间断开即结束 job。清理注册为 shutdown 回调，由框架等待完成，
+    # 顺序为：会话 → provider → 指标（会话关闭后才不会再产生新的指标）→ 后台任务。
+    # 每个 job 进程（线程）只运行一个 job，预热的 provider 随 job 关闭并释放连接池
+    lifetime = SessionLifetime(session, ctx.room)
+    for key in ("stt", "llm", "tts"):
+        lifetime.add_cleanup(key, userdata[key].aclose)
+
+    async def close_metrics():
+        turn_tracer.flush()
+        await agent.end_session()
+
+    lifetime.add_cleanup("metrics", close_metrics)
+    ctx.add_shutdown_callback(lifetime.aclose)
+
+    # 事件循环延迟计入 worker 负载
+    lifetime.create_task(monitor_event_loop(), name="loop_lag_monitor")
+
+    reason = "entrypoint exited"
     try:
         await session.start(
             room=ctx.room,
@@ -247,17 +636,43 @@ async def entrypoint(ctx: agents.JobContext):
             instructions="向用户打招呼，简短介绍自己，然后询问用户的问题。"
         )
 
-        # 保持会话运行
-        while True:
-            await asyncio.sleep(1)
+        # 等待会话结束
+        reason = await lifetime.wait()
 
     except Exception as e:
         logger.error(f"会话运行出错: {e}")
+        reason = "session error"
     finally:
-        # 清理资源
-        await agent.end_session()
-        logger.info(f"语音会话结束: {session_id}")
+        # 会话先于房间结束时由这里结束 job；房间已断开时框架已在关闭，重复调用无影响
+        ctx.shutdown(reason=reason)
+        logger.info(f"语音会话结束: {session_id} ({reason})")
 
 
 if __name__ == "__main__":
-    agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint))
+    # 综合会话数、CPU、事件循环延迟和进行中的 STT/TTS 请求上报负载
+    worker_load = WorkerLoad(max_sessions=MAX_SESSIONS)
+    # 每个通话一个 job 进程：延迟分布等状态交给主进程保存，后续通话从中载入
+    worker_state.listen()
+    worker_options = agents.WorkerOptions(
+        entrypoint_fnc=entrypoint,
+        request_fnc=worker_load.request_fnc,
+        prewarm_fnc=prewarm,
+        load_fnc=worker_load,
+    )
+    if METRICS_PORT:
+        # 在 job 进程启动前开始接收，job 进程继承转发地址
+        LATENCY_HISTOGRAMS.listen()
+        START_LATENCY.listen()
+        worker_options.prometheus_port = int(METRICS_PORT)
+    # console 模式与 Windows 下 job 在本进程的其他线程中运行，livekit 插件须先在主线程导入
+    if (
+        worker_options.job_executor_type == JobExecutorType.THREAD
+        or sys.argv[1:2] == ["console"]
+    ):
+        PROVIDERS.preload()
+    server = agents.AgentServer.from_server_options(worker_options)
+    # 通话间隙让本地 TTS 服务端保留说话人模型：每个 worker 一个，在主进程中运行，只用
+    # 服务地址与说话人，不创建 TTS；job 的连接由各自进程建立。长时间没有请求时自动暂停
+    if KEEP_WARM_INTERVAL > 0:
+        KeepWarm(interval=KEEP_WARM_INTERVAL).start_with_worker(server, PROVIDERS.warm_targets())
+    agents.cli.run_app(server)
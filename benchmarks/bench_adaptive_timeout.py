@@ -0,0 +1,117 @@
+"""
+自适应超时基准：替身 TTS 按 --stall-rate 注入卡死请求（返回响应头后不再输出音频），
+对比固定读超时与按首包延迟分位数自适应的读超时下，Kokoro 每句的首帧耗时
+（含超时后的自动重试）。
+
+每轮先发送 --warmup 句不卡死的请求积累延迟样本，再开启注入并统计。
+固定超时下卡死的请求要等满 --ceiling 秒才重试；自适应超时收紧到 p99 × headroom
+（不低于 floor）附近，卡死的请求很快被放弃并重试。
+
+用法:
+    python -m benchmarks.bench_adaptive_timeout --requests 100 --stall-rate 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+
+from benchmarks import fake_tts
+from providers import adaptive_timeout
+from providers.kokoro_tts import TTFB_REFERENCE_CHARS
+from providers.kokoro_tts import TTS as KokoroTTS
+
+
+async def _first_frame(tts_impl: KokoroTTS, text: str) -> float:
+    start = time.perf_counter()
+    async with tts_impl.synthesize(text) as stream:
+        async for _ in stream:
+            break
+    return time.perf_counter() - start
+
+
+async def _run(
+    base_url: str,
+    config: fake_tts.FakeTTSConfig,
+    *,
+    adaptive: bool,
+    warmup: int,
+    requests: int,
+    stall_rate: float,
+    ceiling: float,
+    seed: int,
+) -> tuple[list[float], KokoroTTS]:
+    tts_impl = KokoroTTS(base_url=base_url, timeout=ceiling)
+    if not adaptive:
+        # 样本数永远达不到 min_samples，超时固定为上限
+        tts_impl._ttfb = adaptive_timeout.LatencyTracker(
+            reference_size=TTFB_REFERENCE_CHARS, min_samples=sys.maxsize
+        )
+    rng = random.Random(seed)
+    for _ in range(warmup):
+        await _first_frame(tts_impl, "你好" * rng.randint(5, 40))
+
+    config.stall_rate = stall_rate
+    latencies = []
+    for _ in range(requests):
+        text = "你好" * rng.randint(5, 40)
+        latencies.append(await _first_frame(tts_impl, text))
+    return latencies, tts_impl
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--stall-rate", type=float, default=0.05)
+    parser.add_argument("--first-chunk-ms", type=float, default=150.0)
+    parser.add_argument("--ceiling", type=float, default=10.0, help="读超时上限（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(
+        f"{args.requests} 句，卡死比例 {args.stall_rate:.0%}，"
+        f"服务端首包延迟 {args.first_chunk_ms:.0f}ms，超时上限 {args.ceiling:.0f}s"
+    )
+    print(f"{'超时':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'总耗时s':>10}")
+    for adaptive in (False, True):
+        random.seed(args.seed)
+        config = fake_tts.FakeTTSConfig(first_chunk_ms=args.first_chunk_ms)
+        # 每轮使用新的替身服务（新端口），自适应超时从零开始积累样本
+        runner, base_url = await fake_tts.start(config)
+        latencies, tts_impl = await _run(
+            base_url,
+            config,
+            adaptive=adaptive,
+            warmup=args.warmup,
+            requests=args.requests,
+            stall_rate=args.stall_rate,
+            ceiling=args.ceiling,
+            seed=args.seed,
+        )
+        latencies.sort()
+        n = len(latencies)
+        print(
+            f"{'自适应' if adaptive else '固定':>8}"
+            f"{statistics.median(latencies) * 1000:>10.0f}"
+            f"{latencies[int(n * 0.95)] * 1000:>10.0f}"
+            f"{latencies[min(int(n * 0.99), n - 1)] * 1000:>10.0f}"
+            f"{latencies[-1] * 1000:>10.0f}"
+            f"{sum(latencies):>10.1f}"
+        )
+        if adaptive:
+            timeouts = ", ".join(
+                f"{chars} 字 {tts_impl._ttfb.timeout(chars, ceiling=args.ceiling) * 1000:.0f}ms"
+                for chars in (10, 40, 80)
+            )
+            print(f"当前读超时: {timeouts}")
+        await tts_impl.aclose()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,471 @@
+"""
+并发压测：启动本地替身服务（DashScope / Kokoro / IndexTTS），以 N 个并发 session
+驱动 providers/ 下的实现，输出吞吐、尾延迟、事件循环延迟和每个 session 的内存增量。
+
+替身服务运行在独立进程中，不占用被测事件循环。每个 session 像真实 job 一样
+各自创建 provider 实例，顺序执行 --turns 次请求。结果可用 --json 保存为回归基线，
+之后用 --baseline 对比。
+
+目标：
+    qwen-stt         Qwen3-ASR 非流式识别（multimodal-generation 接口）
+    qwen-stt-stream  Qwen3-ASR 实时识别，按实时速度推流，延迟为说话结束→最终文本
+    kokoro           Kokoro TTS（GET /?text=，float32 流式 WAV）
+    indextts         IndexTTS（POST /audio/speech）
+    indextts-chaos   IndexTTS-chaos（GET /?text=，int16 流式 WAV）
+    tts-failover     FailoverTTS 包装 Kokoro + IndexTTS，配合 --error-rate 观察切换后的错误率
+
+用法:
+    python -m benchmarks.bench_concurrency --target kokoro --sessions 1,10,50
+    python -m benchmarks.bench_concurrency --target all --sessions 20 --json baseline.json
+    python -m benchmarks.bench_concurrency --target all --sessions 20 --baseline baseline.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import dataclasses
+import importlib
+import json
+import multiprocessing
+import socket
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+
+import aiohttp
+import numpy as np
+import psutil
+from aiohttp import web
+
+from livekit import rtc
+from livekit.agents import APIConnectOptions, APIError, stt
+
+from benchmarks import fake_dashscope, fake_tts
+from providers.histogram import LogHistogram
+from providers.kokoro_tts import TTS as KokoroTTS
+from providers.local_indexTTS import IndexTTS
+from providers.local_indextts_chaos import TTS as IndexTTSChaos
+from providers.qwen_asr_stt import STT as QwenSTT
+from providers.tts_failover import FailoverTTS
+
+TARGETS = [
+    "qwen-stt",
+    "qwen-stt-stream",
+    "kokoro",
+    "indextts",
+    "indextts-chaos",
+    "tts-failover",
+]
+
+STT_SAMPLE_RATE = 16000
+FRAME_MS = 20
+LOOP_MONITOR_INTERVAL = 0.01
+
+
+# ---------------------------------------------------------------------------
+# 替身服务进程
+
+
+def _serve(module_name: str, config: object, port: int) -> None:
+    module = importlib.import_module(module_name)
+    web.run_app(module.create_app(config), host="127.0.0.1", port=port, print=None)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_for_port(port: int, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+async def _start_server(
+    module_name: str, config: object
+) -> tuple[multiprocessing.Process, str]:
+    port = _free_port()
+    proc = multiprocessing.get_context("spawn").Process(
+        target=_serve, args=(module_name, config, port), daemon=True
+    )
+    proc.start()
+    await _wait_for_port(port)
+    return proc, f"http://127.0.0.1:{port}"
+
+
+# ---------------------------------------------------------------------------
+# 测量
+
+
+class _LoopMonitor:
+    """周期性 sleep，记录实际唤醒时间相对预期的延迟，同时采样进程 RSS 峰值"""
+
+    def __init__(self) -> None:
+        self.lag = LogHistogram()
+        self.peak_rss = 0
+        self._process = psutil.Process()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self.peak_rss = self._process.memory_info().rss
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        ticks = 0
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(LOOP_MONITOR_INTERVAL)
+            self.lag.record(time.perf_counter() - start - LOOP_MONITOR_INTERVAL)
+            ticks += 1
+            if ticks % 10 == 0:
+                self.peak_rss = max(self.peak_rss, self._process.memory_info().rss)
+
+
+@dataclass
+class _Samples:
+    latency: LogHistogram = field(default_factory=LogHistogram)
+    ttfb: LogHistogram = field(default_factory=LogHistogram)
+    completed: int = 0
+    errors: int = 0
+
+
+@dataclass
+class RunResult:
+    target: str
+    sessions: int
+    requests: int
+    errors: int
+    wall_s: float
+    throughput_rps: float
+    latency_p50_ms: float
+    latency_p95_ms: float
+    latency_p99_ms: float
+    ttfb_p50_ms: float
+    ttfb_p99_ms: float
+    loop_lag_p50_ms: float
+    loop_lag_p99_ms: float
+    loop_lag_max_ms: float
+    rss_per_session_kb: float
+
+
+# ---------------------------------------------------------------------------
+# 单个 session
+
+
+def _stt_frames(speech_s: float, silence_s: float) -> list[rtc.AudioFrame]:
+    samples_per_frame = STT_SAMPLE_RATE * FRAME_MS // 1000
+    total = int((speech_s + silence_s) * 1000 / FRAME_MS)
+    voiced = int(speech_s * 1000 / FRAME_MS)
+    t = np.arange(voiced * samples_per_frame) / STT_SAMPLE_RATE
+    tone = (8000 * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+
+    frames = []
+    for i in range(total):
+        pcm = bytes(samples_per_frame * 2)
+        if i < voiced:
+            pcm = tone[i * samples_per_frame : (i + 1) * samples_per_frame].tobytes()
+        frames.append(rtc.AudioFrame(pcm, STT_SAMPLE_RATE, 1, samples_per_frame))
+    return frames
+
+
+async def _timed(samples: _Samples, fn: Callable[[], Awaitable[float | None]]) -> None:
+    start = time.perf_counter()
+    try:
+        first = await fn()
+    except APIError:
+        samples.errors += 1
+        return
+    samples.latency.record(time.perf_counter() - start)
+    if first is not None:
+        samples.ttfb.record(first - start)
+    samples.completed += 1
+
+
+async def _tts_session(
+    make_tts: Callable[[], object],
+    text: str,
+    turns: int,
+    conn_options: APIConnectOptions,
+    samples: _Samples,
+) -> None:
+    tts_impl = make_tts()
+
+    async def _synthesize() -> float | None:
+        first = None
+        async with tts_impl.synthesize(text, conn_options=conn_options) as stream:
+            async for _ in stream:
+                if first is None:
+                    first = time.perf_counter()
+        return first
+
+    try:
+        for _ in range(turns):
+            await _timed(samples, _synthesize)
+    finally:
+        await tts_impl.aclose()
+
+
+async def _stt_session(
+    base_url: str,
+    frames: list[rtc.AudioFrame],
+    voiced_frames: int,
+    turns: int,
+    conn_options: APIConnectOptions,
+    samples: _Samples,
+) -> None:
+    stt_impl = QwenSTT(api_key="fake", base_url=base_url)
+    speech = frames[:voiced_frames]
+
+    async def _recognize() -> None:
+        await stt_impl.recognize(speech, conn_options=conn_options)
+
+    try:
+        for _ in range(turns):
+            await _timed(samples, _recognize)
+    finally:
+        await stt_impl.aclose()
+
+
+async def _stt_stream_session(
+    base_url: str,
+    http_session: aiohttp.ClientSession,
+    frames: list[rtc.AudioFrame],
+    voiced_frames: int,
+    turns: int,
+    conn_options: APIConnectOptions,
+    samples: _Samples,
+) -> None:
+    stt_impl = QwenSTT(
+        api_key="fake", base_url=base_url, streaming=True, http_session=http_session
+    )
+
+    async def _one_turn() -> None:
+        stream = stt_impl.stream(conn_options=conn_options)
+        speech_end = final_at = 0.0
+
+        async def _push() -> None:
+            nonlocal speech_end
+            for i, frame in enumerate(frames):
+                stream.push_frame(frame)
+                if i == voiced_frames - 1:
+                    speech_end = time.perf_counter()
+                await asyncio.sleep(FRAME_MS / 1000)
+            stream.end_input()
+
+        push_task = asyncio.create_task(_push())
+        try:
+            async for ev in stream:
+                if ev.type == stt.SpeechEventType.FINAL_TRANSCRIPT and not final_at:
+                    final_at = time.perf_counter()
+            await push_task
+        except APIError:
+            samples.errors += 1
+            return
+        finally:
+            push_task.cancel()
+            await stream.aclose()
+
+        if final_at:
+            samples.latency.record(final_at - speech_end)
+            samples.completed += 1
+        else:
+            samples.errors += 1
+
+    try:
+        for _ in range(turns):
+            await _one_turn()
+    finally:
+        await stt_impl.aclose()
+
+
+# ---------------------------------------------------------------------------
+
+
+async def run_target(
+    target: str, sessions: int, args: argparse.Namespace, base_urls: dict[str, str]
+) -> RunResult:
+    conn_options = APIConnectOptions(
+        max_retry=args.max_retry, retry_interval=args.retry_interval, timeout=30.0
+    )
+    text = ("今天天气不错，我们一起出去走走吧。" * (args.chars // 16 + 1))[: args.chars]
+    frames = _stt_frames(args.speech_s, 1.0)
+    voiced_frames = int(args.speech_s * 1000 / FRAME_MS)
+    samples = _Samples()
+
+    def _session() -> Awaitable[None]:
+        if target == "qwen-stt":
+            return _stt_session(
+                base_urls["dashscope"], frames, voiced_frames, args.turns, conn_options, samples
+            )
+        if target == "qwen-stt-stream":
+            return _stt_stream_session(
+                base_urls["dashscope"],
+                http_session,
+                frames,
+                voiced_frames,
+                args.turns,
+                conn_options,
+                samples,
+            )
+        make_tts = {
+            "kokoro": lambda: KokoroTTS(base_url=base_urls["kokoro"]),
+            "indextts": lambda: IndexTTS(base_url=base_urls["indextts"]),
+            "indextts-chaos": lambda: IndexTTSChaos(base_url=base_urls["indextts-chaos"]),
+            "tts-failover": lambda: FailoverTTS(
+                [
+                    KokoroTTS(base_url=base_urls["kokoro"]),
+                    IndexTTS(base_url=base_urls["indextts"]),
+                ]
+            ),
+        }[target]
+        return _tts_session(make_tts, text, args.turns, conn_options, samples)
+
+    # 实时识别的 WebSocket 在 job 中使用 job 的 http_session，这里由所有 session 共用一个
+    http_session = aiohttp.ClientSession()
+    monitor = _LoopMonitor()
+    monitor.start()
+    baseline_rss = monitor.peak_rss
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(_session() for _ in range(sessions)))
+    finally:
+        wall_s = time.perf_counter() - start
+        await monitor.stop()
+        await http_session.close()
+
+    def _ms(hist: LogHistogram, q: float) -> float:
+        return round(hist.percentile(q) * 1000, 1)
+
+    return RunResult(
+        target=target,
+        sessions=sessions,
+        requests=samples.completed,
+        errors=samples.errors,
+        wall_s=round(wall_s, 3),
+        throughput_rps=round(samples.completed / wall_s, 2),
+        latency_p50_ms=_ms(samples.latency, 0.5),
+        latency_p95_ms=_ms(samples.latency, 0.95),
+        latency_p99_ms=_ms(samples.latency, 0.99),
+        ttfb_p50_ms=_ms(samples.ttfb, 0.5),
+        ttfb_p99_ms=_ms(samples.ttfb, 0.99),
+        loop_lag_p50_ms=_ms(monitor.lag, 0.5),
+        loop_lag_p99_ms=_ms(monitor.lag, 0.99),
+        loop_lag_max_ms=round(max(monitor.lag.max, 0.0) * 1000, 1),
+        rss_per_session_kb=round((monitor.peak_rss - baseline_rss) / sessions / 1024, 1),
+    )
+
+
+def _print_results(results: list[RunResult], baseline: dict[tuple[str, int], dict]) -> None:
+    header = (
+        f"{'target':<16}{'sess':>5}{'req':>6}{'err':>5}{'req/s':>9}"
+        f"{'p50':>8}{'p95':>8}{'p99':>8}{'ttfb50':>8}{'lag99':>7}{'lagmax':>8}{'KB/sess':>9}"
+    )
+    print(header)
+    for r in results:
+        print(
+            f"{r.target:<16}{r.sessions:>5}{r.requests:>6}{r.errors:>5}{r.throughput_rps:>9.1f}"
+            f"{r.latency_p50_ms:>8.0f}{r.latency_p95_ms:>8.0f}{r.latency_p99_ms:>8.0f}"
+            f"{r.ttfb_p50_ms:>8.0f}{r.loop_lag_p99_ms:>7.1f}{r.loop_lag_max_ms:>8.1f}"
+            f"{r.rss_per_session_kb:>9.0f}"
+        )
+        if old := baseline.get((r.target, r.sessions)):
+            deltas = []
+            for key in ("throughput_rps", "latency_p99_ms", "loop_lag_p99_ms", "rss_per_session_kb"):
+                if old.get(key):
+                    deltas.append(f"{key} {(getattr(r, key) / old[key] - 1) * 100:+.0f}%")
+            print(f"{'':<16}vs baseline: " + ", ".join(deltas))
+    print("延迟单位 ms；STT 无 ttfb；KB/sess 为 RSS 峰值增量 / session 数")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target", default="all", help=f"all 或逗号分隔：{','.join(TARGETS)}")
+    parser.add_argument("--sessions", default="1,10,50", help="逗号分隔的并发 session 数")
+    parser.add_argument("--turns", type=int, default=5, help="每个 session 的请求数")
+    parser.add_argument("--chars", type=int, default=30, help="TTS 每次合成的字数")
+    parser.add_argument("--speech-s", type=float, default=3.0, help="STT 每段语音时长")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="ASR 固定延迟")
+    parser.add_argument("--first-chunk-ms", type=float, default=150.0, help="TTS 首包延迟")
+    parser.add_argument("--chunk-ms", type=float, default=100.0, help="TTS 每个分片的音频时长")
+    parser.add_argument("--real-time-factor", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--disconnect-rate", type=float, default=0.0)
+    parser.add_argument("--max-retry", type=int, default=0)
+    parser.add_argument("--retry-interval", type=float, default=0.1)
+    parser.add_argument("--json", help="把结果写入该文件作为基线")
+    parser.add_argument("--baseline", help="与该基线文件对比")
+    args = parser.parse_args()
+
+    targets = TARGETS if args.target == "all" else args.target.split(",")
+    session_counts = [int(n) for n in args.sessions.split(",")]
+
+    asr_config = fake_dashscope.FakeASRConfig(
+        latency_ms=args.latency_ms, error_rate=args.error_rate
+    )
+    tts_kwargs = dict(
+        first_chunk_ms=args.first_chunk_ms,
+        chunk_ms=args.chunk_ms,
+        real_time_factor=args.real_time_factor,
+        error_rate=args.error_rate,
+        disconnect_rate=args.disconnect_rate,
+    )
+    servers = {
+        "dashscope": ("benchmarks.fake_dashscope", asr_config),
+        "kokoro": ("benchmarks.fake_tts", fake_tts.FakeTTSConfig(**tts_kwargs)),
+        "indextts": ("benchmarks.fake_tts", fake_tts.FakeTTSConfig(**tts_kwargs)),
+        "indextts-chaos": (
+            "benchmarks.fake_tts",
+            fake_tts.FakeTTSConfig(sample_format="int16", **tts_kwargs),
+        ),
+    }
+    needed = {"dashscope" if t.startswith("qwen") else t for t in targets}
+    if "tts-failover" in needed:
+        needed.remove("tts-failover")
+        needed |= {"kokoro", "indextts"}
+
+    procs = []
+    base_urls = {}
+    for name in needed:
+        proc, base_urls[name] = await _start_server(*servers[name])
+        procs.append(proc)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {(r["target"], r["sessions"]): r for r in json.load(f)}
+
+    results = []
+    try:
+        for target in targets:
+            for n in session_counts:
+                results.append(await run_target(target, n, args, base_urls))
+    finally:
+        for proc in procs:
+            proc.terminate()
+
+    _print_results(results, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([dataclasses.asdict(r) for r in results], f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
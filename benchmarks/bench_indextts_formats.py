@@ -0,0 +1,67 @@
+"""
+IndexTTS（OpenAI 兼容接口）各 response_format 的流式效果：对比首帧耗时、完整合成耗时
+与解码出的音频时长。
+
+改为流式读取前，首帧要等整个响应下载完，约等于完整合成耗时；流式读取后 wav / pcm
+应接近服务端首包延迟，mp3 / opus 多出解码器凑够首个音频帧所需的数据量。
+
+用法:
+    python -m benchmarks.bench_indextts_formats --chars 60 --runs 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks import fake_tts
+from providers.local_indexTTS import IndexTTS
+
+FORMATS = ("wav", "pcm", "mp3", "opus")
+
+
+async def _synthesize(tts_impl: IndexTTS, text: str) -> tuple[float, float, float]:
+    """返回 (首帧耗时, 完整耗时, 音频时长)"""
+    start = time.perf_counter()
+    first = None
+    audio_s = 0.0
+    async with tts_impl.synthesize(text) as stream:
+        async for audio in stream:
+            if first is None:
+                first = time.perf_counter() - start
+            audio_s += audio.frame.duration
+    return first or 0.0, time.perf_counter() - start, audio_s
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chars", type=int, default=60)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--first-chunk-ms", type=float, default=150.0)
+    args = parser.parse_args()
+
+    config = fake_tts.FakeTTSConfig(first_chunk_ms=args.first_chunk_ms)
+    runner, base_url = await fake_tts.start(config)
+    text = "你好" * (args.chars // 2)
+
+    print(
+        f"文本 {args.chars} 字，音频约 {args.chars * config.seconds_per_char:.1f}s，"
+        f"服务端首包延迟 {args.first_chunk_ms:.0f}ms"
+    )
+    print(f"{'格式':>6}{'首帧ms':>10}{'完整ms':>10}{'音频s':>8}")
+    for response_format in FORMATS:
+        tts_impl = IndexTTS(base_url=base_url, response_format=response_format)
+        results = [await _synthesize(tts_impl, text) for _ in range(args.runs)]
+        first, total, audio_s = (statistics.median(col) for col in zip(*results))
+        print(
+            f"{response_format:>6}{first * 1000:>10.0f}{total * 1000:>10.0f}{audio_s:>8.2f}"
+        )
+        await tts_impl.aclose()
+
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
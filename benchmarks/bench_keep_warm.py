@@ -0,0 +1,120 @@
+"""
+后台保温基准：模拟带停顿的对话，对比开启与关闭 KeepWarm 时停顿后首句的首包延迟。
+
+替身服务模拟服务端淘汰说话人模型：说话人超过 --speaker-ttl 秒未使用，
+下次请求需要额外 --speaker-load-ms 重新加载。对话按 --turns 轮进行，
+每 --lull-every 轮之后停顿 --lull 秒（大于 speaker_ttl），其余轮次间隔 --gap 秒。
+时间按比例缩短：保温间隔取 speaker_ttl 的一半。每次停顿后切换
+中文/英文，分别用到 Kokoro 的中文与英文说话人。
+
+对话结束后空闲 --pause-after 秒以上，检查保温是否按时暂停（暂停后不再发请求）。
+
+本地替身服务没有 TLS，连接重建的开销可以忽略，这里只反映说话人重新加载的开销。
+
+用法:
+    python -m benchmarks.bench_keep_warm --turns 12 --lull 4 --speaker-ttl 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks import fake_tts
+from providers.keep_warm import KeepWarm
+from providers.kokoro_tts import TTS as KokoroTTS
+
+# 每次停顿后换一种语言，分别用到 Kokoro 的 speaker_zh 和 speaker_en
+TEXTS = ("好的，我来帮你查一下。", "OK, let me check that for you.")
+
+
+async def _first_audio(tts_impl: KokoroTTS, text: str) -> float:
+    start = time.perf_counter()
+    async with tts_impl.synthesize(text) as stream:
+        ttfb = None
+        async for _ in stream:
+            if ttfb is None:
+                ttfb = time.perf_counter() - start
+    return ttfb or 0.0
+
+
+async def _run(args: argparse.Namespace, base_url: str, keep_warm: bool) -> dict:
+    tts_impl = KokoroTTS(base_url=base_url)
+    scheduler = KeepWarm(interval=args.speaker_ttl / 2, pause_after=args.pause_after)
+    scheduler.add_tts(tts_impl)
+    task = asyncio.create_task(scheduler.run()) if keep_warm else None
+
+    after_lull: list[float] = []
+    in_flow: list[float] = []
+    lull = False
+    for turn in range(args.turns):
+        ttfb = await _first_audio(tts_impl, TEXTS[turn // args.lull_every % len(TEXTS)])
+        (after_lull if lull else in_flow).append(ttfb)
+        lull = (turn + 1) % args.lull_every == 0
+        await asyncio.sleep(args.lull if lull else args.gap)
+
+    # 对话结束后保持空闲，保温应在 pause_after 之后暂停
+    warmups_before_idle = scheduler.warmups
+    await asyncio.sleep(args.pause_after)
+    warmups_at_pause = scheduler.warmups
+    await asyncio.sleep(args.speaker_ttl * 2)
+
+    result = {
+        "after_lull": after_lull,
+        "in_flow": in_flow,
+        "warmups": warmups_before_idle,
+        "idle_warmups": warmups_at_pause - warmups_before_idle,
+        "warmups_after_pause": scheduler.warmups - warmups_at_pause,
+    }
+    if task is not None:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    await tts_impl.aclose()
+    return result
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=12)
+    parser.add_argument("--lull-every", type=int, default=3)
+    parser.add_argument("--gap", type=float, default=0.3)
+    parser.add_argument("--lull", type=float, default=4.0)
+    parser.add_argument("--speaker-ttl", type=float, default=2.0)
+    parser.add_argument("--speaker-load-ms", type=float, default=400.0)
+    parser.add_argument("--first-chunk-ms", type=float, default=80.0)
+    parser.add_argument("--pause-after", type=float, default=5.0)
+    args = parser.parse_args()
+
+    config = fake_tts.FakeTTSConfig(
+        first_chunk_ms=args.first_chunk_ms,
+        real_time_factor=0.05,
+        speaker_ttl=args.speaker_ttl,
+        speaker_load_ms=args.speaker_load_ms,
+    )
+
+    print(
+        f"{args.turns} 轮对话，每 {args.lull_every} 轮停顿 {args.lull}s；"
+        f"说话人 {args.speaker_ttl}s 未使用即淘汰，重新加载 {args.speaker_load_ms:.0f}ms"
+    )
+    print(
+        f"{'保温':>6}{'停顿后p50 ms':>14}{'停顿后max ms':>14}{'连续p50 ms':>12}"
+        f"{'保温请求':>10}{'空闲期请求':>12}{'暂停后请求':>12}"
+    )
+    for keep_warm in (False, True):
+        # 每种模式使用新的替身服务，说话人缓存从空开始
+        runner, base_url = await fake_tts.start(config)
+        r = await _run(args, base_url, keep_warm)
+        await runner.cleanup()
+        print(
+            f"{'开' if keep_warm else '关':>6}"
+            f"{statistics.median(r['after_lull']) * 1000:>14.0f}"
+            f"{max(r['after_lull']) * 1000:>14.0f}"
+            f"{statistics.median(r['in_flow']) * 1000:>12.0f}"
+            f"{r['warmups']:>10}{r['idle_warmups']:>12}{r['warmups_after_pause']:>12}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
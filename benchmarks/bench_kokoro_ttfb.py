@@ -0,0 +1,64 @@
+"""
+Kokoro TTS 首包延迟基准：对比 TTSMetrics.ttfb、替身服务首包延迟与完整下载耗时。
+
+改为流式解析前，ttfb 约等于完整下载耗时；流式解析后应接近服务端首包延迟。
+
+用法:
+    python -m benchmarks.bench_kokoro_ttfb --chars 60 --runs 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from livekit.agents.metrics import TTSMetrics
+
+from benchmarks import fake_tts
+from providers.kokoro_tts import TTS as KokoroTTS
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chars", type=int, default=60)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--first-chunk-ms", type=float, default=150.0)
+    args = parser.parse_args()
+
+    config = fake_tts.FakeTTSConfig(first_chunk_ms=args.first_chunk_ms)
+    runner, base_url = await fake_tts.start(config)
+    tts_impl = KokoroTTS(base_url=base_url)
+
+    ttfbs: list[float] = []
+    totals: list[float] = []
+
+    def _on_metrics(metrics: TTSMetrics) -> None:
+        ttfbs.append(metrics.ttfb)
+
+    tts_impl.on("metrics_collected", _on_metrics)
+
+    text = "你好" * (args.chars // 2)
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        async with tts_impl.synthesize(text) as stream:
+            async for _ in stream:
+                pass
+        totals.append(time.perf_counter() - start)
+
+    await tts_impl.aclose()
+    await runner.cleanup()
+
+    audio_s = args.chars * config.seconds_per_char
+    print(f"文本 {args.chars} 字，音频约 {audio_s:.1f}s，共 {args.runs} 次")
+    print(f"服务端首包延迟:  {args.first_chunk_ms:7.0f} ms")
+    print(f"TTSMetrics.ttfb: {statistics.median(ttfbs) * 1000:7.0f} ms")
+    print(
+        f"完整合成耗时:    {statistics.median(totals) * 1000:7.0f} ms"
+        "（缓冲整个响应时的 ttfb 下限）"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
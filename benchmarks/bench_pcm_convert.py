@@ -0,0 +1,85 @@
+"""
+float32 → PCM16 转换基准：逐采样 Python 循环 vs NumPy 批量转换 vs 分片增量转换。
+
+模拟 Kokoro 一次 30 秒回复（24kHz 单声道 float32）。
+
+用法:
+    python -m benchmarks.bench_pcm_convert --seconds 30 --chunk-size 8191
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import time
+from array import array
+
+from providers.audio_utils import Float32ToPCM16Converter, float32_to_pcm16
+
+SAMPLE_RATE = 24000
+
+
+def _legacy_convert(data: bytes) -> bytes:
+    """providers/kokoro_tts.py 原先的逐采样实现"""
+    float_data = array("f")
+    float_data.frombytes(data)
+
+    pcm16 = array("h")
+    for sample in float_data:
+        clamped = max(-1.0, min(1.0, sample))
+        pcm16.append(int(clamped * 32767))
+    return pcm16.tobytes()
+
+
+def _chunked_convert(data: bytes, chunk_size: int) -> bytes:
+    converter = Float32ToPCM16Converter()
+    out = bytearray()
+    for i in range(0, len(data), chunk_size):
+        out += converter.convert(data[i : i + chunk_size])
+    return bytes(out)
+
+
+def _timed(fn, *args, repeat: int) -> tuple[float, bytes]:
+    best = math.inf
+    result = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=30.0)
+    parser.add_argument("--chunk-size", type=int, default=8191)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    n = int(SAMPLE_RATE * args.seconds)
+    # 略超出 [-1, 1] 的正弦波，同时覆盖截断路径
+    samples = array(
+        "f", (1.1 * math.sin(2 * math.pi * 220 * i / SAMPLE_RATE) for i in range(n))
+    )
+    data = samples.tobytes()
+
+    legacy_s, legacy = _timed(_legacy_convert, data, repeat=args.repeat)
+    bulk_s, bulk = _timed(float32_to_pcm16, data, repeat=args.repeat)
+    chunked_s, chunked = _timed(
+        _chunked_convert, data, args.chunk_size, repeat=args.repeat
+    )
+
+    assert bulk == legacy, "bulk conversion differs from legacy output"
+    assert chunked == legacy, "chunked conversion differs from legacy output"
+
+    print(f"音频 {args.seconds:.0f}s @ {SAMPLE_RATE}Hz，{len(data) / 1024:.0f} KiB float32")
+    print(f"逐采样循环: {legacy_s * 1000:8.2f} ms")
+    print(f"NumPy 批量: {bulk_s * 1000:8.2f} ms  ({legacy_s / bulk_s:6.1f}x)")
+    print(
+        f"分片增量({args.chunk_size}B): {chunked_s * 1000:8.2f} ms"
+        f"  ({legacy_s / chunked_s:6.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
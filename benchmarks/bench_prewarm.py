@@ -0,0 +1,108 @@
+"""
+接起通话耗时：对比冷进程（job 到来后才加载 VAD、创建 STT/LLM/TTS）与预热进程
+（prewarm_fnc 已在 job 分配前完成这些工作）。
+
+每次测量都在新的 spawn 子进程中进行，子进程先导入 agent server 模块（与 worker
+启动 job 进程时一致，导入不计入接起耗时），然后：
+- 冷进程：计时包含 prewarm() 与会话级对象的创建
+- 预热进程：prewarm() 在计时前完成，计时只包含会话级对象的创建
+
+接起耗时不含连接房间与 session.start 之后的网络交互。
+
+用法:
+    python -m benchmarks.bench_prewarm --server agent_server_demo --runs 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib
+import multiprocessing as mp
+import os
+import statistics
+import time
+
+from livekit.agents import AgentSession, JobExecutorType, JobProcess
+
+# 子进程创建 provider 时只检查是否提供了 key，不会发出请求
+_DUMMY_ENV = (
+    "DASHSCOPE_API_KEY",
+    "SILICONFLOW_API_KEY",
+    "DEEPSEEK_API_KEY",
+    "MINIMAX_API_KEY",
+)
+
+
+def _pickup(server: str, warm: bool, conn) -> None:
+    module = importlib.import_module(server)
+    for name in _DUMMY_ENV:
+        os.environ[name] = os.environ.get(name) or "bench"
+
+    proc = JobProcess(
+        executor_type=JobExecutorType.PROCESS, user_arguments=None, http_proxy=None
+    )
+    prewarm_s = 0.0
+    if warm:
+        start = time.perf_counter()
+        module.prewarm(proc)
+        prewarm_s = time.perf_counter() - start
+
+    async def _job() -> float:
+        start = time.perf_counter()
+        if not warm:
+            module.prewarm(proc)
+        userdata = proc.userdata
+        module.Assistant()
+        AgentSession(
+            stt=userdata["stt"],
+            llm=userdata["llm"],
+            tts=userdata["tts"],
+            vad=userdata["vad"],
+        )
+        vad_stream = userdata["vad"].stream()
+        elapsed = time.perf_counter() - start
+
+        await vad_stream.aclose()
+        for key in ("stt", "llm", "tts"):
+            await userdata[key].aclose()
+        return elapsed
+
+    conn.send((prewarm_s, asyncio.run(_job())))
+    conn.close()
+
+
+def _measure(server: str, warm: bool) -> tuple[float, float]:
+    ctx = mp.get_context("spawn")
+    parent, child = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_pickup, args=(server, warm, child))
+    proc.start()
+    result = parent.recv()
+    proc.join()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--server",
+        default="agent_server_demo",
+        choices=("agent_server_demo", "agent_server_with_metrics"),
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{args.server}，每种进程 {args.runs} 次")
+    print(f"{'进程':>8}{'预热ms':>10}{'接起p50 ms':>13}{'接起max ms':>13}")
+    for warm in (False, True):
+        results = [_measure(args.server, warm) for _ in range(args.runs)]
+        prewarm = statistics.median(r[0] for r in results)
+        pickups = [r[1] for r in results]
+        print(
+            f"{'预热' if warm else '冷':>8}{prewarm * 1000:>10.0f}"
+            f"{statistics.median(pickups) * 1000:>13.1f}{max(pickups) * 1000:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
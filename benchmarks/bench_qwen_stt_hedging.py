@@ -0,0 +1,169 @@
+"""
+Qwen3-ASR 非流式识别的对冲请求效果：主端点有一定比例的请求卡顿（长尾延迟），
+对比不开对冲与开启对冲（备用端点）时的 p50/p95/p99 延迟和实际对冲比例。
+
+与默认的进程执行器一样，每个通话在新的进程中运行，依次识别 --turns 句；
+--concurrency 个通话同时进行。本进程调用 worker_state.listen()，扮演 worker 主进程：
+对冲阈值与自适应超时的延迟历史跨通话累积。“对冲（不共享）”模式下各通话只用自己的历史，
+每个通话都从 initial_delay 开始学习，用来对比。
+
+两个端点都由 benchmarks.fake_dashscope 在子进程中模拟，无需 DashScope API Key。
+卡顿按 --seed 抽取，每种模式使用新启动的端点，延迟历史按地址区分，互不影响；
+前 --warmup-calls 个通话用于学习，不计入统计。
+
+用法:
+    python -m benchmarks.bench_qwen_stt_hedging --calls 60 --turns 10 --concurrency 4 --seed 1
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks import fake_dashscope
+from benchmarks.bench_concurrency import _start_server, _stt_frames
+from providers import worker_state
+from providers.histogram import LogHistogram
+from providers.qwen_asr_stt import STT as QwenSTT
+from providers.qwen_asr_stt import UploadSTTMetrics
+
+
+async def _call_async(
+    primary_url: str, hedge_url: str | None, budget: float, turns: int, speech_s: float
+) -> tuple[list[float], int]:
+    kwargs = {"hedge_base_url": hedge_url, "hedge_budget": budget} if hedge_url else {}
+    # 相当于 job 进程的 prewarm：在通话开始前创建，载入 worker 的延迟历史
+    stt_impl = QwenSTT(api_key="fake", base_url=primary_url, trim_silence=False, **kwargs)
+    frames = _stt_frames(speech_s, 0.0)
+    latencies: list[float] = []
+    hedged = 0
+
+    def on_metrics(metrics: UploadSTTMetrics) -> None:
+        nonlocal hedged
+        hedged += metrics.hedged
+
+    stt_impl.on("metrics_collected", on_metrics)
+    try:
+        for _ in range(turns):
+            start = time.perf_counter()
+            await stt_impl.recognize(frames)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        await stt_impl.aclose()
+    return latencies, hedged
+
+
+def _call(
+    primary_url: str,
+    hedge_url: str | None,
+    budget: float,
+    turns: int,
+    speech_s: float,
+    shared: bool,
+) -> tuple[list[float], int]:
+    """在子进程中运行一个通话，返回各轮识别耗时与对冲次数"""
+    if not shared:
+        os.environ.pop(worker_state.STATE_ADDR_ENV, None)
+    return asyncio.run(_call_async(primary_url, hedge_url, budget, turns, speech_s))
+
+
+async def _run_calls(
+    pool: ProcessPoolExecutor, calls: int, *args: object
+) -> tuple[LogHistogram, int, int]:
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(
+        *(loop.run_in_executor(pool, _call, *args) for _ in range(calls))
+    )
+    latencies = LogHistogram()
+    hedged = 0
+    for call_latencies, call_hedged in results:
+        for latency in call_latencies:
+            latencies.record(latency)
+        hedged += call_hedged
+    return latencies, hedged, sum(len(r[0]) for r in results)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=60)
+    parser.add_argument("--turns", type=int, default=10, help="每个通话的识别次数")
+    parser.add_argument("--concurrency", type=int, default=4, help="同时进行的通话数")
+    parser.add_argument("--speech-s", type=float, default=3.0)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--slow-rate", type=float, default=0.05, help="卡顿请求比例")
+    parser.add_argument("--slow-ms", type=float, default=3000.0)
+    parser.add_argument("--budget", type=float, default=0.1, help="对冲预算")
+    parser.add_argument(
+        "--warmup-calls", type=int, default=5, help="不计入统计的预热通话数"
+    )
+    parser.add_argument("--seed", type=int, default=1, help="卡顿序列的随机种子")
+    args = parser.parse_args()
+
+    # 本进程扮演 worker 主进程，子进程继承地址
+    worker_state.listen()
+
+    print(
+        f"{args.calls} 个通话 × {args.turns} 轮（另有 {args.warmup_calls} 个预热通话），"
+        f"同时 {args.concurrency} 个通话，每个通话一个进程，"
+        f"{args.slow_rate:.0%} 卡顿 {args.slow_ms:.0f}ms，对冲预算 {args.budget:.0%}"
+    )
+    print(f"{'模式':>10}{'p50ms':>9}{'p95ms':>9}{'p99ms':>9}{'maxms':>9}{'对冲比例':>10}")
+    modes = (("单端点", False, True), ("对冲", True, True), ("对冲（不共享）", True, False))
+    for name, hedge, shared in modes:
+        # 每种模式新启动两个端点：卡顿序列相同，延迟历史按地址区分，互不影响
+        primary_proc, primary_url = await _start_server(
+            "benchmarks.fake_dashscope",
+            fake_dashscope.FakeASRConfig(
+                latency_ms=args.latency_ms,
+                slow_rate=args.slow_rate,
+                slow_ms=args.slow_ms,
+                seed=args.seed,
+            ),
+        )
+        # 备用地域网络更远，固定多出 100ms
+        hedge_proc, hedge_url = await _start_server(
+            "benchmarks.fake_dashscope",
+            fake_dashscope.FakeASRConfig(
+                latency_ms=args.latency_ms + 100,
+                slow_rate=args.slow_rate,
+                slow_ms=args.slow_ms,
+                seed=args.seed + 1,
+            ),
+        )
+        call_args = (
+            primary_url,
+            hedge_url if hedge else None,
+            args.budget,
+            args.turns,
+            args.speech_s,
+            shared,
+        )
+        try:
+            with ProcessPoolExecutor(
+                max_workers=args.concurrency,
+                mp_context=multiprocessing.get_context("spawn"),
+                max_tasks_per_child=1,
+            ) as pool:
+                await _run_calls(pool, args.warmup_calls, *call_args)
+                latencies, hedged, requests = await _run_calls(
+                    pool, args.calls, *call_args
+                )
+            print(
+                f"{name:>10}{latencies.percentile(0.5) * 1000:>9.0f}"
+                f"{latencies.percentile(0.95) * 1000:>9.0f}"
+                f"{latencies.percentile(0.99) * 1000:>9.0f}"
+                f"{latencies.max * 1000:>9.0f}{hedged / requests:>10.1%}"
+            )
+        finally:
+            # 等被取消的请求在服务端处理完，避免退出时 aiohttp 打印中断的处理器
+            await asyncio.sleep(args.slow_ms / 1000)
+            primary_proc.terminate()
+            hedge_proc.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,141 @@
+"""
+对比 Qwen3-ASR 非流式与流式模式下“说话结束 → 最终文本”的延迟。
+
+两种模式都要等一段静音才能判定说话结束：非流式由本地 VAD 判定
+（silero 默认 min_silence_duration 为 550ms），之后才上传整段音频；
+流式由服务端 VAD 判定（silence_duration_ms），音频已在说话期间上传。
+两者都从说话结束开始计时，静音判定计入延迟。
+
+使用 benchmarks.fake_dashscope 作为本地替身服务，无需 DashScope API Key。
+
+用法:
+    python -m benchmarks.bench_qwen_stt_streaming --speech-s 3 --runs 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import math
+import statistics
+import time
+
+import aiohttp
+
+from livekit import rtc
+from livekit.agents import stt
+
+from benchmarks import fake_dashscope
+from providers.qwen_asr_stt import STT as QwenSTT
+
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+
+
+def _frames(speech_s: float, silence_s: float) -> list[rtc.AudioFrame]:
+    """生成 speech_s 秒 440Hz 正弦音 + silence_s 秒静音的 20ms 帧"""
+    samples_per_frame = SAMPLE_RATE * FRAME_MS // 1000
+    frames = []
+    total = int((speech_s + silence_s) * 1000 / FRAME_MS)
+    voiced = int(speech_s * 1000 / FRAME_MS)
+    for i in range(total):
+        frame = rtc.AudioFrame.create(SAMPLE_RATE, 1, samples_per_frame)
+        if i < voiced:
+            data = frame.data
+            for j in range(samples_per_frame):
+                t = (i * samples_per_frame + j) / SAMPLE_RATE
+                data[j] = int(8000 * math.sin(2 * math.pi * 440 * t))
+        frames.append(frame)
+    return frames
+
+
+async def _run_batch(
+    stt_impl: QwenSTT, speech: list[rtc.AudioFrame], vad_silence_s: float
+) -> tuple[float, float]:
+    # 非流式模式：本地 VAD 静音判定说话结束后才开始上传，返回 (总延迟, 识别耗时)
+    speech_end = time.perf_counter()
+    await asyncio.sleep(vad_silence_s)
+    start = time.perf_counter()
+    await stt_impl.recognize(speech)
+    final_at = time.perf_counter()
+    return final_at - speech_end, final_at - start
+
+
+async def _run_streaming(
+    stt_impl: QwenSTT, frames: list[rtc.AudioFrame], voiced_frames: int
+) -> float:
+    stream = stt_impl.stream()
+    speech_end = 0.0
+    final_at = 0.0
+
+    async def _push() -> None:
+        nonlocal speech_end
+        for i, frame in enumerate(frames):
+            stream.push_frame(frame)
+            if i == voiced_frames - 1:
+                speech_end = time.perf_counter()
+            await asyncio.sleep(FRAME_MS / 1000)  # 按实时速度推送
+        stream.end_input()
+
+    push_task = asyncio.create_task(_push())
+    async for ev in stream:
+        if ev.type == stt.SpeechEventType.FINAL_TRANSCRIPT and not final_at:
+            final_at = time.perf_counter()
+    await push_task
+    await stream.aclose()
+    return final_at - speech_end
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--speech-s", type=float, default=3.0)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--silence-duration-ms", type=int, default=400)
+    parser.add_argument(
+        "--vad-silence-ms", type=int, default=550, help="本地 VAD 的 min_silence_duration"
+    )
+    args = parser.parse_args()
+
+    runner, base_url = await fake_dashscope.start()
+    frames = _frames(args.speech_s, 1.0)
+    voiced_frames = int(args.speech_s * 1000 / FRAME_MS)
+
+    async with aiohttp.ClientSession() as session:
+        batch = QwenSTT(api_key="fake", base_url=base_url)
+        streaming = QwenSTT(
+            api_key="fake",
+            base_url=base_url,
+            streaming=True,
+            silence_duration_ms=args.silence_duration_ms,
+            http_session=session,
+        )
+
+        batch_results = [
+            await _run_batch(batch, frames[:voiced_frames], args.vad_silence_ms / 1000)
+            for _ in range(args.runs)
+        ]
+        streaming_results = [
+            await _run_streaming(streaming, frames, voiced_frames)
+            for _ in range(args.runs)
+        ]
+
+        await batch.aclose()
+        await streaming.aclose()
+
+    await runner.cleanup()
+
+    print(f"语音时长 {args.speech_s:.1f}s，共 {args.runs} 次")
+    batch_total = statistics.median(total for total, _ in batch_results)
+    batch_recognize = statistics.median(recognize for _, recognize in batch_results)
+    print(
+        f"非流式 说话结束→最终文本: {batch_total * 1000:.0f} ms"
+        f"（本地 VAD 静音判定 {args.vad_silence_ms} ms + 识别 {batch_recognize * 1000:.0f} ms）"
+    )
+    print(
+        f"流式   说话结束→最终文本: {statistics.median(streaming_results) * 1000:.0f} ms"
+        f"（含服务端 VAD 静音判定 {args.silence_duration_ms} ms）"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
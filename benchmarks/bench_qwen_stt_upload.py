@@ -0,0 +1,188 @@
+"""
+Qwen3-ASR 非流式上传的请求体编码开销：对比原先一次性构造 payload 的方式与
+逐帧增量 base64 的流式请求体。
+
+分别统计编码总耗时、单次阻塞事件循环的最长时间，以及 tracemalloc 记录的峰值内存。
+第二张表对比 PCM / FLAC / Opus 上传编码的体积、编码耗时，以及在不同上行带宽下
+的预计上传耗时（编码 + 传输），并给出 upload_codec="auto" 的选择。
+第三张表统计 48kHz 双声道、首尾带 VAD 填充静音的输入经混音、裁剪、重采样后的
+预处理耗时和上传体积。
+
+用法:
+    python -m benchmarks.bench_qwen_stt_upload --durations 5,30,120 --runs 5
+    python -m benchmarks.bench_qwen_stt_upload --bandwidths 1024,256,32
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import json
+import statistics
+import time
+import tracemalloc
+
+import numpy as np
+from livekit import rtc
+
+from benchmarks.bench_concurrency import _stt_frames
+from providers import audio_codec, audio_utils
+from providers.qwen_asr_stt import SAMPLE_RATE
+from providers.qwen_asr_stt import STT as QwenSTT
+
+
+def _legacy_body(stt_impl: QwenSTT, frames: list[rtc.AudioFrame]) -> bytes:
+    """原实现：合并帧 → tobytes → base64 → f-string → json（httpx 的 json= 编码方式）"""
+    combined_frame = rtc.combine_audio_frames(frames)
+    audio_data = combined_frame.data.tobytes()
+    audio_base64 = base64.b64encode(audio_data).decode("utf-8")
+    payload = {
+        "model": stt_impl._opts.model,
+        "input": {
+            "messages": [
+                {"content": [{"text": stt_impl._opts.prompt}], "role": "system"},
+                {
+                    "content": [
+                        {"audio": f"data:audio/pcm;rate={SAMPLE_RATE};base64,{audio_base64}"}
+                    ],
+                    "role": "user",
+                },
+            ]
+        },
+        "parameters": {"asr_options": {"enable_itn": stt_impl._opts.enable_itn}},
+    }
+    return json.dumps(
+        payload, ensure_ascii=False, separators=(",", ":"), allow_nan=False
+    ).encode("utf-8")
+
+
+def _measure_legacy(stt_impl: QwenSTT, frames: list[rtc.AudioFrame]) -> tuple[float, float, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    _legacy_body(stt_impl, frames)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # 整个构造过程是一次同步调用，阻塞时间即总耗时
+    return elapsed, elapsed, peak
+
+
+async def _measure_streaming(
+    stt_impl: QwenSTT, frames: list[rtc.AudioFrame]
+) -> tuple[float, float, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    _, body = stt_impl._request_body(
+        [frame.data for frame in frames],
+        data_url_prefix=audio_codec.data_url_prefix("pcm", SAMPLE_RATE),
+    )
+    longest = 0.0
+    step = time.perf_counter()
+    async for _ in body:
+        now = time.perf_counter()
+        longest = max(longest, now - step)
+        step = now
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, longest, peak
+
+
+def _compare_codecs(
+    frames: list[rtc.AudioFrame], bandwidths: list[float], runs: int
+) -> None:
+    duration = sum(frame.duration for frame in frames)
+    pcm = b"".join(frame.data for frame in frames)
+    pcm_b64 = audio_utils.base64_encoded_len(len(pcm))
+    selectors = {bw: audio_codec.CodecSelector(upload_bandwidth=bw) for bw in bandwidths}
+    rows = []
+    for codec in ("pcm", "flac", "opus"):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            encoded = audio_codec.encode(pcm, codec, sample_rate=SAMPLE_RATE)
+            timings.append(time.perf_counter() - start)
+        encode_s = statistics.median(timings)
+        size = audio_utils.base64_encoded_len(len(encoded))
+        for selector in selectors.values():
+            selector.record_encode(codec, duration, encode_s, len(encoded) / len(pcm))
+        rows.append((codec, size, encode_s))
+
+    header = "".join(f"{f'{bw / 1024:.0f}KB/s ms':>14}" for bw in bandwidths)
+    print(f"{'编码':>6}{'上传KB':>10}{'节省':>8}{'编码ms':>10}{header}")
+    for codec, size, encode_s in rows:
+        cells = "".join(
+            f"{(encode_s + size / bw) * 1000:>14.0f}" for bw in bandwidths
+        )
+        print(
+            f"{codec:>6}{size / 1024:>10.1f}{1 - size / pcm_b64:>8.0%}"
+            f"{encode_s * 1000:>10.1f}{cells}"
+        )
+    choices = "".join(
+        f"{selectors[bw].choose(duration, len(pcm)):>14}" for bw in bandwidths
+    )
+    print(f"{'auto':>6}{'':>28}{choices}")
+
+
+def _room_frames(speech_s: float, padding_s: float) -> list[rtc.AudioFrame]:
+    """48kHz 双声道的房间音频：首尾各 padding_s 静音，中间为正弦波"""
+    rate, channels, samples_per_frame = 48000, 2, 960
+    t = np.arange(int(speech_s * rate)) / rate
+    tone = (8000 * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+    silence = np.zeros(int(padding_s * rate), dtype=np.int16)
+    signal = np.repeat(np.concatenate([silence, tone, silence]), channels)
+    step = samples_per_frame * channels
+    return [
+        rtc.AudioFrame(signal[i : i + step].tobytes(), rate, channels, samples_per_frame)
+        for i in range(0, len(signal) - step + 1, step)
+    ]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--durations", default="5,30,120", help="逗号分隔的语音时长（秒）")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--bandwidths", default="1024,256,32", help="逗号分隔的上行带宽（KB/s）"
+    )
+    args = parser.parse_args()
+    bandwidths = [float(b) * 1024 for b in args.bandwidths.split(",")]
+
+    stt_impl = QwenSTT(api_key="fake", base_url="http://127.0.0.1:1")
+    print(f"{'时长':>6}{'方式':>8}{'总耗时ms':>10}{'最长阻塞ms':>12}{'峰值内存MB':>12}")
+    for duration in (float(d) for d in args.durations.split(",")):
+        frames = _stt_frames(duration, 0.0)
+        legacy = [_measure_legacy(stt_impl, frames) for _ in range(args.runs)]
+        streaming = [await _measure_streaming(stt_impl, frames) for _ in range(args.runs)]
+        for name, results in (("原实现", legacy), ("流式", streaming)):
+            elapsed, longest, peak = (statistics.median(col) for col in zip(*results))
+            print(
+                f"{duration:>5.0f}s{name:>8}{elapsed * 1000:>10.1f}"
+                f"{longest * 1000:>12.2f}{peak / 1024 / 1024:>12.2f}"
+            )
+
+    for duration in (float(d) for d in args.durations.split(",")):
+        print(f"\n{duration:.0f}s 语音的上传编码对比")
+        _compare_codecs(_stt_frames(duration, 0.0), bandwidths, args.runs)
+
+    print(f"\n{'时长':>6}{'预处理ms':>10}{'原始KB':>10}{'处理后KB':>10}{'识别时长s':>10}")
+    for duration in (float(d) for d in args.durations.split(",")):
+        frames = _room_frames(duration, 0.5)
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            chunks, trimmed_s = stt_impl._prepare_audio(frames)
+            timings.append(time.perf_counter() - start)
+        raw = sum(frame.data.nbytes for frame in frames)
+        prepared = sum(chunk.nbytes for chunk in chunks)
+        print(
+            f"{duration:>5.0f}s{statistics.median(timings) * 1000:>10.1f}"
+            f"{raw / 1024:>10.0f}{prepared / 1024:>10.0f}{trimmed_s:>10.2f}"
+        )
+
+    await stt_impl.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,229 @@
+"""
+会话泄漏检查：模拟 --sessions 个 job 依次接起、结束，检查收尾后残留的 socket、
+asyncio 任务和内存。
+
+每个模拟 job 与线程模式的 worker 一致：新线程中先创建 provider（对应 prewarm，
+此时还没有事件循环），再在新的事件循环中创建 AgentSession 与 SessionLifetime、
+启动会话、经 Qwen3-ASR 与 Kokoro 各完成一次请求，最后关闭会话并等待清理完成。
+替身服务运行在独立线程的事件循环中，不计入被测的任务和 socket。
+
+统计项：
+- 残留任务：每个 job 清理完成后，其事件循环中除主任务外仍未结束的任务数（取最大值）
+- socket：全部 job 结束后仍连向替身服务的 TCP 连接数
+- 连接池：http_pool 中仍未释放的共享客户端数
+- 内存：预热 --warmup 个 job 之后到结束时 Python 堆（tracemalloc）与 RSS 的增长。
+  RSS 还包含分配器为各 job 线程保留的内存，以 Python 堆的增长判断是否泄漏
+
+--no-cleanup 模拟改动前的行为：只关闭 AgentSession，不关闭 provider，
+也不取消后台任务。
+
+用法:
+    python -m benchmarks.bench_session_leaks --sessions 1000
+    python -m benchmarks.bench_session_leaks --sessions 1000 --no-cleanup
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable
+from concurrent.futures import Future
+
+import numpy as np
+import psutil
+from livekit import rtc
+from livekit.agents import Agent, AgentSession
+from livekit.plugins import silero
+
+from benchmarks import fake_dashscope, fake_tts
+from providers import http_pool
+from providers.kokoro_tts import TTS as KokoroTTS
+from providers.qwen_asr_stt import STT as QwenSTT
+from providers.session_lifetime import SessionLifetime
+from providers.worker_load import monitor_event_loop
+
+STT_SAMPLE_RATE = 16000
+
+
+def _start_servers() -> tuple[str, str, Callable[[], None]]:
+    """在后台线程的事件循环中启动替身服务，返回 (asr_url, tts_url, stop)"""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    async def _start() -> tuple[list, str, str]:
+        asr_runner, asr_url = await fake_dashscope.start(
+            fake_dashscope.FakeASRConfig(latency_ms=10.0)
+        )
+        tts_runner, tts_url = await fake_tts.start(
+            fake_tts.FakeTTSConfig(first_chunk_ms=10.0, real_time_factor=0.05)
+        )
+        return [asr_runner, tts_runner], asr_url, tts_url
+
+    runners, asr_url, tts_url = asyncio.run_coroutine_threadsafe(_start(), loop).result()
+
+    def _stop() -> None:
+        for runner in runners:
+            asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    return asr_url, tts_url, _stop
+
+
+async def _session(
+    stt_impl: QwenSTT,
+    tts_impl: KokoroTTS,
+    vad: silero.VAD,
+    speech: rtc.AudioFrame,
+    *,
+    cleanup: bool,
+) -> int:
+    """运行一个模拟 job，返回清理后残留的任务数"""
+    session = AgentSession(stt=stt_impl, tts=tts_impl, vad=vad)
+    lifetime = SessionLifetime(session)
+    if cleanup:
+        lifetime.add_cleanup("stt", stt_impl.aclose)
+        lifetime.add_cleanup("tts", tts_impl.aclose)
+        lifetime.create_task(monitor_event_loop(), name="loop_lag_monitor")
+    else:
+        asyncio.create_task(monitor_event_loop(), name="loop_lag_monitor")
+
+    await session.start(agent=Agent(instructions="你是一个语音助手。"))
+    await stt_impl.recognize(speech)
+    async with tts_impl.synthesize("你好，有什么可以帮你？") as stream:
+        async for _ in stream:
+            pass
+
+    # 会话结束：和用户离开房间时一样由 AgentSession 发出 close 事件
+    closing = asyncio.create_task(session.aclose())
+    await lifetime.wait()
+    await closing
+    if cleanup:
+        await lifetime.aclose()
+
+    # 让已取消的任务走完收尾
+    await asyncio.sleep(0)
+    return len(asyncio.all_tasks()) - 1
+
+
+def _job(
+    asr_url: str,
+    tts_url: str,
+    vad: silero.VAD,
+    speech: rtc.AudioFrame,
+    cleanup: bool,
+    result: Future[int],
+) -> None:
+    try:
+        # 对应 prewarm：在 job 的事件循环创建之前创建 provider
+        stt_impl = QwenSTT(api_key="fake", base_url=asr_url)
+        tts_impl = KokoroTTS(base_url=tts_url)
+        result.set_result(
+            asyncio.run(_session(stt_impl, tts_impl, vad, speech, cleanup=cleanup))
+        )
+    except BaseException as e:
+        result.set_exception(e)
+
+
+def _run_jobs(
+    n: int,
+    concurrency: int,
+    asr_url: str,
+    tts_url: str,
+    vad: silero.VAD,
+    speech: rtc.AudioFrame,
+    cleanup: bool,
+) -> list[int]:
+    leftovers = []
+    for start in range(0, n, concurrency):
+        batch = []
+        for _ in range(min(concurrency, n - start)):
+            result: Future[int] = Future()
+            thread = threading.Thread(
+                target=_job, args=(asr_url, tts_url, vad, speech, cleanup, result)
+            )
+            thread.start()
+            batch.append((thread, result))
+        for thread, result in batch:
+            thread.join()
+            leftovers.append(result.result())
+    return leftovers
+
+
+def _sockets_to(ports: set[int]) -> int:
+    return sum(
+        1
+        for conn in psutil.Process().net_connections(kind="tcp")
+        if conn.raddr and conn.raddr.port in ports
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--no-cleanup", action="store_true", help="模拟改动前不清理的行为")
+    args = parser.parse_args()
+    cleanup = not args.no_cleanup
+
+    asr_url, tts_url, stop_servers = _start_servers()
+    ports = {int(url.rsplit(":", 1)[1]) for url in (asr_url, tts_url)}
+    vad = silero.VAD.load()
+    t = np.arange(STT_SAMPLE_RATE) / STT_SAMPLE_RATE
+    pcm = (8000 * np.sin(2 * np.pi * 220 * t)).astype(np.int16)
+    speech = rtc.AudioFrame(
+        data=pcm.tobytes(),
+        sample_rate=STT_SAMPLE_RATE,
+        num_channels=1,
+        samples_per_channel=len(pcm),
+    )
+    process = psutil.Process()
+
+    start = time.perf_counter()
+    leftovers = _run_jobs(
+        args.warmup, args.concurrency, asr_url, tts_url, vad, speech, cleanup
+    )
+    gc.collect()
+    tracemalloc.start()
+    rss_start = process.memory_info().rss
+    leftovers += _run_jobs(
+        args.sessions - args.warmup,
+        args.concurrency,
+        asr_url,
+        tts_url,
+        vad,
+        speech,
+        cleanup,
+    )
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    heap_growth, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_end = process.memory_info().rss
+
+    print(
+        f"{args.sessions} 个模拟 job（{'清理' if cleanup else '不清理'}），"
+        f"并发 {args.concurrency}，耗时 {elapsed:.1f}s"
+    )
+    print(f"残留任务（单个 job 最大）: {max(leftovers)}")
+    print(f"连向替身服务的 socket: {_sockets_to(ports)}")
+    print(f"未释放的共享客户端: {len(http_pool.pool_stats())}")
+    jobs = max(args.sessions - args.warmup, 1)
+    print(
+        f"预热后 Python 堆增长: {heap_growth / 1024:.0f}KB"
+        f"（每个 job {heap_growth / 1024 / jobs:.2f}KB）"
+    )
+    rss_growth = (rss_end - rss_start) / 1024
+    print(f"预热后 RSS 增长: {rss_growth:.0f}KB（每个 job {rss_growth / jobs:.1f}KB）")
+
+    stop_servers()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+worker 启动开销：对比改动前一次性导入全部 provider 与按配置在 prewarm 中导入所选 provider。
+
+每次测量都在新的 spawn 子进程中进行，分两步记录：
+- 模块导入：导入 agent server 模块的耗时与之后的 RSS，即 worker 主进程（以及
+  forkserver）启动时的开销；插件数为此时已注册的 livekit 插件，forkserver 会预加载
+- prewarm 导入：随后 ProviderConfig.preload() 导入所选 provider 的耗时与之后的 RSS，
+  即每个 job 进程在 prewarm 中首次创建实例的额外开销
+
+"全部导入" 在导入 agent server 模块之前先导入改动前模块顶部的全部 provider
+（openai / minimax 插件与 providers 下所有 STT/TTS），以此复现改动前的行为，
+此时 prewarm 不再需要导入。
+
+用法:
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --tts kokoro --tts minimax --tts kokoro,indextts,minimax
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import multiprocessing as mp
+import os
+import statistics
+import sys
+import time
+
+# 改动前 agent server 模块顶部导入的 provider
+EAGER_MODULES = (
+    "livekit.plugins.openai",
+    "livekit.plugins.minimax",
+    "providers.qwen_asr_stt",
+    "providers.local_indexTTS",
+    "providers.local_indextts_chaos",
+    "providers.kokoro_tts",
+    "providers.tts_failover",
+)
+
+
+def _startup(server: str, tts: str | None, eager: bool, conn) -> None:
+    import psutil
+
+    if tts is not None:
+        os.environ["TTS_PROVIDER"] = tts
+    before = len(sys.modules)
+    start = time.perf_counter()
+    if eager:
+        for name in EAGER_MODULES:
+            importlib.import_module(name)
+    module = importlib.import_module(server)
+    elapsed = time.perf_counter() - start
+
+    from livekit.agents import Plugin
+
+    rss = psutil.Process().memory_info().rss
+    modules = len(sys.modules) - before
+    plugins = len(Plugin.registered_plugins)
+
+    start = time.perf_counter()
+    module.PROVIDERS.preload()
+    prewarm_elapsed = time.perf_counter() - start
+
+    conn.send(
+        (
+            elapsed,
+            rss,
+            modules,
+            plugins,
+            prewarm_elapsed,
+            psutil.Process().memory_info().rss,
+        )
+    )
+    conn.close()
+
+
+def _measure(server: str, tts: str | None, eager: bool) -> tuple:
+    ctx = mp.get_context("spawn")
+    parent, child = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_startup, args=(server, tts, eager, child))
+    proc.start()
+    result = parent.recv()
+    proc.join()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--server",
+        default="agent_server_demo",
+        choices=("agent_server_demo", "agent_server_with_metrics"),
+    )
+    parser.add_argument(
+        "--tts",
+        action="append",
+        help="TTS_PROVIDER 取值，可重复指定；默认使用 agent server 中的默认值",
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=1000.0,
+        help="prewarm 中导入所选 provider 的耗时预算，任一配置超出时以非零状态退出",
+    )
+    args = parser.parse_args()
+
+    cases: list[tuple[str, str | None, bool]] = [("全部导入", None, True)]
+    for tts in args.tts or [None]:
+        cases.append((f"按配置 tts={tts or '默认'}", tts, False))
+
+    print(f"{args.server}，每种配置 {args.runs} 次（取中位数）")
+    print(
+        f"{'配置':<32}{'导入ms':>10}{'RSS MB':>10}{'新模块':>8}{'插件':>6}"
+        f"{'prewarm ms':>12}{'prewarm后RSS MB':>18}"
+    )
+    over_budget = False
+    for label, tts, eager in cases:
+        results = [_measure(args.server, tts, eager) for _ in range(args.runs)]
+        elapsed, rss, modules, plugins, prewarm_s, prewarm_rss = (
+            statistics.median(r[i] for r in results) for i in range(6)
+        )
+        if not eager and prewarm_s * 1000 > args.budget_ms:
+            over_budget = True
+            label += " (超出预算)"
+        print(
+            f"{label:<32}{elapsed * 1000:>10.0f}{rss / 1024 / 1024:>10.1f}"
+            f"{modules:>8.0f}{plugins:>6.0f}{prewarm_s * 1000:>12.0f}"
+            f"{prewarm_rss / 1024 / 1024:>18.1f}"
+        )
+
+    if over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+TTS 音频推送方式对 AudioEmitter 的影响：对比整段推送（原 IndexTTS）、8KB 网络分片
+推送（原 IndexTTS-chaos）与经 FramedEmitter 按固定 20ms / 10ms 分帧推送。
+
+AudioEmitter 内部用 AudioByteStream 按 frame_size_ms 重新分帧，每切出一帧都要把剩余
+缓冲区整体复制一次，大块推送时复制量随数据长度平方增长。统计项：
+- 分配次数 / 复制MB：AudioByteStream 的 extend 与切片，以及 PCMFramer 生成的帧
+- 峰值KB：tracemalloc 记录的推送与分帧过程的峰值内存（不含输入数据本身）
+- 输出帧长：下游收到的帧时长范围，越均匀播放抖动越小
+- 首帧前音频：首个帧输出前需要推送的音频时长（AudioEmitter 总压着一帧）
+
+用法:
+    python -m benchmarks.bench_tts_framing --seconds 12
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import time
+import tracemalloc
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+import numpy as np
+from livekit.agents import tts
+from livekit.agents.utils import aio
+from livekit.agents.utils import audio as lk_audio
+
+from providers.audio_utils import FramedEmitter
+
+SAMPLE_RATE = 24000
+NETWORK_CHUNK = 8192
+
+
+@dataclass
+class _Counters:
+    allocations: int = 0
+    copied: int = 0
+
+
+_counters = _Counters()
+
+
+class _CountingByteStream(lk_audio.AudioByteStream):
+    """按 AudioByteStream.push 的实现统计分配与复制：extend 一次，每帧切片两次"""
+
+    def push(self, data: bytes | memoryview) -> list:
+        buffered = len(self._buf) + len(data)
+        frames = super().push(data)
+        _counters.allocations += 1 + 2 * len(frames)
+        _counters.copied += len(data)
+        for i in range(1, len(frames) + 1):
+            _counters.copied += buffered - i * self._bytes_per_frame + self._bytes_per_frame
+        return frames
+
+
+@contextlib.contextmanager
+def _count_byte_stream() -> Iterator[None]:
+    original = lk_audio.AudioByteStream
+    lk_audio.AudioByteStream = _CountingByteStream  # type: ignore[misc]
+    try:
+        yield
+    finally:
+        lk_audio.AudioByteStream = original  # type: ignore[misc]
+
+
+async def _run(
+    pcm: bytes, *, push_size: int, frame_ms: int | None
+) -> tuple[int, int, int, list[float], float, float]:
+    """返回 (推送次数, 分配次数, 复制字节, 输出帧时长列表, 峰值字节, 首帧前音频秒)"""
+    dst: aio.Chan[tts.SynthesizedAudio] = aio.Chan()
+    raw = tts.AudioEmitter(label="bench", dst_ch=dst)
+    emitter = FramedEmitter(raw, frame_ms=frame_ms) if frame_ms else raw
+    durations: list[float] = []
+    first_at: float | None = None
+    pushed = 0
+
+    async def _consume() -> None:
+        nonlocal first_at
+        async for audio in dst:
+            if first_at is None:
+                first_at = pushed / 2 / SAMPLE_RATE
+            durations.append(audio.frame.duration)
+
+    consumer = asyncio.create_task(_consume())
+    _counters.allocations = _counters.copied = 0
+    tracemalloc.start()
+    emitter.initialize(
+        request_id="bench", sample_rate=SAMPLE_RATE, num_channels=1, mime_type="audio/pcm"
+    )
+    pushes = 0
+    view = memoryview(pcm)
+    for i in range(0, len(pcm), push_size):
+        emitter.push(view[i : i + push_size] if frame_ms else pcm[i : i + push_size])
+        pushes += 1
+        pushed = min(i + push_size, len(pcm))
+        # 让 AudioEmitter 处理已推送的数据
+        for _ in range(3):
+            await asyncio.sleep(0)
+    emitter.flush()
+    raw.end_input()
+    await raw.join()
+    dst.close()
+    await consumer
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    allocations = _counters.allocations
+    if isinstance(emitter, FramedEmitter) and emitter.framer is not None:
+        allocations += emitter.framer.frames
+    return pushes, allocations, _counters.copied, durations, peak, first_at or 0.0
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=12.0, help="一句话的音频时长")
+    args = parser.parse_args()
+
+    t = np.arange(int(args.seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pcm = (8000 * np.sin(2 * np.pi * 220 * t)).astype("<i2").tobytes()
+
+    cases = (
+        ("整段推送", len(pcm), None),
+        ("8KB分片", NETWORK_CHUNK, None),
+        ("20ms帧", NETWORK_CHUNK, 20),
+        ("10ms帧", NETWORK_CHUNK, 10),
+    )
+    print(f"{args.seconds:.0f}s 音频（{len(pcm) / 1024:.0f}KB PCM16）")
+    print(
+        f"{'方式':>8}{'推送':>7}{'分配次数':>10}{'复制MB':>9}{'峰值KB':>9}"
+        f"{'输出帧':>8}{'帧长ms':>12}{'首帧前ms':>10}{'耗时ms':>9}"
+    )
+    with _count_byte_stream():
+        for name, push_size, frame_ms in cases:
+            start = time.perf_counter()
+            pushes, allocations, copied, durations, peak, first_s = await _run(
+                pcm, push_size=push_size, frame_ms=frame_ms
+            )
+            elapsed = time.perf_counter() - start
+            frame_range = f"{min(durations) * 1000:.0f}-{max(durations) * 1000:.0f}"
+            print(
+                f"{name:>8}{pushes:>7}{allocations:>10}{copied / 1024 / 1024:>9.1f}"
+                f"{peak / 1024:>9.0f}{len(durations):>8}{frame_range:>12}"
+                f"{first_s * 1000:>10.0f}{elapsed * 1000:>9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
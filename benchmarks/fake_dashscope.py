@@ -0,0 +1,292 @@
+"""
+本地 DashScope Qwen3-ASR 替身服务，用于离线调试与压测 providers/qwen_asr_stt.py。
+
+支持两种接口：
+- POST /api/v1/services/aigc/multimodal-generation/generation  非流式识别
+- GET  /api-ws/v1/realtime                                     实时识别 WebSocket
+
+服务不做真正的语音识别，而是按“有声音频时长”生成确定性的中文文本，
+并用能量阈值模拟服务端 VAD。可按比例注入 HTTP 500 / error 事件。
+非流式接口除 PCM 外也接受 FLAC、Ogg/Opus 编码的 data URL。
+
+用法:
+    python -m benchmarks.fake_dashscope --port 8765 --latency-ms 300
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import json
+import random
+import uuid
+from array import array
+from dataclasses import dataclass
+
+from aiohttp import WSMsgType, web
+
+from providers import audio_codec
+
+SAMPLE_RATE = 16000
+SAMPLE_TEXT = "今天天气不错我们一起出去走走顺便买点水果回来好不好"
+CHARS_PER_SECOND = 4.0
+# 16-bit PCM 的平均绝对幅度高于该值视为有声
+ENERGY_THRESHOLD = 500
+
+
+@dataclass
+class FakeASRConfig:
+    latency_ms: float = 300.0
+    """非流式识别的固定延迟"""
+    latency_per_audio_s_ms: float = 50.0
+    """非流式识别每秒音频额外增加的延迟"""
+    final_latency_ms: float = 80.0
+    """实时识别从断句到返回最终结果的延迟"""
+    interim_interval_ms: float = 200.0
+    """实时识别中间结果的最小间隔"""
+    error_rate: float = 0.0
+    """非流式识别返回 HTTP 500、实时识别在最终结果处返回 error 事件的比例"""
+    slow_rate: float = 0.0
+    """非流式识别额外卡顿 slow_ms 的请求比例，用于模拟长尾延迟"""
+    slow_ms: float = 3000.0
+    seed: int | None = None
+    """非流式识别注入卡顿与错误的随机种子，固定后每次运行的卡顿序列相同"""
+
+
+def _text_for(voiced_seconds: float) -> str:
+    n = max(1, int(voiced_seconds * CHARS_PER_SECOND))
+    return (SAMPLE_TEXT * (n // len(SAMPLE_TEXT) + 1))[:n]
+
+
+def _mean_abs(pcm: bytes) -> float:
+    samples = array("h")
+    samples.frombytes(pcm[: len(pcm) - len(pcm) % 2])
+    if not samples:
+        return 0.0
+    return sum(abs(s) for s in samples) / len(samples)
+
+
+def _decode_data_url(url: str) -> tuple[bytes, int]:
+    header, _, payload = url.partition(",")
+    data = base64.b64decode(payload)
+    if not header.startswith("data:audio/pcm"):
+        # 压缩格式统一解码为 16kHz PCM16 再统计有声时长
+        return audio_codec.decode(data, sample_rate=SAMPLE_RATE), SAMPLE_RATE
+
+    rate = SAMPLE_RATE
+    for part in header.split(";"):
+        if part.startswith("rate="):
+            rate = int(part[5:])
+    return data, rate
+
+
+def _event(type: str, **fields: object) -> str:
+    return json.dumps(
+        {"event_id": f"event_{uuid.uuid4().hex[:16]}", "type": type, **fields},
+        ensure_ascii=False,
+    )
+
+
+class _RealtimeSession:
+    """单个 WebSocket 连接上的识别状态"""
+
+    def __init__(self, ws: web.WebSocketResponse, config: FakeASRConfig) -> None:
+        self._ws = ws
+        self._config = config
+        self._server_vad = True
+        self._silence_ms = 400.0
+        self._sample_rate = SAMPLE_RATE
+        self._reset()
+
+    def _reset(self) -> None:
+        self._speaking = False
+        self._voiced_s = 0.0
+        self._silent_ms = 0.0
+        self._last_interim_ms = 0.0
+        self._elapsed_ms = 0.0
+
+    async def handle(self, data: dict) -> bool:
+        event_type = data.get("type")
+        if event_type == "session.update":
+            session = data.get("session", {})
+            self._sample_rate = session.get("sample_rate", SAMPLE_RATE)
+            turn_detection = session.get("turn_detection")
+            self._server_vad = turn_detection is not None
+            if turn_detection:
+                self._silence_ms = turn_detection.get("silence_duration_ms", 400)
+            await self._ws.send_str(_event("session.updated", session=session))
+        elif event_type == "input_audio_buffer.append":
+            await self._append(base64.b64decode(data.get("audio", "")))
+        elif event_type == "input_audio_buffer.commit":
+            await self._ws.send_str(_event("input_audio_buffer.committed"))
+            await self._finalize()
+        elif event_type == "session.finish":
+            if self._voiced_s > 0:
+                await self._finalize()
+            await self._ws.send_str(_event("session.finished"))
+            return True
+        return False
+
+    async def _append(self, pcm: bytes) -> None:
+        chunk_ms = len(pcm) / 2 / self._sample_rate * 1000
+        self._elapsed_ms += chunk_ms
+        voiced = _mean_abs(pcm) > ENERGY_THRESHOLD
+
+        if voiced:
+            self._voiced_s += chunk_ms / 1000
+            self._silent_ms = 0.0
+            if not self._speaking:
+                self._speaking = True
+                await self._ws.send_str(_event("input_audio_buffer.speech_started"))
+        elif self._speaking:
+            self._silent_ms += chunk_ms
+
+        if (
+            self._speaking
+            and self._elapsed_ms - self._last_interim_ms
+            >= self._config.interim_interval_ms
+        ):
+            self._last_interim_ms = self._elapsed_ms
+            text = _text_for(self._voiced_s)
+            await self._ws.send_str(
+                _event(
+                    "conversation.item.input_audio_transcription.text",
+                    text=text[:-1],
+                    stash=text[-1:],
+                )
+            )
+
+        if self._server_vad and self._speaking and self._silent_ms >= self._silence_ms:
+            await self._ws.send_str(_event("input_audio_buffer.speech_stopped"))
+            await self._finalize()
+
+    async def _finalize(self) -> None:
+        voiced_s = self._voiced_s
+        self._reset()
+        if voiced_s <= 0:
+            return
+        await asyncio.sleep(self._config.final_latency_ms / 1000)
+        if random.random() < self._config.error_rate:
+            await self._ws.send_str(
+                _event(
+                    "error",
+                    error={"code": "InternalError", "message": "injected error"},
+                )
+            )
+            return
+        await self._ws.send_str(
+            _event(
+                "conversation.item.input_audio_transcription.completed",
+                transcript=_text_for(voiced_s),
+            )
+        )
+
+
+def create_app(config: FakeASRConfig | None = None) -> web.Application:
+    config = config or FakeASRConfig()
+    rng = random.Random(config.seed)
+
+    async def recognize(request: web.Request) -> web.Response:
+        try:
+            payload = await request.json()
+        except ConnectionResetError:
+            # 客户端在上传途中取消（例如对冲请求落败）
+            return web.Response(status=499)
+        audio_s = 0.0
+        voiced_s = 0.0
+        for message in payload.get("input", {}).get("messages", []):
+            for content in message.get("content", []):
+                if "audio" in content:
+                    pcm, rate = _decode_data_url(content["audio"])
+                    audio_s = len(pcm) / 2 / rate
+                    # 按 100ms 分片统计有声时长
+                    step = rate // 10 * 2
+                    for i in range(0, len(pcm), step):
+                        if _mean_abs(pcm[i : i + step]) > ENERGY_THRESHOLD:
+                            voiced_s += step / 2 / rate
+
+        latency_ms = config.latency_ms + config.latency_per_audio_s_ms * audio_s
+        # 在等待前一起抽取，并发请求的完成顺序不影响随机序列
+        slow = rng.random() < config.slow_rate
+        error = rng.random() < config.error_rate
+        if slow:
+            latency_ms += config.slow_ms
+        await asyncio.sleep(latency_ms / 1000)
+        if error:
+            return web.json_response(
+                {"code": "InternalError", "message": "injected error"}, status=500
+            )
+        text = _text_for(voiced_s) if voiced_s > 0 else ""
+        return web.json_response(
+            {
+                "output": {
+                    "choices": [
+                        {"message": {"role": "assistant", "content": [{"text": text}]}}
+                    ]
+                },
+                "request_id": uuid.uuid4().hex,
+            },
+            headers={"X-Request-Id": uuid.uuid4().hex},
+        )
+
+    async def realtime(request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_str(
+            _event("session.created", session={"id": f"sess_{uuid.uuid4().hex[:12]}"})
+        )
+
+        session = _RealtimeSession(ws, config)
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            if await session.handle(json.loads(msg.data)):
+                break
+
+        await ws.close()
+        return ws
+
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app.router.add_post(
+        "/api/v1/services/aigc/multimodal-generation/generation", recognize
+    )
+    app.router.add_get("/api-ws/v1/realtime", realtime)
+    return app
+
+
+async def start(
+    config: FakeASRConfig | None = None, host: str = "127.0.0.1", port: int = 0
+) -> tuple[web.AppRunner, str]:
+    """在当前事件循环中启动替身服务，返回 (runner, base_url)"""
+    runner = web.AppRunner(create_app(config))
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+    return runner, f"http://{host}:{bound_port}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake DashScope Qwen3-ASR server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--final-latency-ms", type=float, default=80.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-ms", type=float, default=3000.0)
+    args = parser.parse_args()
+
+    config = FakeASRConfig(
+        latency_ms=args.latency_ms,
+        final_latency_ms=args.final_latency_ms,
+        error_rate=args.error_rate,
+        slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms,
+    )
+    web.run_app(create_app(config), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
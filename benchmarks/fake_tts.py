@@ -0,0 +1,289 @@
+"""
+本地 TTS 替身服务，用于离线调试与压测 providers/ 下的本地 TTS。
+
+- GET  /?text=...&speaker=...  Kokoro / IndexTTS-chaos 接口，流式返回 WAV
+                                （data 长度写为 0xFFFFFFFF，采样格式由 sample_format 决定）
+- POST /audio/speech            IndexTTS（OpenAI 兼容）接口，按 response_format 返回 wav、pcm、
+                                mp3 或 opus（Ogg 封装）
+- GET  /health                  健康检查
+
+音频为正弦波，时长与文本长度成正比；首包延迟、合成速度、分片大小可配置，
+并可按比例注入 HTTP 500、中途断开连接以及卡死（返回响应头后不再输出音频）。
+设置 speaker_ttl 后模拟服务端淘汰说话人模型：超过 speaker_ttl 秒未使用的说话人
+（speaker / voice 参数，Kokoro 另按文本语言用到 speaker_en / speaker_zh）
+下次请求需要额外的 speaker_load_ms 重新加载。
+
+用法:
+    python -m benchmarks.fake_tts --port 9880 --first-chunk-ms 150
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import math
+import random
+import time
+import uuid
+from dataclasses import dataclass
+
+import av
+import numpy as np
+from aiohttp import web
+
+SAMPLE_RATE = 24000
+
+
+@dataclass
+class FakeTTSConfig:
+    first_chunk_ms: float = 150.0
+    """收到请求到输出第一段音频的延迟"""
+    real_time_factor: float = 0.2
+    """合成耗时 / 音频时长"""
+    chunk_ms: float = 100.0
+    """每个响应分片包含的音频时长"""
+    seconds_per_char: float = 0.2
+    """每个字符对应的音频时长"""
+    sample_format: str = "float32"
+    """GET / 返回的 WAV 采样格式："float32"（Kokoro）或 "int16"（IndexTTS-chaos）"""
+    error_rate: float = 0.0
+    """直接返回 HTTP 500 的请求比例"""
+    disconnect_rate: float = 0.0
+    """输出一半音频后断开连接的请求比例"""
+    stall_rate: float = 0.0
+    """返回响应头后一直不输出音频的请求比例，模拟卡死的后端"""
+    speaker_ttl: float = 0.0
+    """说话人模型超过该秒数未使用即被淘汰，0 表示不淘汰"""
+    speaker_load_ms: float = 0.0
+    """加载（或重新加载）说话人模型的耗时"""
+
+
+def _wav_header(
+    sample_rate: int,
+    num_channels: int = 1,
+    sample_format: str = "float32",
+    data_size: int | None = None,
+) -> bytes:
+    """data_size 为 None 时按流式输出，RIFF 与 data 长度写为 0xFFFFFFFF"""
+    float32 = sample_format == "float32"
+    sample_width = 4 if float32 else 2
+    block_align = num_channels * sample_width
+    if data_size is None:
+        riff_size = data_len = b"\xff\xff\xff\xff"
+    else:
+        riff_size = (36 + data_size).to_bytes(4, "little")
+        data_len = data_size.to_bytes(4, "little")
+    return (
+        b"RIFF"
+        + riff_size
+        + b"WAVE"
+        + b"fmt "
+        + (16).to_bytes(4, "little")
+        + (3 if float32 else 1).to_bytes(2, "little")
+        + num_channels.to_bytes(2, "little")
+        + sample_rate.to_bytes(4, "little")
+        + (sample_rate * block_align).to_bytes(4, "little")
+        + block_align.to_bytes(2, "little")
+        + (sample_width * 8).to_bytes(2, "little")
+        + b"data"
+        + data_len
+    )
+
+
+def _tone(num_samples: int, offset: int, sample_rate: int) -> np.ndarray:
+    t = (np.arange(num_samples) + offset) / sample_rate
+    return 0.3 * np.sin(2 * math.pi * 220 * t)
+
+
+def _encode(samples: np.ndarray, sample_format: str) -> bytes:
+    if sample_format == "float32":
+        return samples.astype("<f4").tobytes()
+    return (samples * 32767).astype("<i2").tobytes()
+
+
+# response_format -> (编码器, 封装格式, Content-Type)
+_COMPRESSED_FORMATS = {
+    "mp3": ("libmp3lame", "mp3", "audio/mpeg"),
+    "opus": ("libopus", "ogg", "audio/ogg"),
+}
+
+
+def _encode_compressed(samples: np.ndarray, response_format: str) -> bytes:
+    """把整段音频一次编码为 mp3 / Ogg Opus 文件，按时间比例切片流式输出"""
+    encoder, container, _ = _COMPRESSED_FORMATS[response_format]
+    pcm = (samples * 32767).astype("<i2").reshape(1, -1)
+    output = io.BytesIO()
+    with av.open(output, mode="w", format=container) as out:
+        stream = out.add_stream(encoder, rate=SAMPLE_RATE, layout="mono")
+        frame = av.AudioFrame.from_ndarray(pcm, format="s16", layout="mono")
+        frame.sample_rate = SAMPLE_RATE
+        for packet in stream.encode(frame):
+            out.mux(packet)
+        for packet in stream.encode(None):
+            out.mux(packet)
+    return output.getvalue()
+
+
+def create_app(config: FakeTTSConfig | None = None) -> web.Application:
+    config = config or FakeTTSConfig()
+    # 说话人 -> 最近一次使用的时间
+    speakers_used: dict[str, float] = {}
+
+    async def _load_speaker(speaker: str) -> None:
+        if not config.speaker_ttl:
+            return
+        now = time.monotonic()
+        last = speakers_used.get(speaker)
+        speakers_used[speaker] = now
+        if last is None or now - last > config.speaker_ttl:
+            await asyncio.sleep(config.speaker_load_ms / 1000)
+
+    async def _stream_audio(
+        request: web.Request,
+        text: str,
+        header: bytes | None,
+        sample_format: str,
+        *,
+        encoded: bytes | None = None,
+        content_type: str | None = None,
+    ) -> web.StreamResponse:
+        """encoded 不为 None 时按音频进度输出其对应比例的字节，代替 PCM 分片"""
+        if random.random() < config.error_rate:
+            await asyncio.sleep(config.first_chunk_ms / 1000)
+            return web.Response(status=500, text="injected error")
+
+        total = int(len(text) * config.seconds_per_char * SAMPLE_RATE)
+        chunk = max(1, int(config.chunk_ms / 1000 * SAMPLE_RATE))
+        disconnect_at = total // 2 if random.random() < config.disconnect_rate else None
+
+        if content_type is None:
+            content_type = "audio/wav" if header is not None else "audio/pcm"
+        response = web.StreamResponse(
+            headers={"Content-Type": content_type, "X-Request-Id": uuid.uuid4().hex}
+        )
+        await response.prepare(request)
+        if random.random() < config.stall_rate:
+            # 保持连接直到客户端超时断开
+            while request.transport is not None and not request.transport.is_closing():
+                await asyncio.sleep(0.1)
+            return response
+        await asyncio.sleep(config.first_chunk_ms / 1000)
+        if header is not None:
+            await response.write(header)
+
+        for offset in range(0, total, chunk):
+            if offset:
+                await asyncio.sleep(config.chunk_ms / 1000 * config.real_time_factor)
+            if disconnect_at is not None and offset >= disconnect_at:
+                request.transport.close()  # type: ignore[union-attr]
+                return response
+            end = min(offset + chunk, total)
+            if encoded is not None:
+                data = encoded[offset * len(encoded) // total : end * len(encoded) // total]
+            else:
+                data = _encode(_tone(end - offset, offset, SAMPLE_RATE), sample_format)
+            try:
+                await response.write(data)
+            except ConnectionResetError:
+                # 客户端拿到首帧后取消或超时断开
+                return response
+
+        await response.write_eof()
+        return response
+
+    async def kokoro(request: web.Request) -> web.StreamResponse:
+        query = request.query
+        text = query.get("text", "")
+        speakers = [query.get("speaker", "")]
+        # Kokoro 的英文和中文片段分别由 speaker_en 和 speaker_zh 合成
+        if "speaker_en" in query and any(c.isascii() and c.isalpha() for c in text):
+            speakers.append("en:" + query["speaker_en"])
+        if "speaker_zh" in query and any("\u4e00" <= c <= "\u9fff" for c in text):
+            speakers.append("zh:" + query["speaker_zh"])
+        await asyncio.gather(*(_load_speaker(speaker) for speaker in speakers))
+        header = _wav_header(SAMPLE_RATE, sample_format=config.sample_format)
+        return await _stream_audio(request, text, header, config.sample_format)
+
+    async def speech(request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        text = body.get("input", "")
+        await _load_speaker(body.get("voice", ""))
+        response_format = body.get("response_format", "wav")
+        if response_format in _COMPRESSED_FORMATS:
+            total = int(len(text) * config.seconds_per_char * SAMPLE_RATE)
+            encoded = await asyncio.to_thread(
+                _encode_compressed, _tone(total, 0, SAMPLE_RATE), response_format
+            )
+            return await _stream_audio(
+                request,
+                text,
+                None,
+                "int16",
+                encoded=encoded,
+                content_type=_COMPRESSED_FORMATS[response_format][2],
+            )
+        if response_format not in ("wav", "pcm"):
+            return web.Response(
+                status=400, text=f"unsupported response_format: {response_format}"
+            )
+
+        header = None
+        if response_format == "wav":
+            total = int(len(text) * config.seconds_per_char * SAMPLE_RATE)
+            header = _wav_header(SAMPLE_RATE, sample_format="int16", data_size=total * 2)
+        return await _stream_audio(request, text, header, "int16")
+
+    async def health(request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok"})
+
+    app = web.Application()
+    app.router.add_get("/", kokoro)
+    app.router.add_post("/audio/speech", speech)
+    app.router.add_get("/health", health)
+    return app
+
+
+async def start(
+    config: FakeTTSConfig | None = None, host: str = "127.0.0.1", port: int = 0
+) -> tuple[web.AppRunner, str]:
+    """在当前事件循环中启动替身服务，返回 (runner, base_url)"""
+    runner = web.AppRunner(create_app(config))
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+    return runner, f"http://{host}:{bound_port}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake local TTS server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9880)
+    parser.add_argument("--first-chunk-ms", type=float, default=150.0)
+    parser.add_argument("--real-time-factor", type=float, default=0.2)
+    parser.add_argument("--chunk-ms", type=float, default=100.0)
+    parser.add_argument("--sample-format", choices=["float32", "int16"], default="float32")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--disconnect-rate", type=float, default=0.0)
+    parser.add_argument("--stall-rate", type=float, default=0.0)
+    parser.add_argument("--speaker-ttl", type=float, default=0.0)
+    parser.add_argument("--speaker-load-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = FakeTTSConfig(
+        first_chunk_ms=args.first_chunk_ms,
+        real_time_factor=args.real_time_factor,
+        chunk_ms=args.chunk_ms,
+        sample_format=args.sample_format,
+        error_rate=args.error_rate,
+        disconnect_rate=args.disconnect_rate,
+        stall_rate=args.stall_rate,
+        speaker_ttl=args.speaker_ttl,
+        speaker_load_ms=args.speaker_load_ms,
+    )
+    web.run_app(create_app(config), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
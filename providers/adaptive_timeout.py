@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import threading
+
+from . import worker_state
+from .histogram import WindowedHistogram
+
+DEFAULT_PERCENTILE = 0.99
+DEFAULT_HEADROOM = 1.5
+DEFAULT_FLOOR = 1.0
+
+
+class LatencyTracker:
+    """
+    单个后端、单种操作的延迟分布，用来推导请求超时。
+
+    延迟先按工作量归一化：除以 1 + size / reference_size（size 为文本字数或
+    音频秒数），超时 = 分位数 × 当前请求的工作量系数 × headroom，限制在
+    floor~ceiling 之间。样本不足 min_samples 时直接使用 ceiling。
+
+    超时的请求不计入分布：卡死请求的比例一旦超过 1 - percentile，按超时值记录
+    会把分位数一路推到 ceiling。为了在后端整体变慢时不会一直失败，连续超时
+    max_timeouts 次后下一个请求改用 ceiling，成功后按新的延迟重新收紧。
+
+    给定 shared_key 时样本同时记录到 worker 主进程（见 worker_state），创建时先载入
+    worker 中该 key 最近的样本：默认的进程执行器中每个通话一个进程，只靠本进程的
+    样本很少能在通话结束前攒够 min_samples。
+    """
+
+    def __init__(
+        self,
+        *,
+        reference_size: float = 1.0,
+        percentile: float = DEFAULT_PERCENTILE,
+        headroom: float = DEFAULT_HEADROOM,
+        floor: float = DEFAULT_FLOOR,
+        min_samples: int = 20,
+        max_timeouts: int = 3,
+        window: int = 500,
+        shared_key: str | None = None,
+    ) -> None:
+        self._reference_size = reference_size
+        self._percentile = percentile
+        self._headroom = headroom
+        self._floor = floor
+        self._min_samples = min_samples
+        self._max_timeouts = max_timeouts
+        self._consecutive_timeouts = 0
+        self._latency = WindowedHistogram(window=window)
+        self._shared_key = shared_key
+        if shared_key is not None:
+            for value in worker_state.history("latency", shared_key, 2 * window):
+                self._latency.record(value)
+
+    def _scale(self, size: float) -> float:
+        return 1.0 + max(size, 0.0) / self._reference_size
+
+    def record(self, latency: float, size: float = 0.0) -> None:
+        self._consecutive_timeouts = 0
+        normalized = latency / self._scale(size)
+        self._latency.record(normalized)
+        if self._shared_key is not None:
+            worker_state.append("latency", self._shared_key, normalized)
+
+    def record_timeout(self) -> None:
+        self._consecutive_timeouts += 1
+
+    def timeout(self, size: float = 0.0, *, ceiling: float) -> float:
+        if self._consecutive_timeouts >= self._max_timeouts:
+            return ceiling
+        recent = self._latency.snapshot()
+        if recent.count < self._min_samples:
+            return ceiling
+        timeout = recent.percentile(self._percentile) * self._scale(size) * self._headroom
+        return min(max(timeout, self._floor), ceiling)
+
+
+# (后端, 操作) -> 进程级共享的延迟分布。session 通常很短，同一后端的所有 provider
+# 实例共用历史样本；worker_state.listen() 之后同一 worker 的各 job 进程也共用
+_trackers: dict[tuple[str, str], LatencyTracker] = {}
+_lock = threading.Lock()
+
+
+def tracker(backend: str, operation: str, **kwargs: float) -> LatencyTracker:
+    """获取 (backend, operation) 对应的共享 LatencyTracker，首次调用时按 kwargs 创建"""
+    key = (backend, operation)
+    with _lock:
+        if (existing := _trackers.get(key)) is None:
+            existing = _trackers[key] = LatencyTracker(
+                shared_key=f"{backend} {operation}", **kwargs
+            )
+        return existing
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import io
+import threading
+from typing import Literal
+
+import av
+import numpy as np
+
+UploadCodec = Literal["pcm", "flac", "opus"]
+
+# 编码器名称与封装格式；Opus 使用 Ogg 封装，DashScope 按 data URL 的 MIME 识别格式
+_ENCODERS: dict[str, tuple[str, str]] = {
+    "flac": ("flac", "flac"),
+    "opus": ("libopus", "ogg"),
+}
+
+# 编码耗时（秒/音频秒）与压缩比（相对 PCM16）的初始估计，首次编码后由实测值替换
+_INITIAL_ENCODE_COST = {"pcm": 0.0, "flac": 0.002, "opus": 0.015}
+_INITIAL_SIZE_RATIO = {"pcm": 1.0, "flac": 0.6}
+
+# 小于该大小的请求体基本落在内核发送缓冲区内，测不出真实上行带宽
+_MIN_BANDWIDTH_SAMPLE_BYTES = 256 * 1024
+
+
+def data_url_prefix(codec: UploadCodec, sample_rate: int) -> str:
+    """音频 data URL 中 base64 之前的部分"""
+    if codec == "flac":
+        return "data:audio/flac;base64,"
+    if codec == "opus":
+        return "data:audio/ogg;base64,"
+    return f"data:audio/pcm;rate={sample_rate};base64,"
+
+
+def encode(
+    pcm: bytes | bytearray | memoryview,
+    codec: UploadCodec,
+    *,
+    sample_rate: int,
+    num_channels: int = 1,
+    bitrate: int = 24000,
+) -> bytes:
+    """
+    把 PCM16 编码为 FLAC 或 Ogg/Opus 文件，codec 为 "pcm" 时原样返回。
+
+    编码是 CPU 密集的同步调用（Opus 约为音频时长的 1.5%），应放在线程中执行。
+    """
+    if codec == "pcm":
+        return bytes(pcm)
+
+    encoder, container = _ENCODERS[codec]
+    layout = "mono" if num_channels == 1 else "stereo"
+    samples = np.frombuffer(pcm, dtype="<i2").reshape(1, -1)
+
+    output = io.BytesIO()
+    with av.open(output, mode="w", format=container) as out:
+        stream = out.add_stream(encoder, rate=sample_rate, layout=layout)
+        if codec == "opus":
+            stream.bit_rate = bitrate
+
+        # s16 为交错格式，多声道时所有采样都在同一行
+        frame = av.AudioFrame.from_ndarray(samples, format="s16", layout=layout)
+        frame.sample_rate = sample_rate
+        for packet in stream.encode(frame):
+            out.mux(packet)
+        for packet in stream.encode(None):
+            out.mux(packet)
+
+    return output.getvalue()
+
+
+def decode(data: bytes, *, sample_rate: int, num_channels: int = 1) -> bytes:
+    """把任意 PyAV 支持的音频文件解码并重采样为 PCM16"""
+    layout = "mono" if num_channels == 1 else "stereo"
+    resampler = av.AudioResampler(format="s16", layout=layout, rate=sample_rate)
+    chunks: list[bytes] = []
+    with av.open(io.BytesIO(data)) as container:
+        for frame in container.decode(audio=0):
+            for resampled in resampler.resample(frame):
+                chunks.append(resampled.to_ndarray().tobytes())
+    for resampled in resampler.resample(None):
+        chunks.append(resampled.to_ndarray().tobytes())
+    return b"".join(chunks)
+
+
+class CodecSelector:
+    """
+    按语音时长和实测上行带宽选择上传编码，线程安全。
+
+    预计耗时 = 编码耗时 + 上传字节数 / 上行带宽，取最小者：
+    - 短语音（小于 min_duration）的请求体本身很小，直接上传 PCM；
+    - 还没有带宽数据时默认选 FLAC（无损、编码开销可忽略）；
+    - Opus 是有损编码，仅在带宽低于 opus_max_bandwidth 的受限链路上参与比较。
+
+    编码耗时和压缩比按 EWMA 跟踪实测值；带宽取发送大请求体时的吞吐，
+    也可以用 upload_bandwidth 显式指定。
+    """
+
+    def __init__(
+        self,
+        *,
+        min_duration: float = 2.0,
+        upload_bandwidth: float | None = None,
+        opus_max_bandwidth: float = 64 * 1024,
+        opus_bitrate: int = 24000,
+        sample_rate: int = 16000,
+        alpha: float = 0.3,
+    ) -> None:
+        self._min_duration = min_duration
+        self._fixed_bandwidth = upload_bandwidth
+        self._opus_max_bandwidth = opus_max_bandwidth
+        self._alpha = alpha
+        self._bandwidth: float | None = None
+        self._encode_cost = dict(_INITIAL_ENCODE_COST)
+        self._size_ratio = dict(_INITIAL_SIZE_RATIO)
+        # Opus 为恒定码率，压缩比由码率直接决定
+        self._size_ratio["opus"] = opus_bitrate / 8 / (sample_rate * 2)
+        self._lock = threading.Lock()
+
+    @property
+    def bandwidth(self) -> float | None:
+        """上行带宽估计（字节/秒）"""
+        return self._fixed_bandwidth or self._bandwidth
+
+    def _ewma(self, old: float | None, new: float) -> float:
+        if old is None:
+            return new
+        return old + self._alpha * (new - old)
+
+    def record_upload(self, num_bytes: int, seconds: float) -> None:
+        if num_bytes < _MIN_BANDWIDTH_SAMPLE_BYTES or seconds <= 0:
+            return
+        with self._lock:
+            self._bandwidth = self._ewma(self._bandwidth, num_bytes / seconds)
+
+    def record_encode(
+        self, codec: UploadCodec, audio_duration: float, seconds: float, ratio: float
+    ) -> None:
+        if codec == "pcm" or audio_duration <= 0:
+            return
+        with self._lock:
+            self._encode_cost[codec] = self._ewma(
+                self._encode_cost[codec], seconds / audio_duration
+            )
+            self._size_ratio[codec] = self._ewma(self._size_ratio[codec], ratio)
+
+    def estimate(
+        self, codec: UploadCodec, audio_duration: float, pcm_bytes: int
+    ) -> float | None:
+        """预计的编码加上传耗时（秒），没有带宽数据时返回 None"""
+        bandwidth = self.bandwidth
+        if not bandwidth:
+            return None
+        return (
+            self._encode_cost[codec] * audio_duration
+            + self._size_ratio[codec] * pcm_bytes / bandwidth
+        )
+
+    def choose(self, audio_duration: float, pcm_bytes: int) -> UploadCodec:
+        if audio_duration < self._min_duration:
+            return "pcm"
+
+        bandwidth = self.bandwidth
+        if not bandwidth:
+            return "flac"
+
+        candidates: list[UploadCodec] = ["pcm", "flac"]
+        if bandwidth < self._opus_max_bandwidth:
+            candidates.append("opus")
+        return min(
+            candidates,
+            key=lambda codec: self.estimate(codec, audio_duration, pcm_bytes) or 0.0,
+        )
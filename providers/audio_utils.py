@@ -0,0 +1,497 @@
+from __future__ import annotations
+
+import base64
+from collections.abc import Iterable, Iterator, Sequence
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from livekit.agents import tts
+
+FLOAT32_SAMPLE_BYTES = 4
+PCM16_MAX = 32767
+
+# 增量 base64 每次编码的原始字节数，必须是 3 的整数倍
+BASE64_CHUNK_BYTES = 48 * 1024
+
+
+def float32_to_pcm16(data: bytes | bytearray | memoryview) -> bytes:
+    """
+    把小端 float32 采样批量转换为 PCM16。
+
+    超出 [-1.0, 1.0] 的采样会被截断，长度必须是 4 的整数倍。
+    """
+    samples = np.frombuffer(data, dtype="<f4")
+    clipped = np.clip(samples, -1.0, 1.0)
+    clipped *= PCM16_MAX
+    return clipped.astype("<i2").tobytes()
+
+
+class Float32ToPCM16Converter:
+    """
+    增量式 float32 → PCM16 转换器。
+
+    网络分片的边界不一定落在采样边界上，不足 4 字节的尾部会暂存，
+    与下一个分片拼接后再转换。
+    """
+
+    def __init__(self) -> None:
+        self._carry = b""
+
+    @property
+    def pending_bytes(self) -> int:
+        return len(self._carry)
+
+    def convert(self, chunk: bytes | bytearray | memoryview) -> bytes:
+        if self._carry:
+            chunk = self._carry + bytes(chunk)
+            self._carry = b""
+
+        usable = len(chunk) - len(chunk) % FLOAT32_SAMPLE_BYTES
+        if usable < len(chunk):
+            self._carry = bytes(chunk[usable:])
+        if not usable:
+            return b""
+
+        return float32_to_pcm16(memoryview(chunk)[:usable])
+
+    def reset(self) -> None:
+        """丢弃残留的不完整采样"""
+        self._carry = b""
+
+
+def base64_encoded_len(num_bytes: int) -> int:
+    return (num_bytes + 2) // 3 * 4
+
+
+def iter_base64(
+    chunks: Iterable[bytes | bytearray | memoryview],
+    *,
+    chunk_bytes: int = BASE64_CHUNK_BYTES,
+) -> Iterator[bytes]:
+    """
+    对一串缓冲区做增量 base64 编码，输出拼接后与一次性编码整体结果相同。
+
+    大缓冲区按 chunk_bytes 直接从 memoryview 切片编码；小缓冲区（如 20ms 音频帧）
+    先攒进一个不超过 chunk_bytes 的暂存区。内存占用与输入总长度无关。
+    """
+    chunk_bytes -= chunk_bytes % 3
+    pending = bytearray()
+
+    for chunk in chunks:
+        view = memoryview(chunk).cast("B")
+        if pending:
+            take = min(len(view), chunk_bytes - len(pending))
+            pending += view[:take]
+            view = view[take:]
+            if len(pending) < chunk_bytes:
+                continue
+            yield base64.b64encode(pending)
+            pending.clear()
+
+        aligned = len(view) - len(view) % chunk_bytes
+        for start in range(0, aligned, chunk_bytes):
+            yield base64.b64encode(view[start : start + chunk_bytes])
+        pending += view[aligned:]
+
+    if pending:
+        yield base64.b64encode(pending)
+
+
+def downmix_pcm16(samples: np.ndarray, num_channels: int) -> np.ndarray:
+    """把交错的多声道 PCM16 取平均混为单声道"""
+    if num_channels == 1:
+        return samples
+    mixed = samples.reshape(-1, num_channels).sum(axis=1, dtype=np.int32)
+    return (mixed // num_channels).astype(np.int16)
+
+
+def _window_energy(chunk: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray]:
+    """返回分块内各窗口的起始下标与平均幅度，最后一个窗口可能不足 window"""
+    starts = np.arange(0, len(chunk), window)
+    sums = np.add.reduceat(np.abs(chunk.astype(np.int32)), starts)
+    sizes = np.diff(np.append(starts, len(chunk)))
+    return starts, sums / sizes
+
+
+def trim_silence(
+    chunks: Sequence[np.ndarray],
+    sample_rate: int,
+    *,
+    threshold: float,
+    num_channels: int = 1,
+    window_ms: int = 10,
+    padding_ms: int = 200,
+) -> list[np.ndarray]:
+    """
+    去掉首尾平均幅度低于 threshold 的静音，两端各保留 padding_ms 的余量。
+
+    输入为交错的 PCM16 分块（如各音频帧的视图，每块都包含完整的采样点），
+    只从两端向内扫描到第一个有声窗口为止，开销与静音长度而非总时长成正比；
+    返回原分块的切片视图，不复制采样。没有任何窗口超过阈值时原样返回，
+    避免阈值设置不当时丢掉整段语音。
+    """
+    window = max(1, sample_rate * window_ms // 1000) * num_channels
+    offsets = np.cumsum([0] + [len(chunk) for chunk in chunks])
+    total = int(offsets[-1])
+
+    first: int | None = None
+    for i, chunk in enumerate(chunks):
+        if len(chunk):
+            starts, energy = _window_energy(chunk, window)
+            voiced = np.flatnonzero(energy > threshold)
+            if voiced.size:
+                first = int(offsets[i] + starts[voiced[0]])
+                break
+    if first is None:
+        return list(chunks)
+
+    last = total
+    for i in range(len(chunks) - 1, -1, -1):
+        chunk = chunks[i]
+        if len(chunk):
+            starts, energy = _window_energy(chunk, window)
+            voiced = np.flatnonzero(energy > threshold)
+            if voiced.size:
+                last = int(offsets[i] + min(starts[voiced[-1]] + window, len(chunk)))
+                break
+
+    padding = sample_rate * padding_ms // 1000 * num_channels
+    start = max(0, first - padding)
+    end = min(total, last + padding)
+
+    trimmed = []
+    for chunk, offset in zip(chunks, offsets):
+        position = int(offset)
+        lo = max(start, position)
+        hi = min(end, position + len(chunk))
+        if lo < hi:
+            trimmed.append(chunk[lo - position : hi - position])
+    return trimmed
+
+
+# 推送给 AudioEmitter 的 PCM 帧时长。AudioEmitter 默认按 200ms 重新分帧，
+# 且总是压着一帧等下一帧到达后才输出，帧越长首帧音频越晚
+DEFAULT_FRAME_MS = 20
+
+
+class PCMFramer:
+    """
+    把任意大小的 PCM16 数据切成固定时长的帧，再逐帧推送给 AudioEmitter。
+
+    不足一帧的尾部暂存在预分配的单帧缓冲区中，整帧直接从输入切片复制，每帧只分配
+    一次（入队的 bytes）。AudioEmitter 初始化时传入相同的 frame_size_ms，其内部的
+    AudioByteStream 每次 push 恰好产出一帧，不会再对大块数据反复切片复制。
+    """
+
+    def __init__(
+        self,
+        *,
+        sample_rate: int,
+        num_channels: int = 1,
+        frame_ms: int = DEFAULT_FRAME_MS,
+    ) -> None:
+        # 与 AudioEmitter 计算帧长的方式一致
+        samples_per_channel = sample_rate // 1000 * frame_ms
+        self.frame_ms = frame_ms
+        self.frame_bytes = samples_per_channel * num_channels * 2
+        self.frames = 0
+        self._pending = bytearray(self.frame_bytes)
+        self._pending_len = 0
+
+    def push(self, data: bytes | bytearray | memoryview) -> list[bytes]:
+        view = memoryview(data).cast("B")
+        frames: list[bytes] = []
+
+        if self._pending_len:
+            take = min(len(view), self.frame_bytes - self._pending_len)
+            self._pending[self._pending_len : self._pending_len + take] = view[:take]
+            self._pending_len += take
+            view = view[take:]
+            if self._pending_len < self.frame_bytes:
+                return frames
+            frames.append(bytes(self._pending))
+            self._pending_len = 0
+
+        whole = len(view) - len(view) % self.frame_bytes
+        for i in range(0, whole, self.frame_bytes):
+            frames.append(view[i : i + self.frame_bytes].tobytes())
+        rest = len(view) - whole
+        self._pending[:rest] = view[whole:]
+        self._pending_len = rest
+
+        self.frames += len(frames)
+        return frames
+
+    def flush(self) -> bytes | None:
+        """输出剩余数据，末尾补静音凑满一帧（不超过 frame_ms）"""
+        if not self._pending_len:
+            return None
+        self._pending[self._pending_len :] = bytes(self.frame_bytes - self._pending_len)
+        self._pending_len = 0
+        self.frames += 1
+        return bytes(self._pending)
+
+
+class FramedEmitter:
+    """
+    AudioEmitter 的包装：mime_type 为 audio/pcm 时经 PCMFramer 按固定帧长推送，
+    其余格式（由 AudioEmitter 自行解码）原样透传。flush / end_segment 前先推送补齐的尾帧。
+    """
+
+    def __init__(
+        self, emitter: tts.AudioEmitter, *, frame_ms: int = DEFAULT_FRAME_MS
+    ) -> None:
+        self._emitter = emitter
+        self._frame_ms = frame_ms
+        self.framer: PCMFramer | None = None
+
+    def initialize(
+        self,
+        *,
+        request_id: str,
+        sample_rate: int,
+        num_channels: int,
+        mime_type: str,
+        stream: bool = False,
+    ) -> None:
+        if mime_type != "audio/pcm":
+            # 压缩格式保持 AudioEmitter 默认帧长：音频慢于实时时它会定时 flush，
+            # flush 会结束当前解码器，帧越短越容易在句中触发，后续数据无法再解码
+            self._emitter.initialize(
+                request_id=request_id,
+                sample_rate=sample_rate,
+                num_channels=num_channels,
+                mime_type=mime_type,
+                stream=stream,
+            )
+            return
+
+        self.framer = PCMFramer(
+            sample_rate=sample_rate, num_channels=num_channels, frame_ms=self._frame_ms
+        )
+        self._emitter.initialize(
+            request_id=request_id,
+            sample_rate=sample_rate,
+            num_channels=num_channels,
+            mime_type=mime_type,
+            frame_size_ms=self._frame_ms,
+            stream=stream,
+        )
+
+    def push(self, data: bytes | bytearray | memoryview) -> None:
+        if self.framer is None:
+            self._emitter.push(bytes(data))
+            return
+        for frame in self.framer.push(data):
+            self._emitter.push(frame)
+
+    def _push_tail(self) -> None:
+        if self.framer is not None and (tail := self.framer.flush()):
+            self._emitter.push(tail)
+
+    def start_segment(self, *, segment_id: str) -> None:
+        self._emitter.start_segment(segment_id=segment_id)
+
+    def end_segment(self) -> None:
+        self._push_tail()
+        self._emitter.end_segment()
+
+    def flush(self) -> None:
+        self._push_tail()
+        self._emitter.flush()
+
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# 流式服务在写出头部时还不知道总长度，data 块长度会写成 0 或 0xFFFFFFFF
+_UNBOUNDED_SIZES = (0, 0xFFFFFFFF)
+
+
+class WavStreamParser:
+    """
+    增量式 RIFF/WAVE 解析器。
+
+    从最先到达的字节中找到 fmt / data 块，之后每个网络分片都直接返回可推送的 PCM16：
+    float32 数据会被转换，PCM16 原样透传。不支持的编码进入透传模式，返回原始字节
+    交给 AudioEmitter 自行解码（mime_type 为 audio/wav）。
+
+    不是 RIFF/WAVE 的数据（如带 ID3 头的 MP3、不足一个头部的短响应）同样透传，
+    mime_type 取 fallback_mime_type（通常为后端响应的 Content-Type）；未提供时为 None，
+    调用方应把它当作错误，而不是按 WAV 解码。
+    """
+
+    _RIFF_HEADER = 0
+    _CHUNK_HEADER = 1
+    _FMT = 2
+    _SKIP = 3
+    _DATA = 4
+    _PASSTHROUGH = 5
+
+    def __init__(
+        self,
+        *,
+        sample_rate: int,
+        num_channels: int,
+        fallback_mime_type: str | None = None,
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.num_channels = num_channels
+        self.fallback_mime_type = fallback_mime_type
+        self.audio_format: int | None = None
+        self.bits_per_sample: int | None = None
+
+        self._state = self._RIFF_HEADER
+        self._buf = bytearray()
+        self._needed = 12
+        self._chunk_size = 0
+        # data 块剩余字节数，None 表示长度未知（读到流结束）
+        self._data_remaining: int | None = None
+        self._converter: Float32ToPCM16Converter | None = None
+        self._data_seen = False
+        self._riff = False
+
+    @property
+    def ready(self) -> bool:
+        """是否已确定音频参数，可以初始化 AudioEmitter"""
+        return self._data_seen or self._state == self._PASSTHROUGH
+
+    @property
+    def mime_type(self) -> str | None:
+        if self._state != self._PASSTHROUGH:
+            return "audio/pcm"
+        return "audio/wav" if self._riff else self.fallback_mime_type
+
+    def feed(self, chunk: bytes | bytearray | memoryview) -> bytes:
+        if self._state == self._PASSTHROUGH:
+            return bytes(chunk)
+
+        self._buf += chunk
+        out = bytearray()
+
+        while True:
+            if self._state == self._DATA:
+                out += self._take_data()
+                if self._state == self._DATA:
+                    break
+                continue
+
+            if self._state == self._PASSTHROUGH:
+                out += self._buf
+                self._buf.clear()
+                break
+
+            if len(self._buf) < self._needed:
+                break
+
+            if self._state == self._RIFF_HEADER:
+                if self._buf[:4] != b"RIFF" or self._buf[8:12] != b"WAVE":
+                    self._state = self._PASSTHROUGH
+                    continue
+                self._riff = True
+                del self._buf[:12]
+                self._expect_chunk_header()
+            elif self._state == self._CHUNK_HEADER:
+                chunk_id = bytes(self._buf[:4])
+                self._chunk_size = int.from_bytes(self._buf[4:8], "little")
+                del self._buf[:8]
+                if chunk_id == b"fmt ":
+                    self._state = self._FMT
+                    self._needed = self._chunk_size + (self._chunk_size & 1)
+                elif chunk_id == b"data":
+                    self._start_data()
+                else:
+                    # chunk 数据按偶数字节对齐
+                    self._state = self._SKIP
+                    self._needed = self._chunk_size + (self._chunk_size & 1)
+            elif self._state == self._FMT:
+                self._parse_fmt(bytes(self._buf[: self._chunk_size]))
+                del self._buf[: self._needed]
+                self._expect_chunk_header()
+            elif self._state == self._SKIP:
+                del self._buf[: self._needed]
+                self._expect_chunk_header()
+
+        return bytes(out)
+
+    def flush(self) -> bytes:
+        """
+        流结束时调用。头部始终没有解析完时按透传处理，返回缓存的原始字节；
+        连 RIFF 头都不完整的响应按非 WAV 数据处理（见 mime_type）。
+        """
+        if self.ready:
+            if self._converter:
+                self._converter.reset()
+            return b""
+
+        self._state = self._PASSTHROUGH
+        out = bytes(self._buf)
+        self._buf.clear()
+        return out
+
+    def _expect_chunk_header(self) -> None:
+        self._state = self._CHUNK_HEADER
+        self._needed = 8
+
+    def _parse_fmt(self, fmt: bytes) -> None:
+        if len(fmt) < 16:
+            return
+        self.audio_format = int.from_bytes(fmt[0:2], "little")
+        self.num_channels = int.from_bytes(fmt[2:4], "little")
+        self.sample_rate = int.from_bytes(fmt[4:8], "little")
+        self.bits_per_sample = int.from_bytes(fmt[14:16], "little")
+        if self.audio_format == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+            # SubFormat GUID 的前两个字节即实际编码
+            self.audio_format = int.from_bytes(fmt[24:26], "little")
+
+    def _start_data(self) -> None:
+        if (self.audio_format, self.bits_per_sample) == (WAVE_FORMAT_IEEE_FLOAT, 32):
+            self._converter = Float32ToPCM16Converter()
+        elif (self.audio_format, self.bits_per_sample) != (WAVE_FORMAT_PCM, 16):
+            # 不支持的编码（或缺少 fmt 块）：重新拼出头部，交给下游解码
+            self._state = self._PASSTHROUGH
+            self._buf[:0] = self._rebuild_header()
+            return
+
+        self._state = self._DATA
+        self._data_seen = True
+        self._data_remaining = (
+            None if self._chunk_size in _UNBOUNDED_SIZES else self._chunk_size
+        )
+
+    def _rebuild_header(self) -> bytes:
+        fmt = b""
+        if self.audio_format is not None and self.bits_per_sample is not None:
+            block_align = self.num_channels * self.bits_per_sample // 8
+            fmt = (
+                b"fmt "
+                + (16).to_bytes(4, "little")
+                + self.audio_format.to_bytes(2, "little")
+                + self.num_channels.to_bytes(2, "little")
+                + self.sample_rate.to_bytes(4, "little")
+                + (self.sample_rate * block_align).to_bytes(4, "little")
+                + block_align.to_bytes(2, "little")
+                + self.bits_per_sample.to_bytes(2, "little")
+            )
+        data_header = b"data" + self._chunk_size.to_bytes(4, "little")
+        return b"RIFF" + b"\xff\xff\xff\xff" + b"WAVE" + fmt + data_header
+
+    def _take_data(self) -> bytes:
+        if self._data_remaining is None:
+            payload = bytes(self._buf)
+            self._buf.clear()
+        else:
+            payload = bytes(self._buf[: self._data_remaining])
+            del self._buf[: len(payload)]
+            self._data_remaining -= len(payload)
+            if self._data_remaining == 0:
+                # 跳过对齐字节，data 块之后的其它块（如 LIST）忽略
+                self._state = self._SKIP
+                self._needed = self._chunk_size & 1
+
+        if self._converter:
+            return self._converter.convert(payload)
+        return payload
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+from livekit.agents.utils import aio
+
+from . import worker_state
+from .histogram import WindowedHistogram
+
+T = TypeVar("T")
+
+
+class HedgePolicy:
+    """
+    对冲请求的触发时机与预算。
+
+    延迟阈值取最近 window~2*window 个请求延迟的 percentile 分位数
+    （限制在 min_delay~max_delay 之间），
+    样本不足 min_samples 时使用 initial_delay。
+
+    预算是一个令牌桶：每个请求存入 budget 个令牌（上限 max_tokens），
+    每次对冲消耗 1 个，因此长期对冲比例不超过 budget，突发时最多连续对冲 max_tokens 次。
+
+    给定 shared_key（通常为主端点地址）时延迟同时记录到 worker 主进程（见 worker_state），
+    创建时先载入 worker 中该 key 最近的延迟，新通话不必先用 initial_delay 攒够 min_samples。
+    令牌桶同样放在 worker 中，对冲比例按 worker 的所有通话计算：每个通话只有十来个请求，
+    各自的令牌桶往往在遇到卡顿之前就被 p95 附近的普通请求用完。worker 不可用时使用本进程的令牌桶。
+    """
+
+    def __init__(
+        self,
+        *,
+        percentile: float = 0.95,
+        budget: float = 0.1,
+        min_delay: float = 0.2,
+        max_delay: float = 10.0,
+        initial_delay: float = 2.0,
+        min_samples: int = 20,
+        window: int = 500,
+        max_tokens: float = 10.0,
+        shared_key: str | None = None,
+    ) -> None:
+        self._percentile = percentile
+        self._budget = budget
+        self._min_delay = min_delay
+        self._max_delay = max_delay
+        self._initial_delay = initial_delay
+        self._min_samples = min_samples
+        self._max_tokens = max_tokens
+        self._tokens = max_tokens * budget
+        self._latency = WindowedHistogram(window=window)
+        self._lock = threading.Lock()
+        self._shared_key = shared_key
+        if shared_key is not None:
+            for latency in worker_state.history("hedge", shared_key, 2 * window):
+                self._latency.record(latency)
+
+    def record(self, latency: float) -> None:
+        self._latency.record(latency)
+        if self._shared_key is not None:
+            worker_state.append("hedge", self._shared_key, latency)
+
+    def delay(self) -> float:
+        """发出对冲请求前等待的时间"""
+        recent = self._latency.snapshot()
+        if recent.count < self._min_samples:
+            return self._initial_delay
+        delay = recent.percentile(self._percentile)
+        return min(max(delay, self._min_delay), self._max_delay)
+
+    def on_request(self) -> None:
+        with self._lock:
+            self._tokens = min(self._tokens + self._budget, self._max_tokens)
+        if self._shared_key is not None:
+            worker_state.deposit(
+                self._shared_key,
+                self._budget,
+                capacity=self._max_tokens,
+                initial=self._max_tokens * self._budget,
+            )
+
+    def try_acquire(self) -> bool:
+        """申请一次对冲，预算不足时返回 False"""
+        with self._lock:
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
+
+    async def acquire(self) -> bool:
+        """申请一次对冲：给定 shared_key 时从 worker 的令牌桶中扣除，worker 不可用时退回 try_acquire()"""
+        if self._shared_key is not None:
+            granted = await worker_state.withdraw(self._shared_key)
+            if granted is not None:
+                return granted
+        return self.try_acquire()
+
+
+async def hedged(
+    primary: Callable[[], Awaitable[T]],
+    hedge: Callable[[], Awaitable[T]],
+    *,
+    policy: HedgePolicy,
+) -> tuple[T, bool]:
+    """
+    先发出 primary，超过 policy.delay() 仍未完成且预算允许时再发出 hedge，
+    返回 (最先成功的结果, 是否来自 hedge)。
+
+    先完成的一方失败时继续等待另一方；都失败时抛出 primary 的异常。
+    胜出后另一方会被取消。primary 成功时的耗时计入 policy；被取消时只知道延迟
+    超过了对冲阈值，按阈值记录。若记录取消前实际等待的时间（含对冲请求的耗时），
+    分位数会被逐步推高，对冲越来越晚。
+    """
+    loop = asyncio.get_running_loop()
+    policy.on_request()
+    start = loop.time()
+    delay = policy.delay()
+
+    def _record(task: asyncio.Future[T]) -> None:
+        if task.cancelled():
+            policy.record(delay)
+        elif task.exception() is None:
+            policy.record(loop.time() - start)
+
+    primary_task = asyncio.ensure_future(primary())
+    primary_task.add_done_callback(_record)
+
+    try:
+        done, _ = await asyncio.wait({primary_task}, timeout=delay)
+        if done or not await policy.acquire():
+            return await primary_task, False
+
+        hedge_task = asyncio.ensure_future(hedge())
+        pending = {primary_task, hedge_task}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result(), task is hedge_task
+            # 两个请求都失败
+            return primary_task.result(), False
+        finally:
+            await aio.gracefully_cancel(hedge_task)
+    finally:
+        await aio.gracefully_cancel(primary_task)
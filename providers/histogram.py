@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import socket
+import threading
+from collections.abc import Iterator
+
+from prometheus_client.core import Metric
+from prometheus_client.registry import Collector
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+# 单条转发记录的最大字节数（指标名 + 值 + 标签的 JSON）
+_MAX_REPORT_BYTES = 4096
+
+
+class LogHistogram:
+    """
+    对数分桶直方图：每个二倍区间均分为 buckets_per_octave 个桶，
+    分位数的相对误差不超过半个桶宽（默认 8 桶/倍程约 4.4%）。
+
+    桶数量固定（默认 1e-4 到 1e3 共约 190 个计数器），记录为 O(1)，
+    适合在每个指标事件上调用。超出范围的值计入首尾两个桶。
+    """
+
+    def __init__(
+        self,
+        *,
+        min_value: float = 1e-4,
+        max_value: float = 1e3,
+        buckets_per_octave: int = 8,
+    ) -> None:
+        self._min_value = min_value
+        self._buckets_per_octave = buckets_per_octave
+        self._num_buckets = (
+            math.ceil(math.log2(max_value / min_value) * buckets_per_octave) + 1
+        )
+        self._counts = [0] * self._num_buckets
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _index(self, value: float) -> int:
+        if value <= self._min_value:
+            return 0
+        i = int(math.log2(value / self._min_value) * self._buckets_per_octave) + 1
+        return min(i, self._num_buckets - 1)
+
+    def _bucket_value(self, index: int) -> float:
+        """桶的几何中点"""
+        if index == 0:
+            return self._min_value
+        return self._min_value * 2 ** ((index - 0.5) / self._buckets_per_octave)
+
+    def record(self, value: float) -> None:
+        if value < 0 or math.isnan(value):
+            return
+        self._counts[self._index(value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        """q 取 0~1，没有样本时返回 0"""
+        if self.count == 0:
+            return 0.0
+
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for i, n in enumerate(self._counts):
+            seen += n
+            if seen >= rank:
+                return min(max(self._bucket_value(i), self.min), self.max)
+        return self.max
+
+    def merge(self, other: LogHistogram) -> None:
+        if (
+            other._num_buckets != self._num_buckets
+            or other._min_value != self._min_value
+            or other._buckets_per_octave != self._buckets_per_octave
+        ):
+            raise ValueError("cannot merge histograms with different bucket layouts")
+
+        for i, n in enumerate(other._counts):
+            self._counts[i] += n
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+
+class WindowedHistogram:
+    """
+    只反映最近样本的直方图，线程安全。
+
+    由两个轮换的 LogHistogram 组成：当前直方图满 window 个样本后替换上一个，
+    查询时合并两者，因此始终覆盖最近 window~2*window 个样本。
+    """
+
+    def __init__(self, *, window: int = 500, **hist_kwargs: float) -> None:
+        self._window = window
+        self._hist_kwargs = hist_kwargs
+        self._current = LogHistogram(**hist_kwargs)
+        self._previous = LogHistogram(**hist_kwargs)
+        self._lock = threading.Lock()
+
+    def record(self, value: float) -> None:
+        with self._lock:
+            self._current.record(value)
+            if self._current.count >= self._window:
+                self._previous = self._current
+                self._current = LogHistogram(**self._hist_kwargs)
+
+    def snapshot(self) -> LogHistogram:
+        merged = LogHistogram(**self._hist_kwargs)
+        with self._lock:
+            merged.merge(self._previous)
+            merged.merge(self._current)
+        return merged
+
+
+class HistogramStore(Collector):
+    """
+    按 (指标名, 标签) 聚合的直方图集合，线程安全。
+
+    实现了 prometheus_client 的 Collector 接口：注册到 prometheus_client.REGISTRY 后，
+    livekit worker 的 prometheus_port 端点会以 summary 格式输出 p50/p95/p99、_sum 和 _count。
+
+    job 以独立进程运行时，/metrics 只输出 worker 主进程的 REGISTRY。给定 report_env 后，
+    在主进程中调用 listen() 开始接收，并把地址写入该环境变量；之后启动的 job 进程中
+    observe() 除了本地记录外，还会经本机 UDP 把样本转发给主进程汇总。
+    """
+
+    def __init__(
+        self,
+        *,
+        quantiles: tuple[float, ...] = DEFAULT_QUANTILES,
+        min_value: float = 1e-4,
+        max_value: float = 1e3,
+        buckets_per_octave: int = 8,
+        report_env: str | None = None,
+    ) -> None:
+        self._quantiles = quantiles
+        self._hist_kwargs = dict(
+            min_value=min_value,
+            max_value=max_value,
+            buckets_per_octave=buckets_per_octave,
+        )
+        self._series: dict[str, dict[tuple[tuple[str, str], ...], LogHistogram]] = {}
+        self._help: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._report_env = report_env
+        self._listening = False
+        self._report_sock: socket.socket | None = None
+
+    def describe_metric(self, name: str, documentation: str) -> None:
+        self._help[name] = documentation
+
+    def listen(self) -> None:
+        """在 worker 主进程中接收 job 进程转发的样本，需要在 job 进程启动前调用"""
+        if self._report_env is None:
+            raise ValueError("listen() requires report_env")
+        if self._listening:
+            return
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(("127.0.0.1", 0))
+        host, port = sock.getsockname()
+        os.environ[self._report_env] = f"{host}:{port}"
+        self._listening = True
+        threading.Thread(
+            target=self._receive, args=(sock,), daemon=True, name="histogram_reports"
+        ).start()
+
+    def _receive(self, sock: socket.socket) -> None:
+        while True:
+            data = sock.recv(_MAX_REPORT_BYTES)
+            try:
+                name, value, labels = json.loads(data)
+                self._record(name, float(value), labels)
+            except (ValueError, TypeError):
+                logger.debug("dropping malformed histogram report", exc_info=True)
+
+    def _forward(self, name: str, value: float, labels: dict[str, str]) -> None:
+        if self._report_env is None or self._listening:
+            return
+        addr = os.environ.get(self._report_env)
+        if not addr:
+            return
+        host, port = addr.rsplit(":", 1)
+        if self._report_sock is None:
+            self._report_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._report_sock.setblocking(False)
+        try:
+            self._report_sock.sendto(
+                json.dumps([name, value, labels]).encode(), (host, int(port))
+            )
+        except OSError:
+            # 主进程已退出或缓冲区满，丢弃这个样本
+            pass
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        self._record(name, value, labels)
+        self._forward(name, value, labels)
+
+    def _record(self, name: str, value: float, labels: dict[str, str]) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = LogHistogram(**self._hist_kwargs)
+            hist.record(value)
+
+    def get(self, name: str, **labels: str) -> LogHistogram | None:
+        return self._series.get(name, {}).get(tuple(sorted(labels.items())))
+
+    def aggregate(self, name: str, **labels: str) -> LogHistogram:
+        """合并所有包含给定标签的序列，例如不区分 provider 的整体分布"""
+        merged = LogHistogram(**self._hist_kwargs)
+        with self._lock:
+            for key, hist in self._series.get(name, {}).items():
+                if all(item in key for item in labels.items()):
+                    merged.merge(hist)
+        return merged
+
+    def collect(self) -> Iterator[Metric]:
+        with self._lock:
+            for name, series in self._series.items():
+                metric = Metric(name, self._help.get(name, name), "summary")
+                for key, hist in series.items():
+                    labels = dict(key)
+                    for q in self._quantiles:
+                        metric.add_sample(
+                            name, {**labels, "quantile": str(q)}, hist.percentile(q)
+                        )
+                    metric.add_sample(f"{name}_count", labels, hist.count)
+                    metric.add_sample(f"{name}_sum", labels, hist.sum)
+                yield metric
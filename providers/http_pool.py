@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import math
+import threading
+import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+import httpx
+
+DEFAULT_TIMEOUT = httpx.Timeout(connect=15.0, read=30.0, write=5.0, pool=5.0)
+DEFAULT_LIMITS = httpx.Limits(
+    max_connections=50, max_keepalive_connections=50, keepalive_expiry=120
+)
+
+# httpx 的 HTTP/2 支持依赖 h2 包，项目依赖中不包含，需要时另行安装 httpx[http2]；
+# 未安装时使用 HTTP/1.1 长连接
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+@dataclass
+class PoolStats:
+    origin: str
+    http2: bool
+    refcount: int
+    requests_total: int
+    connections: int
+    idle_connections: int
+    in_flight_requests: int
+
+    @property
+    def utilization(self) -> float:
+        """活跃连接占连接池上限的比例"""
+        max_connections = DEFAULT_LIMITS.max_connections or 0
+        active = self.connections - self.idle_connections
+        return active / max_connections if max_connections else 0.0
+
+
+@dataclass
+class _PooledClient:
+    client: httpx.AsyncClient
+    origin: str
+    http2: bool
+    refcount: int = 0
+    requests_total: int = 0
+    last_request_at: float | None = None
+
+
+# (origin, 事件循环或线程) -> 共享客户端。AsyncClient 绑定在创建它的事件循环上，
+# 线程模式的 worker 中不同 job 的事件循环不能共用连接
+_clients: dict[tuple[str, tuple[str, int]], _PooledClient] = {}
+_by_client: dict[int, tuple[str, tuple[str, int]]] = {}
+
+
+def _origin(base_url: str) -> str:
+    parts = urlsplit(base_url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _loop_scope() -> tuple[str, int]:
+    # prewarm 在 job 的事件循环创建之前、于同一线程中运行，此时按线程区分：
+    # 之后该线程上的 job 循环使用这里创建的客户端，其他线程的 job 不会拿到它
+    try:
+        return ("loop", id(asyncio.get_running_loop()))
+    except RuntimeError:
+        return ("thread", threading.get_ident())
+
+
+def acquire_client(base_url: str) -> httpx.AsyncClient:
+    """
+    获取 base_url 所在源站的共享 httpx.AsyncClient，引用计数加一。
+
+    客户端按事件循环共享：同一个 job 中访问同一源站的 provider（如 FailoverTTS 的
+    多个后端、对冲请求）共用一个连接池，长连接在通话的各轮请求之间复用。
+    默认的进程执行器中每个通话独占一个进程，连接不会跨通话复用。
+    https 源站在另行安装了 h2 时使用 HTTP/2。用完后必须调用 release_client()。
+    """
+    origin = _origin(base_url)
+    key = (origin, _loop_scope())
+
+    pooled = _clients.get(key)
+    if pooled is None or pooled.client.is_closed:
+        http2 = HTTP2_AVAILABLE and origin.startswith("https://")
+
+        async def _count_request(request: httpx.Request) -> None:
+            if counted := _clients.get(key):
+                counted.requests_total += 1
+                counted.last_request_at = time.monotonic()
+
+        client = httpx.AsyncClient(
+            timeout=DEFAULT_TIMEOUT,
+            follow_redirects=True,
+            limits=DEFAULT_LIMITS,
+            http2=http2,
+            event_hooks={"request": [_count_request]},
+        )
+        pooled = _PooledClient(client=client, origin=origin, http2=http2)
+        _clients[key] = pooled
+        _by_client[id(client)] = key
+
+    pooled.refcount += 1
+    return pooled.client
+
+
+def idle_seconds(client: httpx.AsyncClient) -> float:
+    """共享客户端距上一次发起请求的秒数，从未发起过请求或不是共享客户端时为 inf"""
+    key = _by_client.get(id(client))
+    pooled = _clients.get(key) if key else None
+    if pooled is None or pooled.last_request_at is None:
+        return math.inf
+    return time.monotonic() - pooled.last_request_at
+
+
+async def release_client(client: httpx.AsyncClient) -> None:
+    """引用计数减一，最后一个使用者释放时关闭连接池"""
+    key = _by_client.get(id(client))
+    pooled = _clients.get(key) if key else None
+    if pooled is None or pooled.client is not client:
+        # 非共享客户端，直接关闭
+        await client.aclose()
+        return
+
+    pooled.refcount -= 1
+    if pooled.refcount <= 0:
+        del _clients[key]
+        del _by_client[id(client)]
+        await client.aclose()
+
+
+def pool_stats() -> list[PoolStats]:
+    stats = []
+    for pooled in _clients.values():
+        # httpcore 没有公开连接池统计，这里读取其内部状态，取不到时记为 0
+        pool = getattr(pooled.client._transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        stats.append(
+            PoolStats(
+                origin=pooled.origin,
+                http2=pooled.http2,
+                refcount=pooled.refcount,
+                requests_total=pooled.requests_total,
+                connections=len(connections),
+                idle_connections=sum(1 for c in connections if c.is_idle()),
+                in_flight_requests=len(getattr(pool, "_requests", [])),
+            )
+        )
+    return stats
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import time
+from abc import ABC, abstractmethod
+
+import httpx
+
+from livekit.agents import (
+    APIConnectionError,
+    APIError,
+    APIStatusError,
+    APITimeoutError,
+    tts,
+    utils,
+)
+
+from . import http_pool, keep_warm, worker_load
+from .audio_utils import FramedEmitter, WavStreamParser
+
+# 这些 Content-Type 声明的是 WAV，响应内容却不是 RIFF 时无法确定真实格式
+_WAV_CONTENT_TYPES = ("audio/wav", "audio/x-wav", "audio/wave", "audio/vnd.wave")
+
+
+class HTTPChunkedStream(tts.ChunkedStream, ABC):
+    """
+    单次 HTTP 流式合成请求的公共实现，供本地 TTS 服务的 ChunkedStream 继承。
+
+    读超时按该后端同等长度文本首包延迟的分位数自适应；响应边下载边推送
+    （WAV 经 WavStreamParser 转为 PCM16，其余格式交给 AudioEmitter 解码），
+    首包延迟计入自适应超时与冷/热启动统计，httpx 异常映射为 APIError。
+
+    子类只需提供请求（_build_request）和响应的 MIME 类型（_mime_type）。
+    对应的 TTS 需要有 base_url、_client（http_pool 连接池）、_ttfb 和 _timeout。
+    """
+
+    @abstractmethod
+    def _build_request(self, timeout: httpx.Timeout) -> httpx.Request:
+        """构建合成请求，timeout 为自适应的读超时"""
+
+    def _mime_type(self, response: httpx.Response) -> str | None:
+        """响应的 MIME 类型，返回 None 表示按 WAV 解析为 PCM16"""
+        return None
+
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        emitter = FramedEmitter(output_emitter)
+        tts_impl = self._tts
+        client: httpx.AsyncClient = tts_impl._client
+
+        # 读超时限制等待响应和两次数据之间的间隔，按同等长度文本首包延迟的分位数自适应
+        text_len = len(self.input_text)
+        read_timeout = tts_impl._ttfb.timeout(text_len, ceiling=tts_impl._timeout)
+        first_audio = True
+        worker_load.request_started("tts")
+        try:
+            request = self._build_request(
+                httpx.Timeout(read_timeout, connect=self._conn_options.timeout)
+            )
+
+            # 距该连接池上一次请求的时长，用于区分冷/热启动
+            idle = http_pool.idle_seconds(client)
+            start = time.perf_counter()
+            response = await client.send(request, stream=True)
+            try:
+                if response.status_code != 200:
+                    error_text = await response.aread()
+                    raise APIStatusError(
+                        message=f"TTS request failed: {error_text.decode('utf-8', errors='ignore')}",
+                        status_code=response.status_code,
+                        request_id="",
+                        body=error_text,
+                    )
+
+                request_id = response.headers.get("x-request-id") or utils.shortuuid()
+                mime_type = self._mime_type(response)
+                parser = (
+                    WavStreamParser(
+                        sample_rate=tts_impl.sample_rate,
+                        num_channels=tts_impl.num_channels,
+                        fallback_mime_type=_fallback_mime_type(response),
+                    )
+                    if mime_type is None
+                    else None
+                )
+                initialized = False
+
+                def initialize() -> None:
+                    nonlocal initialized
+                    if parser is None:
+                        emitter.initialize(
+                            request_id=request_id,
+                            sample_rate=tts_impl.sample_rate,
+                            num_channels=tts_impl.num_channels,
+                            mime_type=mime_type,
+                        )
+                    else:
+                        if parser.mime_type is None:
+                            raise APIError(
+                                "TTS response is not a WAV stream "
+                                f"(content-type: {response.headers.get('content-type')})",
+                                retryable=False,
+                            )
+                        emitter.initialize(
+                            request_id=request_id,
+                            sample_rate=parser.sample_rate,
+                            num_channels=parser.num_channels,
+                            mime_type=parser.mime_type,
+                        )
+                    initialized = True
+
+                async for chunk in response.aiter_bytes():
+                    if parser is not None:
+                        chunk = parser.feed(chunk)
+                        if not parser.ready:
+                            continue
+                    if not initialized:
+                        initialize()
+                    if chunk:
+                        if first_audio:
+                            ttfb = time.perf_counter() - start
+                            tts_impl._ttfb.record(ttfb, text_len)
+                            keep_warm.record_start(tts_impl.base_url, ttfb, idle)
+                            first_audio = False
+                        emitter.push(chunk)
+
+                # 头部不完整时回退为透传原始数据
+                tail = parser.flush() if parser is not None else b""
+                if not initialized:
+                    initialize()
+                if tail:
+                    emitter.push(tail)
+            finally:
+                await response.aclose()
+
+            emitter.flush()
+
+        except httpx.TimeoutException:
+            if first_audio:
+                tts_impl._ttfb.record_timeout()
+            raise APITimeoutError() from None
+        except httpx.HTTPStatusError as e:
+            raise APIStatusError(
+                message=str(e),
+                status_code=e.response.status_code,
+                request_id="",
+                body=e.response.content,
+            ) from None
+        except APIError:
+            raise
+        except Exception as e:
+            raise APIConnectionError() from e
+        finally:
+            worker_load.request_finished("tts")
+
+
+def _fallback_mime_type(response: httpx.Response) -> str | None:
+    """
+    非 WAV 数据透传时使用的 MIME 类型：沿用后端声明的音频 Content-Type，
+    声明为 WAV 或不是音频类型时返回 None
+    """
+    content_type = response.headers.get("content-type", "")
+    mime_type = content_type.split(";")[0].strip().lower()
+    if not mime_type.startswith("audio/") or mime_type in _WAV_CONTENT_TYPES:
+        return None
+    return mime_type
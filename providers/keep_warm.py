@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+import httpx
+
+from livekit.agents import tts
+
+from . import http_pool, worker_load
+from .histogram import HistogramStore
+
+if TYPE_CHECKING:
+    from livekit.agents import AgentServer
+
+logger = logging.getLogger(__name__)
+
+# 连接池的空闲连接 keepalive_expiry 秒后被关闭，保温间隔需要比它短
+DEFAULT_INTERVAL = 60.0
+# worker 连续这么久没有 STT/TTS 请求后暂停保温，有新请求后恢复
+DEFAULT_PAUSE_AFTER = 600.0
+DEFAULT_WARM_TIMEOUT = 10.0
+# 距上一次请求超过该时长的合成按冷启动统计：空闲连接已被连接池关闭
+COLD_AFTER = http_pool.DEFAULT_LIMITS.keepalive_expiry or 120.0
+
+START_LATENCY_METRIC = "voice_agent_tts_start_ttfb_seconds"
+
+# 进程级的冷/热启动首包延迟，按 (backend, start) 聚合，可注册到 prometheus_client.REGISTRY；
+# 在 worker 主进程中调用 START_LATENCY.listen() 后汇总各 job 进程的样本
+START_LATENCY = HistogramStore(report_env="VOICE_AGENT_START_LATENCY_ADDR")
+START_LATENCY.describe_metric(
+    START_LATENCY_METRIC, "TTS time to first audio, split by cold or warm start"
+)
+
+
+def record_start(backend: str, ttfb: float, idle: float) -> None:
+    """
+    记录一次 TTS 合成的首包延迟。idle 为请求前该后端连接池的空闲秒数，
+    超过 COLD_AFTER 时记为冷启动（start="cold"），否则为热启动（start="warm"）。
+    """
+    start = "cold" if idle >= COLD_AFTER else "warm"
+    START_LATENCY.observe(START_LATENCY_METRIC, ttfb, backend=backend, start=start)
+
+
+def start_latency_summary() -> str:
+    """冷/热启动首包延迟的 p50/p95 与样本数，用于日志"""
+    parts = []
+    for start in ("cold", "warm"):
+        hist = START_LATENCY.aggregate(START_LATENCY_METRIC, start=start)
+        if hist.count:
+            parts.append(
+                f"{start} p50 {hist.percentile(0.5) * 1000:.0f}ms "
+                f"p95 {hist.percentile(0.95) * 1000:.0f}ms (n={hist.count})"
+            )
+        else:
+            parts.append(f"{start} n=0")
+    return ", ".join(parts)
+
+
+@dataclass(frozen=True)
+class WarmRequest:
+    method: str
+    path: str = "/"
+    params: dict[str, Any] | None = None
+    json: dict[str, Any] | None = None
+
+
+@dataclass(frozen=True)
+class WarmTarget:
+    """
+    不创建 provider 的保温目标：服务地址与覆盖全部所配置说话人的短合成请求。
+    由本地 TTS 模块的 warm_target() 按与构造函数相同的参数生成（见
+    ProviderConfig.warm_targets），worker 主进程据此保温而不构造任何 TTS 或插件。
+    """
+
+    name: str
+    base_url: str
+    requests: tuple[WarmRequest, ...]
+
+
+async def send_warm(
+    client: httpx.AsyncClient, base_url: str, requests: tuple[WarmRequest, ...]
+) -> None:
+    """并发发送一组保温请求，任一失败时抛出异常"""
+
+    async def _send(request: WarmRequest) -> None:
+        response = await client.request(
+            request.method,
+            f"{base_url}{request.path}",
+            params=request.params,
+            json=request.json,
+        )
+        response.raise_for_status()
+
+    await asyncio.gather(*(_send(request) for request in requests))
+
+
+class KeepWarm:
+    """
+    低频后台保温：定期对空闲的 TTS 后端发送一次短合成，让服务端保留所配置说话人的
+    模型（如 IndexTTS 的 .pt 文件），同时保持发起请求的进程到该服务的长连接。
+
+    每 interval 秒检查一次，只对超过 interval 秒没有经本进程连接池发出请求的后端
+    发送请求。worker 连续 pause_after 秒没有任何 STT/TTS 请求时暂停，不为无人使用的
+    worker 占用 TTS 服务；有新请求后恢复。
+
+    每个 worker 只需一个实例：用 start_with_worker() 在 worker 主进程中随 worker
+    运行，保温请求数不随会话数增长。主进程只持有 WarmTarget（服务地址与说话人），
+    不构造 TTS 也不导入插件；它保住的是服务端已加载的模型，而不是 job 进程的连接——
+    默认的进程执行器中每个通话在新的 job 进程中建立自己的连接池。主进程本身不发起
+    真实请求，因此未暂停时每个目标每 interval 秒收到一次保温请求。job 进程的请求
+    经 worker_load 的上报计入暂停判断。
+
+    add_tts() 供在同一进程中运行的场景（如基准测试）直接使用 TTS 实例：支持提供 warm()
+    方法的后端（Kokoro、IndexTTS、IndexTTS-chaos），FailoverTTS 按其中每个后端分别保温，
+    其他后端（如云端 TTS）忽略；说话人在每次保温时读取，update_options() 修改后同样生效。
+    停止时在日志中输出保温次数与冷/热启动的首包延迟（见 start_latency_summary）。
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: float = DEFAULT_INTERVAL,
+        pause_after: float = DEFAULT_PAUSE_AFTER,
+        warm_timeout: float = DEFAULT_WARM_TIMEOUT,
+    ) -> None:
+        self._interval = interval
+        self._pause_after = pause_after
+        self._warm_timeout = warm_timeout
+        self._targets: list[tuple[str, Callable[..., Awaitable[bool]]]] = []
+        self._paused = False
+        self._task: asyncio.Task | None = None
+        self.warmups = 0
+        self.failures = 0
+
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
+    def add_tts(self, tts_impl: tts.TTS) -> None:
+        backends = getattr(tts_impl, "backends", None) or [tts_impl]
+        for backend in backends:
+            warm = getattr(backend, "warm", None)
+            if warm is None:
+                logger.debug("tts %s has no warm(), not keeping it warm", backend.label)
+                continue
+            self._targets.append((backend.label, warm))
+
+    def add_target(self, target: WarmTarget, client: httpx.AsyncClient) -> None:
+        async def warm(*, if_idle_for: float = 0.0) -> bool:
+            if http_pool.idle_seconds(client) < if_idle_for:
+                return False
+            await send_warm(client, target.base_url, target.requests)
+            return True
+
+        self._targets.append((target.name, warm))
+
+    def start_with_worker(self, server: AgentServer, targets: list[WarmTarget]) -> None:
+        """
+        worker 启动后在其事件循环上运行保温，直到 worker 关闭时事件循环取消剩余任务。
+
+        targets 通常来自 ProviderConfig.warm_targets()，为空时不启动。
+        需要在 run_app 之前调用。
+        """
+        if not targets:
+            logger.info("no local tts backend configured, keep-warm disabled")
+            return
+
+        async def _run() -> None:
+            clients = [http_pool.acquire_client(target.base_url) for target in targets]
+            try:
+                for target, client in zip(targets, clients):
+                    self.add_target(target, client)
+                await self.run()
+            finally:
+                for client in clients:
+                    await http_pool.release_client(client)
+
+        def _on_started() -> None:
+            self._task = asyncio.create_task(_run(), name="keep_warm")
+
+        server.on("worker_started", _on_started)
+
+    async def _warm(self, name: str, warm: Callable[..., Awaitable[bool]]) -> None:
+        try:
+            sent = await asyncio.wait_for(
+                warm(if_idle_for=self._interval), self._warm_timeout
+            )
+        except Exception:
+            self.failures += 1
+            logger.debug("keep-warm request to %s failed", name, exc_info=True)
+            return
+        if sent:
+            self.warmups += 1
+
+    async def run(self) -> None:
+        """一直运行到被取消"""
+        if not self._targets:
+            return
+        started = time.monotonic()
+        try:
+            while True:
+                await asyncio.sleep(self._interval)
+                # 会话刚开始时还没有请求，从启动时开始计算空闲时长
+                idle = min(worker_load.idle_seconds(), time.monotonic() - started)
+                if idle >= self._pause_after:
+                    if not self._paused:
+                        logger.info("worker idle for %.0fs, pausing keep-warm", idle)
+                        self._paused = True
+                    continue
+                if self._paused:
+                    logger.info("resuming keep-warm")
+                    self._paused = False
+                await asyncio.gather(
+                    *(self._warm(name, warm) for name, warm in self._targets)
+                )
+        finally:
+            logger.info(
+                "keep-warm sent %d requests (%d failed); tts first audio: %s",
+                self.warmups,
+                self.failures,
+                start_latency_summary(),
+            )
+
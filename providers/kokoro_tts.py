@@ -1,24 +1,21 @@
 from __future__ import annotations
 
 import asyncio
-import io
-import wave
-from array import array
 from dataclasses import dataclass, replace
+from typing import Any
 from urllib.parse import urlencode
 
 import httpx
 
-from livekit.agents import (
-    APIConnectionError,
-    APIConnectOptions,
-    APIStatusError,
-    APITimeoutError,
-    tts,
-)
+from livekit.agents import APIConnectOptions, tts
 from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS, NOT_GIVEN, NotGivenOr
 from livekit.agents.utils import aio, is_given
 
+from . import adaptive_timeout, http_pool
+from .keep_warm import WarmRequest, WarmTarget, send_warm
+from .http_tts import HTTPChunkedStream
+from .sentence_stream import DEFAULT_PIPELINE_DEPTH, PipelinedSynthesizeStream
+
 SAMPLE_RATE = 24000
 NUM_CHANNELS = 1
 
@@ -26,6 +23,14 @@ DEFAULT_SPEAKER = "assets/woman-01-zh.wav"
 DEFAULT_SPEAKER_EN = "am_adam_男.pt"
 DEFAULT_SPEAKER_ZH = "zm_029.pt"
 DEFAULT_SPEED = 1.0
+# DEFAULT_BASE_URL = "http://localhost:9880"
+DEFAULT_BASE_URL = "http://192.168.2.30:9880"
+
+# 首包延迟按文本长度归一化的参考字数
+TTFB_REFERENCE_CHARS = 50
+
+# 保温用的短文本，分别用到英文和中文说话人
+_WARM_TEXTS = ("test", "测试")
 
 
 @dataclass
@@ -37,6 +42,43 @@ class _TTSOptions:
     base_url: str
 
 
+def _warm_requests(opts: _TTSOptions) -> tuple[WarmRequest, ...]:
+    # 英文与中文文本分别由 speaker_en 和 speaker_zh 合成，每种语言各发一句
+    return tuple(
+        WarmRequest(
+            "GET",
+            params={
+                "text": text,
+                "speaker": opts.speaker,
+                "speed": opts.speed,
+                "speaker_en": opts.speaker_en,
+                "speaker_zh": opts.speaker_zh,
+            },
+        )
+        for text in _WARM_TEXTS
+    )
+
+
+def warm_target(
+    *,
+    speaker: str = DEFAULT_SPEAKER,
+    speed: float = DEFAULT_SPEED,
+    speaker_en: str = DEFAULT_SPEAKER_EN,
+    speaker_zh: str = DEFAULT_SPEAKER_ZH,
+    base_url: str = DEFAULT_BASE_URL,
+    **_options: Any,
+) -> WarmTarget:
+    """按与 TTS 相同的参数生成保温目标，不创建 TTS；其余构造参数与保温无关"""
+    opts = _TTSOptions(
+        speaker=speaker,
+        speed=speed,
+        speaker_en=speaker_en,
+        speaker_zh=speaker_zh,
+        base_url=base_url.rstrip("/"),
+    )
+    return WarmTarget("kokoro-tts", opts.base_url, _warm_requests(opts))
+
+
 class TTS(tts.TTS):
     def __init__(
         self,
@@ -45,8 +87,9 @@ class TTS(tts.TTS):
         speed: float = DEFAULT_SPEED,
         speaker_en: str = DEFAULT_SPEAKER_EN,
         speaker_zh: str = DEFAULT_SPEAKER_ZH,
-        # base_url: str = "http://localhost:9880",
-        base_url: str = "http://192.168.2.30:9880",
+        base_url: str = DEFAULT_BASE_URL,
+        timeout: float = 30.0,
+        pipeline_depth: int = DEFAULT_PIPELINE_DEPTH,
     ) -> None:
         """
         Kokoro TTS provider.
@@ -57,9 +100,12 @@ class TTS(tts.TTS):
             speaker_en: English voice model
             speaker_zh: Chinese voice model
             base_url: Service base URL
+            timeout: Upper bound for the read timeout; the actual value is derived
+                from this backend's recent latency percentiles
+            pipeline_depth: Max concurrent sentence requests in stream()
         """
         super().__init__(
-            capabilities=tts.TTSCapabilities(streaming=False),
+            capabilities=tts.TTSCapabilities(streaming=True),
             sample_rate=SAMPLE_RATE,
             num_channels=NUM_CHANNELS,
         )
@@ -71,15 +117,15 @@ class TTS(tts.TTS):
             speaker_zh=speaker_zh,
             base_url=base_url.rstrip("/"),
         )
-
-        self._client = httpx.AsyncClient(
-            timeout=httpx.Timeout(connect=15.0, read=30.0, write=5.0, pool=5.0),
-            follow_redirects=True,
-            limits=httpx.Limits(
-                max_connections=50, max_keepalive_connections=50, keepalive_expiry=120
-            ),
+        self._timeout = timeout
+        self._pipeline_depth = pipeline_depth
+        self._ttfb = adaptive_timeout.tracker(
+            self._opts.base_url, "ttfb", reference_size=TTFB_REFERENCE_CHARS
         )
 
+        # 共享连接池：同一 job 中访问该服务的 provider 共用连接，并在各轮请求间复用
+        self._client = http_pool.acquire_client(self._opts.base_url)
+
         self._prewarm_task: asyncio.Task | None = None
 
     @property
@@ -90,6 +136,10 @@ class TTS(tts.TTS):
     def provider(self) -> str:
         return "kokoro-tts"
 
+    @property
+    def base_url(self) -> str:
+        return self._opts.base_url
+
     def update_options(
         self,
         *,
@@ -115,18 +165,28 @@ class TTS(tts.TTS):
     ) -> ChunkedStream:
         return ChunkedStream(tts=self, input_text=text, conn_options=conn_options)
 
+    def stream(
+        self, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS
+    ) -> PipelinedSynthesizeStream:
+        return PipelinedSynthesizeStream(
+            tts=self, conn_options=conn_options, depth=self._pipeline_depth
+        )
+
+    async def warm(self, *, if_idle_for: float = 0.0) -> bool:
+        """
+        让服务端加载并保留所配置的全部说话人，同时保持连接。
+        英文与中文文本分别由 speaker_en 和 speaker_zh 合成，因此每种语言各发一句短文本。
+        连接池在 if_idle_for 秒内有过请求时不发送，返回是否发送了请求。
+        """
+        if http_pool.idle_seconds(self._client) < if_idle_for:
+            return False
+        await send_warm(self._client, self._opts.base_url, _warm_requests(self._opts))
+        return True
+
     def prewarm(self) -> None:
         async def _prewarm() -> None:
             try:
-                params = {
-                    "text": "test",
-                    "speaker": self._opts.speaker,
-                    "speed": self._opts.speed,
-                    "speaker_en": self._opts.speaker_en,
-                    "speaker_zh": self._opts.speaker_zh,
-                }
-                url = f"{self._opts.base_url}/?{urlencode(params)}"
-                await self._client.get(url)
+                await self.warm()
             except Exception:
                 pass
 
@@ -135,10 +195,10 @@ class TTS(tts.TTS):
     async def aclose(self) -> None:
         if self._prewarm_task:
             await aio.cancel_and_wait(self._prewarm_task)
-        await self._client.aclose()
+        await http_pool.release_client(self._client)
 
 
-class ChunkedStream(tts.ChunkedStream):
+class ChunkedStream(HTTPChunkedStream):
     def __init__(
         self, *, tts: TTS, input_text: str, conn_options: APIConnectOptions
     ) -> None:
@@ -146,135 +206,14 @@ class ChunkedStream(tts.ChunkedStream):
         self._tts: TTS = tts
         self._opts = replace(tts._opts)
 
-    def _normalize_wav(
-        self, wav_bytes: bytes
-    ) -> tuple[bytes, int, int]:
-        """
-        Kokoro 服务返回的 WAV 是 float32 (format=3)，LiveKit 目前只接受 PCM16。
-        这里把 float32 WAV 转成 PCM16 WAV，其它格式原样返回。
-        """
-        sample_rate = SAMPLE_RATE
-        num_channels = NUM_CHANNELS
-
-        try:
-            if len(wav_bytes) < 12:
-                return wav_bytes, sample_rate, num_channels
-
-            if wav_bytes[:4] != b"RIFF" or wav_bytes[8:12] != b"WAVE":
-                return wav_bytes, sample_rate, num_channels
-
-            pos = 12
-            audio_format = None
-            bits_per_sample = None
-            data_offset = None
-            data_size = None
-
-            while pos + 8 <= len(wav_bytes):
-                chunk_id = wav_bytes[pos : pos + 4]
-                chunk_size = int.from_bytes(
-                    wav_bytes[pos + 4 : pos + 8], byteorder="little"
-                )
-                pos += 8
-
-                if chunk_id == b"fmt " and pos + 16 <= len(wav_bytes):
-                    audio_format = int.from_bytes(
-                        wav_bytes[pos : pos + 2], byteorder="little"
-                    )
-                    num_channels = int.from_bytes(
-                        wav_bytes[pos + 2 : pos + 4], byteorder="little"
-                    )
-                    sample_rate = int.from_bytes(
-                        wav_bytes[pos + 4 : pos + 8], byteorder="little"
-                    )
-                    bits_per_sample = int.from_bytes(
-                        wav_bytes[pos + 14 : pos + 16], byteorder="little"
-                    )
-                elif chunk_id == b"data":
-                    data_offset = pos
-                    data_size = chunk_size
-                    break
-
-                # chunk 数据按偶数字节对齐
-                pos += chunk_size + (chunk_size & 1)
-
-            if (
-                audio_format != 3
-                or bits_per_sample != 32
-                or data_offset is None
-                or data_size is None
-            ):
-                return wav_bytes, sample_rate, num_channels
-
-            float_data = array("f")
-            float_data.frombytes(wav_bytes[data_offset : data_offset + data_size])
-
-            pcm16 = array("h")
-            for sample in float_data:
-                clamped = max(-1.0, min(1.0, sample))
-                pcm16.append(int(clamped * 32767))
-
-            buf = io.BytesIO()
-            with wave.open(buf, "wb") as wf:
-                wf.setnchannels(num_channels)
-                wf.setsampwidth(2)  # PCM16
-                wf.setframerate(sample_rate)
-                wf.writeframes(pcm16.tobytes())
-
-            return buf.getvalue(), sample_rate, num_channels
-
-        except Exception:
-            # 回退：保留原始数据，至少不会阻塞
-            return wav_bytes, sample_rate, num_channels
-
-    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
-        try:
-            params = {
-                "text": self.input_text,
-                "speaker": self._opts.speaker,
-                "speed": self._opts.speed,
-                "speaker_en": self._opts.speaker_en,
-                "speaker_zh": self._opts.speaker_zh,
-            }
-            url = f"{self._opts.base_url}/?{urlencode(params)}"
-
-            async with self._tts._client.stream(
-                "GET",
-                url,
-                timeout=httpx.Timeout(30, connect=self._conn_options.timeout),
-            ) as response:
-                if response.status_code != 200:
-                    error_text = await response.aread()
-                    raise APIStatusError(
-                        message=f"TTS request failed: {error_text.decode('utf-8', errors='ignore')}",
-                        status_code=response.status_code,
-                        request_id="",
-                        body=error_text,
-                    )
-
-                audio_bytes, sample_rate, num_channels = self._normalize_wav(
-                    await response.aread()
-                )
-
-                request_id = response.headers.get("x-request-id", "")
-                output_emitter.initialize(
-                    request_id=request_id,
-                    sample_rate=sample_rate,
-                    num_channels=num_channels,
-                    mime_type="audio/wav",
-                )
-
-                output_emitter.push(audio_bytes)
-
-            output_emitter.flush()
-
-        except httpx.TimeoutException:
-            raise APITimeoutError() from None
-        except httpx.HTTPStatusError as e:
-            raise APIStatusError(
-                message=str(e),
-                status_code=e.response.status_code,
-                request_id="",
-                body=e.response.content,
-            ) from None
-        except Exception as e:
-            raise APIConnectionError() from e
+    def _build_request(self, timeout: httpx.Timeout) -> httpx.Request:
+        # Kokoro 返回 float32 WAV，由基类边下载边转换为 PCM16
+        params = {
+            "text": self.input_text,
+            "speaker": self._opts.speaker,
+            "speed": self._opts.speed,
+            "speaker_en": self._opts.speaker_en,
+            "speaker_zh": self._opts.speaker_zh,
+        }
+        url = f"{self._opts.base_url}/?{urlencode(params)}"
+        return self._tts._client.build_request("GET", url, timeout=timeout)
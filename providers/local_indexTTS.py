@@ -2,25 +2,38 @@ from __future__ import annotations
 
 import asyncio
 from dataclasses import dataclass, replace
-from typing import Literal, Union
+from typing import Any, Literal, Union
 
 import httpx
 
-from livekit.agents import (
-    APIConnectionError,
-    APIConnectOptions,
-    APIStatusError,
-    APITimeoutError,
-    tts,
-)
+from livekit.agents import APIConnectOptions, tts
 from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS, NOT_GIVEN, NotGivenOr
 from livekit.agents.utils import aio, is_given
 
+from . import adaptive_timeout, http_pool
+from .keep_warm import WarmRequest, WarmTarget, send_warm
+from .http_tts import HTTPChunkedStream
+from .sentence_stream import DEFAULT_PIPELINE_DEPTH, PipelinedSynthesizeStream
+
 SAMPLE_RATE = 24000
 NUM_CHANNELS = 1
 
+DEFAULT_BASE_URL = "http://localhost:6006"
+DEFAULT_VOICE = "default"
+
+# 首包延迟按文本长度归一化的参考字数
+TTFB_REFERENCE_CHARS = 50
+
 RESPONSE_FORMATS = Union[Literal["mp3", "opus", "aac", "flac", "wav", "pcm"], str]
 
+# 压缩格式交给 AudioEmitter 按 MIME 类型边收边解码；OpenAI 兼容接口的 opus 为 Ogg 封装
+_COMPRESSED_MIME_TYPES = {
+    "mp3": "audio/mpeg",
+    "opus": "audio/ogg",
+    "aac": "audio/aac",
+    "flac": "audio/flac",
+}
+
 
 @dataclass
 class _TTSOptions:
@@ -28,14 +41,32 @@ class _TTSOptions:
     response_format: RESPONSE_FORMATS
 
 
+def _warm_requests(voice: str) -> tuple[WarmRequest, ...]:
+    return (
+        WarmRequest(
+            "POST",
+            "/audio/speech",
+            json={"model": "tts-1", "input": "测试", "voice": voice, "response_format": "pcm"},
+        ),
+    )
+
+
+def warm_target(
+    *, base_url: str = DEFAULT_BASE_URL, voice: str = DEFAULT_VOICE, **_options: Any
+) -> WarmTarget:
+    """按与 IndexTTS 相同的参数生成保温目标，不创建 IndexTTS；其余构造参数与保温无关"""
+    return WarmTarget("indextts", base_url.rstrip("/"), _warm_requests(voice))
+
+
 class IndexTTS(tts.TTS):
     def __init__(
         self,
         *,
-        base_url: str = "http://localhost:6006",
-        voice: str = "default",
+        base_url: str = DEFAULT_BASE_URL,
+        voice: str = DEFAULT_VOICE,
         response_format: NotGivenOr[RESPONSE_FORMATS] = NOT_GIVEN,
         timeout: float = 30.0,
+        pipeline_depth: int = DEFAULT_PIPELINE_DEPTH,
     ) -> None:
         """
         创建本地 TTS 服务的实例
@@ -43,30 +74,31 @@ class IndexTTS(tts.TTS):
         Args:
             base_url: TTS 服务的基础 URL
             voice: 使用的音色/角色名称
-            response_format: 音频格式
-            timeout: 请求超时时间
+            response_format: 请求的音频格式，默认 "wav"。"pcm"（24kHz 16bit 单声道）无需解码，
+                "opus" / "mp3" 体积更小，到达后逐段解码，同样可以边收边播
+            timeout: 读超时上限（秒），实际超时按该服务近期首包延迟的分位数自适应
+            pipeline_depth: stream() 中同时在途的逐句合成请求数
         """
         super().__init__(
-            capabilities=tts.TTSCapabilities(streaming=False),
+            capabilities=tts.TTSCapabilities(streaming=True),
             sample_rate=SAMPLE_RATE,
             num_channels=NUM_CHANNELS,
         )
 
         self._base_url = base_url.rstrip("/")
         self._timeout = timeout
+        self._pipeline_depth = pipeline_depth
+        self._ttfb = adaptive_timeout.tracker(
+            self._base_url, "ttfb", reference_size=TTFB_REFERENCE_CHARS
+        )
 
         self._opts = _TTSOptions(
             voice=voice,
             response_format=response_format if is_given(response_format) else "wav",
         )
 
-        self._client = httpx.AsyncClient(
-            timeout=httpx.Timeout(connect=15.0, read=timeout, write=5.0, pool=5.0),
-            follow_redirects=True,
-            limits=httpx.Limits(
-                max_connections=50, max_keepalive_connections=50, keepalive_expiry=120
-            ),
-        )
+        # 共享连接池：同一 job 中访问该服务的 provider 共用连接，并在各轮请求间复用
+        self._client = http_pool.acquire_client(self._base_url)
 
         self._prewarm_task: asyncio.Task | None = None
 
@@ -74,6 +106,10 @@ class IndexTTS(tts.TTS):
     def voice(self) -> str:
         return self._opts.voice
 
+    @property
+    def base_url(self) -> str:
+        return self._base_url
+
     def update_options(
         self,
         *,
@@ -93,6 +129,23 @@ class IndexTTS(tts.TTS):
     ) -> ChunkedStream:
         return ChunkedStream(tts=self, input_text=text, conn_options=conn_options)
 
+    def stream(
+        self, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS
+    ) -> PipelinedSynthesizeStream:
+        return PipelinedSynthesizeStream(
+            tts=self, conn_options=conn_options, depth=self._pipeline_depth
+        )
+
+    async def warm(self, *, if_idle_for: float = 0.0) -> bool:
+        """
+        用当前音色合成一句短文本，保持连接并让服务端保留该音色的模型。
+        连接池在 if_idle_for 秒内有过请求时不发送，返回是否发送了请求。
+        """
+        if http_pool.idle_seconds(self._client) < if_idle_for:
+            return False
+        await send_warm(self._client, self._base_url, _warm_requests(self._opts.voice))
+        return True
+
     def prewarm(self) -> None:
         async def _prewarm() -> None:
             try:
@@ -105,10 +158,10 @@ class IndexTTS(tts.TTS):
     async def aclose(self) -> None:
         if self._prewarm_task:
             await aio.cancel_and_wait(self._prewarm_task)
-        await self._client.aclose()
+        await http_pool.release_client(self._client)
 
 
-class ChunkedStream(tts.ChunkedStream):
+class ChunkedStream(HTTPChunkedStream):
     def __init__(
         self, *, tts: IndexTTS, input_text: str, conn_options: APIConnectOptions
     ) -> None:
@@ -116,47 +169,32 @@ class ChunkedStream(tts.ChunkedStream):
         self._tts: IndexTTS = tts
         self._opts = replace(tts._opts)
 
-    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
-        try:
-            # 构建请求数据（兼容 OpenAI 格式）
-            request_data = {
-                "model": "tts-1",  # 可以是任意值，你的服务会忽略它
-                "input": self.input_text,
-                "voice": self._opts.voice,
-            }
-
-            # 发送请求到本地 TTS 服务
-            response = await self._tts._client.post(
-                f"{self._tts._base_url}/audio/speech",
-                json=request_data,
-                timeout=self._tts._timeout,
-            )
-
-            response.raise_for_status()
-
-            # 获取音频数据
-            audio_data = response.content
-
-            # 初始化输出
-            output_emitter.initialize(
-                request_id="",
-                sample_rate=SAMPLE_RATE,
-                num_channels=NUM_CHANNELS,
-                mime_type=f"audio/{self._opts.response_format}",
-            )
-
-            # 推送音频数据
-            output_emitter.push(audio_data)
-            output_emitter.flush()
-
-        except httpx.TimeoutException:
-            raise APITimeoutError() from None
-        except httpx.HTTPStatusError as e:
-            raise APIStatusError(
-                message=str(e),
-                status_code=e.response.status_code,
-                request_id="",
-                body=e.response.text,
-            ) from None
-        except Exception as e:
-            raise APIConnectionError() from e
+    def _build_request(self, timeout: httpx.Timeout) -> httpx.Request:
+        # 构建请求数据（兼容 OpenAI 格式）
+        request_data = {
+            "model": "tts-1",  # 可以是任意值，你的服务会忽略它
+            "input": self.input_text,
+            "voice": self._opts.voice,
+            "response_format": self._opts.response_format,
+        }
+        return self._tts._client.build_request(
+            "POST",
+            f"{self._tts._base_url}/audio/speech",
+            json=request_data,
+            timeout=timeout,
+        )
+
+    def _mime_type(self, response: httpx.Response) -> str | None:
+        # WAV 由基类解析为 PCM16，其余格式原样推送
+        if self._opts.response_format == "wav":
+            return None
+        return _mime_type(self._opts.response_format, response)
+
+
+def _mime_type(response_format: str, response: httpx.Response) -> str:
+    """"pcm" 为裸 PCM16，已知的压缩格式按固定映射，其余沿用响应的 Content-Type"""
+    if response_format == "pcm":
+        return "audio/pcm"
+    if mime_type := _COMPRESSED_MIME_TYPES.get(response_format):
+        return mime_type
+    return response.headers.get("content-type", f"audio/{response_format}")
@@ -2,26 +2,29 @@ from __future__ import annotations
 
 import asyncio
 from dataclasses import dataclass, replace
-from typing import Literal
+from typing import Any, Literal
 from urllib.parse import urlencode
 
 import httpx
 
-from livekit.agents import (
-    APIConnectionError,
-    APIConnectOptions,
-    APIStatusError,
-    APITimeoutError,
-    tts,
-)
+from livekit.agents import APIConnectOptions, tts
 from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS, NOT_GIVEN, NotGivenOr
 from livekit.agents.utils import aio, is_given
 
+from . import adaptive_timeout, http_pool
+from .keep_warm import WarmRequest, WarmTarget, send_warm
+from .http_tts import HTTPChunkedStream
+from .sentence_stream import DEFAULT_PIPELINE_DEPTH, PipelinedSynthesizeStream
+
 SAMPLE_RATE = 24000
 NUM_CHANNELS = 1
 
 DEFAULT_SPEAKER = "忧伤女声.pt"
 DEFAULT_VOLUME = 1.0
+DEFAULT_BASE_URL = "http://localhost:9880"
+
+# 首包延迟按文本长度归一化的参考字数
+TTFB_REFERENCE_CHARS = 50
 
 
 @dataclass
@@ -31,13 +34,35 @@ class _TTSOptions:
     base_url: str
 
 
+def _warm_requests(opts: _TTSOptions) -> tuple[WarmRequest, ...]:
+    return (
+        WarmRequest(
+            "GET", params={"text": "测试", "speaker": opts.speaker, "volume": opts.volume}
+        ),
+    )
+
+
+def warm_target(
+    *,
+    speaker: str = DEFAULT_SPEAKER,
+    volume: float = DEFAULT_VOLUME,
+    base_url: str = DEFAULT_BASE_URL,
+    **_options: Any,
+) -> WarmTarget:
+    """按与 TTS 相同的参数生成保温目标，不创建 TTS；其余构造参数与保温无关"""
+    opts = _TTSOptions(speaker=speaker, volume=volume, base_url=base_url.rstrip("/"))
+    return WarmTarget("local-indextts", opts.base_url, _warm_requests(opts))
+
+
 class TTS(tts.TTS):
     def __init__(
         self,
         *,
         speaker: str = DEFAULT_SPEAKER,
         volume: float = DEFAULT_VOLUME,
-        base_url: str = "http://localhost:9880",
+        base_url: str = DEFAULT_BASE_URL,
+        timeout: float = 30.0,
+        pipeline_depth: int = DEFAULT_PIPELINE_DEPTH,
     ) -> None:
         """
         创建本地 IndexTTS 1.5 实例。
@@ -46,9 +71,11 @@ class TTS(tts.TTS):
             speaker: 说话人模型文件名，例如 "忧伤女声.pt"
             volume: 音量，默认 1.0
             base_url: TTS 服务地址，默认 "http://localhost:9880"
+            timeout: 读超时上限（秒），实际超时按该服务近期首包延迟的分位数自适应
+            pipeline_depth: stream() 中同时在途的逐句合成请求数
         """
         super().__init__(
-            capabilities=tts.TTSCapabilities(streaming=False),
+            capabilities=tts.TTSCapabilities(streaming=True),
             sample_rate=SAMPLE_RATE,
             num_channels=NUM_CHANNELS,
         )
@@ -58,15 +85,15 @@ class TTS(tts.TTS):
             volume=volume,
             base_url=base_url.rstrip("/"),
         )
-
-        self._client = httpx.AsyncClient(
-            timeout=httpx.Timeout(connect=15.0, read=30.0, write=5.0, pool=5.0),
-            follow_redirects=True,
-            limits=httpx.Limits(
-                max_connections=50, max_keepalive_connections=50, keepalive_expiry=120
-            ),
+        self._timeout = timeout
+        self._pipeline_depth = pipeline_depth
+        self._ttfb = adaptive_timeout.tracker(
+            self._opts.base_url, "ttfb", reference_size=TTFB_REFERENCE_CHARS
         )
 
+        # 共享连接池：同一 job 中访问该服务的 provider 共用连接，并在各轮请求间复用
+        self._client = http_pool.acquire_client(self._opts.base_url)
+
         self._prewarm_task: asyncio.Task | None = None
 
     @property
@@ -77,6 +104,10 @@ class TTS(tts.TTS):
     def provider(self) -> str:
         return "local-indextts"
 
+    @property
+    def base_url(self) -> str:
+        return self._opts.base_url
+
     def update_options(
         self,
         *,
@@ -97,19 +128,31 @@ class TTS(tts.TTS):
     ) -> ChunkedStream:
         return ChunkedStream(tts=self, input_text=text, conn_options=conn_options)
 
+    def stream(
+        self, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS
+    ) -> PipelinedSynthesizeStream:
+        """按句流水线合成，边接收 LLM 输出边播放"""
+        return PipelinedSynthesizeStream(
+            tts=self, conn_options=conn_options, depth=self._pipeline_depth
+        )
+
+    async def warm(self, *, if_idle_for: float = 0.0) -> bool:
+        """
+        用当前说话人合成一句短文本，保持连接并让服务端保留该说话人的 .pt 模型。
+        连接池在 if_idle_for 秒内有过请求时不发送，返回是否发送了请求。
+        """
+        if http_pool.idle_seconds(self._client) < if_idle_for:
+            return False
+        await send_warm(self._client, self._opts.base_url, _warm_requests(self._opts))
+        return True
+
     def prewarm(self) -> None:
         """预热连接"""
 
         async def _prewarm() -> None:
             try:
                 # 发送一个简单的测试请求来预热连接
-                params = {
-                    "text": "测试",
-                    "speaker": self._opts.speaker,
-                    "volume": self._opts.volume,
-                }
-                url = f"{self._opts.base_url}/?{urlencode(params)}"
-                await self._client.get(url)
+                await self.warm()
             except Exception:
                 pass
 
@@ -119,10 +162,10 @@ class TTS(tts.TTS):
         """关闭资源"""
         if self._prewarm_task:
             await aio.cancel_and_wait(self._prewarm_task)
-        await self._client.aclose()
+        await http_pool.release_client(self._client)
 
 
-class ChunkedStream(tts.ChunkedStream):
+class ChunkedStream(HTTPChunkedStream):
     def __init__(
         self, *, tts: TTS, input_text: str, conn_options: APIConnectOptions
     ) -> None:
@@ -130,58 +173,12 @@ class ChunkedStream(tts.ChunkedStream):
         self._tts: TTS = tts
         self._opts = replace(tts._opts)
 
-    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
-        """执行 TTS 合成"""
-        try:
-            # 构建请求 URL
-            params = {
-                "text": self.input_text,
-                "speaker": self._opts.speaker,
-                "volume": self._opts.volume,
-            }
-            url = f"{self._opts.base_url}/?{urlencode(params)}"
-
-            # 发送请求并流式读取响应
-            async with self._tts._client.stream(
-                "GET",
-                url,
-                timeout=httpx.Timeout(30, connect=self._conn_options.timeout),
-            ) as response:
-                # 检查响应状态
-                if response.status_code != 200:
-                    error_text = await response.aread()
-                    raise APIStatusError(
-                        message=f"TTS request failed: {error_text.decode('utf-8', errors='ignore')}",
-                        status_code=response.status_code,
-                        request_id="",
-                        body=error_text,
-                    )
-
-                # 初始化音频输出
-                request_id = response.headers.get("x-request-id", "")
-                output_emitter.initialize(
-                    request_id=request_id,
-                    sample_rate=SAMPLE_RATE,
-                    num_channels=NUM_CHANNELS,
-                    mime_type="audio/wav",
-                )
-
-                # 流式读取音频数据
-                async for chunk in response.aiter_bytes(chunk_size=8192):
-                    if chunk:
-                        output_emitter.push(chunk)
-
-            # 完成输出
-            output_emitter.flush()
-
-        except httpx.TimeoutException:
-            raise APITimeoutError() from None
-        except httpx.HTTPStatusError as e:
-            raise APIStatusError(
-                message=str(e),
-                status_code=e.response.status_code,
-                request_id="",
-                body=e.response.content,
-            ) from None
-        except Exception as e:
-            raise APIConnectionError() from e
+    def _build_request(self, timeout: httpx.Timeout) -> httpx.Request:
+        """构建合成请求，服务返回 int16 流式 WAV"""
+        params = {
+            "text": self.input_text,
+            "speaker": self._opts.speaker,
+            "volume": self._opts.volume,
+        }
+        url = f"{self._opts.base_url}/?{urlencode(params)}"
+        return self._tts._client.build_request("GET", url, timeout=timeout)
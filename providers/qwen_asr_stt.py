@@ -3,34 +3,93 @@ from __future__ import annotations
 import asyncio
 import base64
 import json
+import logging
 import os
+import time
+import uuid
+from collections.abc import AsyncIterator, Sequence
 from dataclasses import dataclass
-from typing import Any
-from urllib.parse import urljoin
+from typing import Any, Literal
+from urllib.parse import urlencode, urljoin
 
 import aiohttp
 import httpx
+import numpy as np
 
 from livekit import rtc
 from livekit.agents import (
     DEFAULT_API_CONNECT_OPTIONS,
     APIConnectionError,
     APIConnectOptions,
+    APIError,
     APIStatusError,
     APITimeoutError,
     stt,
     utils,
 )
+from livekit.agents.metrics import STTMetrics
+from livekit.agents.metrics.base import Metadata
 from livekit.agents.types import (
     NOT_GIVEN,
     NotGivenOr,
 )
 from livekit.agents.utils import AudioBuffer, is_given
 
+from . import (
+    adaptive_timeout,
+    audio_codec,
+    audio_utils,
+    hedging,
+    http_pool,
+    worker_load,
+)
+
+logger = logging.getLogger(__name__)
+
 # 采样率配置
 SAMPLE_RATE = 16000  # Qwen3-ASR 通常使用 16kHz
 NUM_CHANNELS = 1
 
+# 流式模式下每次发送的音频时长（100ms）
+STREAM_CHUNK_SAMPLES = SAMPLE_RATE // 10
+
+# 裁剪首尾静音时两端保留的余量，避免切掉弱起的辅音和尾音
+TRIM_PADDING_MS = 200
+
+_RECOGNIZE_PATH = "/api/v1/services/aigc/multimodal-generation/generation"
+
+# 识别耗时按音频时长归一化的参考秒数
+RECOGNIZE_REFERENCE_SECONDS = 5.0
+
+# 请求体模板中音频 data URL 的占位符
+_AUDIO_PLACEHOLDER = "\0audio\0"
+
+UploadCodecOption = Literal["pcm", "flac", "opus", "auto"]
+
+
+class UploadSTTMetrics(STTMetrics):
+    """非流式识别的指标，附带上传编码与节省的流量"""
+
+    upload_codec: str = "pcm"
+    upload_bytes: int = 0
+    """实际上传的音频 base64 字节数"""
+    pcm_bytes: int = 0
+    """原始音频帧不做任何处理按 PCM 上传时的 base64 字节数"""
+    bytes_saved: int = 0
+    encode_duration: float = 0.0
+    trimmed_audio_duration: float = 0.0
+    """重采样并裁剪首尾静音后实际送去识别的音频时长"""
+    hedged: bool = False
+    """结果是否来自对冲请求"""
+
+
+@dataclass
+class _HedgeTarget:
+    base_url: str
+    api_key: str
+    client: httpx.AsyncClient
+    policy: hedging.HedgePolicy
+
 
 @dataclass
 class _STTOptions:
@@ -38,6 +97,12 @@ class _STTOptions:
     language: str
     enable_itn: bool
     prompt: str
+    realtime_model: str
+    silence_duration_ms: int
+    server_vad: bool
+    upload_codec: UploadCodecOption
+    trim_silence: bool
+    trim_threshold_db: float
 
 
 class STT(stt.STT):
@@ -51,6 +116,19 @@ class STT(stt.STT):
         api_key: NotGivenOr[str] = NOT_GIVEN,
         base_url: str = "https://dashscope.aliyuncs.com",
         client: httpx.AsyncClient | None = None,
+        streaming: bool = False,
+        realtime_model: str = "qwen3-asr-flash-realtime",
+        server_vad: bool = True,
+        silence_duration_ms: int = 400,
+        http_session: aiohttp.ClientSession | None = None,
+        upload_codec: UploadCodecOption = "pcm",
+        upload_bandwidth: float | None = None,
+        trim_silence: bool = True,
+        trim_threshold_db: float = -45.0,
+        hedge_base_url: str | None = None,
+        hedge_api_key: NotGivenOr[str] = NOT_GIVEN,
+        hedge_percentile: float = 0.95,
+        hedge_budget: float = 0.1,
     ):
         """
         创建 Qwen3-ASR STT 实例。
@@ -63,9 +141,25 @@ class STT(stt.STT):
             api_key: DashScope API Key，如不提供则从环境变量 DASHSCOPE_API_KEY 读取
             base_url: API 基础 URL，默认北京地域
             client: 可选的预配置 httpx.AsyncClient
+            streaming: 是否启用实时流式识别（WebSocket），启用后会输出中间结果
+            realtime_model: 流式识别使用的模型名称
+            server_vad: 流式模式下是否由服务端 VAD 断句；关闭时在 flush 时手动提交
+            silence_duration_ms: 服务端 VAD 判定说话结束所需的静音时长
+            http_session: 可选的 aiohttp.ClientSession，用于流式 WebSocket 连接
+            upload_codec: 非流式识别的音频上传编码，"flac" 无损压缩，"opus" 有损但体积最小，
+                "auto" 按语音时长和实测上行带宽自动选择
+            upload_bandwidth: 可选的上行带宽（字节/秒），指定后 "auto" 不再使用实测值
+            trim_silence: 非流式识别前是否裁剪首尾静音（VAD 前后的填充）
+            trim_threshold_db: 判定为静音的平均幅度阈值（dBFS）
+            hedge_base_url: 可选的备用地域/端点。非流式识别超过近期延迟的
+                hedge_percentile 分位数仍未返回时，向该端点发出相同请求，取先返回的结果
+            hedge_api_key: 备用端点的 API Key，默认与主端点相同（新加坡与北京地域的 Key 不同）
+            hedge_budget: 对冲请求占总请求数的比例上限，用于控制额外费用
         """
         super().__init__(
-            capabilities=stt.STTCapabilities(streaming=False, interim_results=False)
+            capabilities=stt.STTCapabilities(
+                streaming=streaming, interim_results=streaming
+            )
         )
 
         # 获取 API Key
@@ -83,18 +177,46 @@ class STT(stt.STT):
             language=language,
             enable_itn=enable_itn,
             prompt=prompt,
+            realtime_model=realtime_model,
+            silence_duration_ms=silence_duration_ms,
+            server_vad=server_vad,
+            upload_codec=upload_codec,
+            trim_silence=trim_silence,
+            trim_threshold_db=trim_threshold_db,
         )
+        self._session = http_session
+        self._codec_selector = audio_codec.CodecSelector(
+            upload_bandwidth=upload_bandwidth, sample_rate=SAMPLE_RATE
+        )
+        # 非流式识别的指标由 _recognize_impl 带上上传编码信息后自行发出
+        self._recognize_metrics_needed = False
 
-        self._client = client or httpx.AsyncClient(
-            timeout=httpx.Timeout(connect=15.0, read=30.0, write=5.0, pool=5.0),
-            follow_redirects=True,
-            limits=httpx.Limits(
-                max_connections=50,
-                max_keepalive_connections=50,
-                keepalive_expiry=120,
-            ),
+        # 未传入 client 时使用共享连接池（见 http_pool.acquire_client）
+        self._client = client or http_pool.acquire_client(self._base_url)
+        # 在创建时（通常是 prewarm）取得各端点的延迟分布，从 worker 载入历史样本时
+        # 不阻塞事件循环；_send 中再次获取的是同一个实例
+        adaptive_timeout.tracker(
+            self._base_url, "recognize", reference_size=RECOGNIZE_REFERENCE_SECONDS
         )
 
+        self._hedge: _HedgeTarget | None = None
+        if hedge_base_url:
+            hedge_base_url = hedge_base_url.rstrip("/")
+            adaptive_timeout.tracker(
+                hedge_base_url, "recognize", reference_size=RECOGNIZE_REFERENCE_SECONDS
+            )
+            self._hedge = _HedgeTarget(
+                base_url=hedge_base_url,
+                api_key=hedge_api_key if is_given(hedge_api_key) else self._api_key,
+                client=http_pool.acquire_client(hedge_base_url),
+                # 对冲阈值来自主端点的延迟，同一 worker 中的各通话共用
+                policy=hedging.HedgePolicy(
+                    percentile=hedge_percentile,
+                    budget=hedge_budget,
+                    shared_key=self._base_url,
+                ),
+            )
+
     @property
     def model(self) -> str:
         return self._opts.model
@@ -112,9 +234,11 @@ class STT(stt.STT):
         prompt: str = "",
         api_key: NotGivenOr[str] = NOT_GIVEN,
         client: httpx.AsyncClient | None = None,
+        streaming: bool = False,
+        **kwargs: Any,
     ) -> STT:
         """
-        创建新加坡地域的 Qwen3-ASR STT 实例。
+        创建新加坡地域的 Qwen3-ASR STT 实例，其余参数（上传编码、静音裁剪、对冲等）与 STT 相同。
         注意：新加坡和北京地域的 API Key 不同。
         """
         return STT(
@@ -125,6 +249,8 @@ class STT(stt.STT):
             api_key=api_key,
             base_url="https://dashscope-intl.aliyuncs.com",
             client=client,
+            streaming=streaming,
+            **kwargs,
         )
 
     def update_options(
@@ -134,8 +260,11 @@ class STT(stt.STT):
         language: NotGivenOr[str] = NOT_GIVEN,
         enable_itn: NotGivenOr[bool] = NOT_GIVEN,
         prompt: NotGivenOr[str] = NOT_GIVEN,
+        silence_duration_ms: NotGivenOr[int] = NOT_GIVEN,
+        upload_codec: NotGivenOr[UploadCodecOption] = NOT_GIVEN,
+        trim_silence: NotGivenOr[bool] = NOT_GIVEN,
     ) -> None:
-        """更新 STT 选项"""
+        """更新 STT 选项（流式模式的新配置在下一次建立连接时生效）"""
         if is_given(model):
             self._opts.model = model
         if is_given(language):
@@ -144,6 +273,161 @@ class STT(stt.STT):
             self._opts.enable_itn = enable_itn
         if is_given(prompt):
             self._opts.prompt = prompt
+        if is_given(silence_duration_ms):
+            self._opts.silence_duration_ms = silence_duration_ms
+        if is_given(upload_codec):
+            self._opts.upload_codec = upload_codec
+        if is_given(trim_silence):
+            self._opts.trim_silence = trim_silence
+
+    def _ensure_session(self) -> aiohttp.ClientSession:
+        if not self._session:
+            self._session = utils.http_context.http_session()
+        return self._session
+
+    def _realtime_url(self) -> str:
+        """由 base_url 推导实时识别的 WebSocket 地址"""
+        ws_base = self._base_url.replace("https://", "wss://", 1).replace(
+            "http://", "ws://", 1
+        )
+        query = urlencode({"model": self._opts.realtime_model})
+        return f"{ws_base}/api-ws/v1/realtime?{query}"
+
+    def stream(
+        self,
+        *,
+        language: NotGivenOr[str] = NOT_GIVEN,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+    ) -> SpeechStream:
+        if not self.capabilities.streaming:
+            return super().stream(language=language, conn_options=conn_options)
+
+        return SpeechStream(
+            stt=self,
+            conn_options=conn_options,
+            language=language if is_given(language) else self._opts.language,
+        )
+
+    def _request_body(
+        self,
+        chunks: Sequence[bytes | memoryview | np.ndarray],
+        *,
+        data_url_prefix: str,
+    ) -> tuple[int, AsyncIterator[bytes]]:
+        """
+        流式生成识别请求体，返回 (Content-Length, 异步分片迭代器)。
+
+        请求体由 JSON 前缀、逐块增量 base64 编码的音频和 JSON 后缀拼接而成，
+        直接读取各帧的 memoryview，不会合并帧或在内存中构造完整的 payload。
+        发送完成后把上传吞吐记入编码选择器，作为上行带宽的估计。
+        """
+        payload = {
+            "model": self._opts.model,
+            "input": {
+                "messages": [
+                    {
+                        "content": [{"text": self._opts.prompt}],
+                        "role": "system",
+                    },
+                    {
+                        "content": [{"audio": _AUDIO_PLACEHOLDER}],
+                        "role": "user",
+                    },
+                ]
+            },
+            "parameters": {
+                "asr_options": {
+                    "enable_itn": self._opts.enable_itn,
+                }
+            },
+        }
+        encoded = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        prefix, suffix = encoded.split(json.dumps(_AUDIO_PLACEHOLDER))
+        prefix_bytes = f'{prefix}"{data_url_prefix}'.encode("utf-8")
+        suffix_bytes = f'"{suffix}'.encode("utf-8")
+
+        audio_bytes = sum(memoryview(chunk).nbytes for chunk in chunks)
+        audio_b64_bytes = audio_utils.base64_encoded_len(audio_bytes)
+        content_length = len(prefix_bytes) + audio_b64_bytes + len(suffix_bytes)
+
+        async def _body() -> AsyncIterator[bytes]:
+            yield prefix_bytes
+            # 迭代器在上一块写入 socket 后才会被继续推进，首尾之间即音频的发送耗时
+            start = time.perf_counter()
+            for chunk in audio_utils.iter_base64(chunks):
+                yield chunk
+            yield suffix_bytes
+            self._codec_selector.record_upload(
+                audio_b64_bytes, time.perf_counter() - start
+            )
+
+        return content_length, _body()
+
+    def _prepare_audio(
+        self, frames: list[rtc.AudioFrame]
+    ) -> tuple[list[np.ndarray], float]:
+        """
+        把输入帧整理为 SAMPLE_RATE 单声道 PCM16 分块，返回 (分块, 时长)。
+
+        先在原始帧的视图上裁剪首尾静音（不复制），房间音频已是 16kHz 单声道时直接返回；
+        否则把裁剪后的音频合并一次，混为单声道并重采样，
+        data URL 中声明的采样率因此与实际音频一致。
+        """
+        if not frames:
+            return [], 0.0
+
+        sample_rate = frames[0].sample_rate
+        num_channels = frames[0].num_channels
+        chunks = [np.frombuffer(frame.data, dtype=np.int16) for frame in frames]
+        if self._opts.trim_silence:
+            threshold = audio_utils.PCM16_MAX * 10 ** (self._opts.trim_threshold_db / 20)
+            chunks = audio_utils.trim_silence(
+                chunks,
+                sample_rate,
+                threshold=threshold,
+                num_channels=num_channels,
+                padding_ms=TRIM_PADDING_MS,
+            )
+
+        if sample_rate != SAMPLE_RATE or num_channels != NUM_CHANNELS:
+            samples = audio_utils.downmix_pcm16(np.concatenate(chunks), num_channels)
+            resampler = rtc.AudioResampler(sample_rate, SAMPLE_RATE, num_channels=1)
+            resampled = resampler.push(bytearray(samples)) + resampler.flush()
+            chunks = [np.frombuffer(frame.data, dtype=np.int16) for frame in resampled]
+
+        return chunks, sum(len(chunk) for chunk in chunks) / SAMPLE_RATE
+
+    async def _encode_upload(
+        self, chunks: list[np.ndarray], audio_duration: float
+    ) -> tuple[audio_codec.UploadCodec, list[bytes | np.ndarray], float]:
+        """按 upload_codec 选择编码并在线程中压缩，返回 (编码, 音频分块, 编码耗时)"""
+        pcm_bytes = sum(chunk.nbytes for chunk in chunks)
+        codec = self._opts.upload_codec
+        if codec == "auto":
+            codec = self._codec_selector.choose(audio_duration, pcm_bytes)
+        if codec == "pcm" or pcm_bytes == 0:
+            return "pcm", chunks, 0.0
+
+        start = time.perf_counter()
+        try:
+            encoded = await asyncio.to_thread(
+                audio_codec.encode,
+                b"".join(chunks),
+                codec,
+                sample_rate=SAMPLE_RATE,
+                num_channels=NUM_CHANNELS,
+            )
+        except Exception:
+            logger.warning(
+                "failed to encode audio as %s, uploading pcm", codec, exc_info=True
+            )
+            return "pcm", chunks, 0.0
+
+        encode_duration = time.perf_counter() - start
+        self._codec_selector.record_encode(
+            codec, audio_duration, encode_duration, len(encoded) / pcm_bytes
+        )
+        return codec, [encoded], encode_duration
 
     async def _recognize_impl(
         self,
@@ -153,69 +437,78 @@ class STT(stt.STT):
         conn_options: APIConnectOptions,
     ) -> stt.SpeechEvent:
         """实现语音识别"""
+        start_time = time.perf_counter()
         try:
-            # 合并音频帧并转换为 base64
-            combined_frame = rtc.combine_audio_frames(buffer)
-            audio_data = combined_frame.data.tobytes()
-            audio_base64 = base64.b64encode(audio_data).decode("utf-8")
+            current_language = language if is_given(language) else self._opts.language
 
-            # 构建请求
-            url = urljoin(
-                self._base_url, "/api/v1/services/aigc/multimodal-generation/generation"
+            frames = [buffer] if isinstance(buffer, rtc.AudioFrame) else list(buffer)
+            audio_duration = sum(frame.duration for frame in frames)
+            # 重采样是 CPU 密集操作（48kHz 输入约 1ms/音频秒），放在线程中执行
+            pcm_chunks, trimmed_duration = await asyncio.to_thread(
+                self._prepare_audio, frames
             )
+            codec, chunks, encode_duration = await self._encode_upload(
+                pcm_chunks, trimmed_duration
+            )
+            data_url_prefix = audio_codec.data_url_prefix(codec, SAMPLE_RATE)
 
-            current_language = language if is_given(language) else self._opts.language
-
-            payload = {
-                "model": self._opts.model,
-                "input": {
-                    "messages": [
-                        {
-                            "content": [{"text": self._opts.prompt}],
-                            "role": "system",
-                        },
-                        {
-                            "content": [
-                                {
-                                    "audio": f"data:audio/pcm;rate={SAMPLE_RATE};base64,{audio_base64}"
-                                }
-                            ],
-                            "role": "user",
-                        },
-                    ]
-                },
-                "parameters": {
-                    "asr_options": {
-                        "enable_itn": self._opts.enable_itn,
-                    }
-                },
-            }
+            async def _send(
+                client: httpx.AsyncClient, base_url: str, api_key: str
+            ) -> dict[str, Any]:
+                # 超时按该端点同等时长音频的识别耗时分位数自适应，
+                # conn_options.timeout 作为上限
+                latency = adaptive_timeout.tracker(
+                    base_url, "recognize", reference_size=RECOGNIZE_REFERENCE_SECONDS
+                )
+                timeout = latency.timeout(
+                    trimmed_duration, ceiling=conn_options.timeout
+                )
+                content_length, body = self._request_body(
+                    chunks, data_url_prefix=data_url_prefix
+                )
+                headers = {
+                    "Authorization": f"Bearer {api_key}",
+                    "Content-Type": "application/json",
+                    "Content-Length": str(content_length),
+                }
 
-            headers = {
-                "Authorization": f"Bearer {self._api_key}",
-                "Content-Type": "application/json",
-            }
+                # 发送请求
+                start = time.perf_counter()
+                worker_load.request_started("stt")
+                try:
+                    response = await client.post(
+                        urljoin(base_url, _RECOGNIZE_PATH),
+                        content=body,
+                        headers=headers,
+                        timeout=httpx.Timeout(timeout, connect=conn_options.timeout),
+                    )
+                except httpx.TimeoutException:
+                    latency.record_timeout()
+                    raise
+                finally:
+                    worker_load.request_finished("stt")
 
-            # 发送请求
-            response = await self._client.post(
-                url,
-                json=payload,
-                headers=headers,
-                timeout=httpx.Timeout(
-                    conn_options.timeout, connect=conn_options.timeout
-                ),
-            )
+                if response.status_code != 200:
+                    raise APIStatusError(
+                        message=f"Qwen3-ASR API error: {response.text}",
+                        status_code=response.status_code,
+                        request_id=response.headers.get("X-Request-Id", ""),
+                        body=response.text,
+                    )
+                latency.record(time.perf_counter() - start, trimmed_duration)
+                return response.json()
 
-            if response.status_code != 200:
-                raise APIStatusError(
-                    message=f"Qwen3-ASR API error: {response.text}",
-                    status_code=response.status_code,
-                    request_id=response.headers.get("X-Request-Id", ""),
-                    body=response.text,
+            hedged = False
+            if self._hedge is None:
+                result = await _send(self._client, self._base_url, self._api_key)
+            else:
+                hedge = self._hedge
+                result, hedged = await hedging.hedged(
+                    lambda: _send(self._client, self._base_url, self._api_key),
+                    lambda: _send(hedge.client, hedge.base_url, hedge.api_key),
+                    policy=hedge.policy,
                 )
 
-            result = response.json()
-
             # 解析响应
             text = ""
             if "output" in result and "choices" in result["output"]:
@@ -226,8 +519,38 @@ class STT(stt.STT):
                     if content and len(content) > 0:
                         text = content[0].get("text", "")
 
+            request_id = result.get("request_id", "")
+            upload_bytes = audio_utils.base64_encoded_len(
+                sum(memoryview(chunk).nbytes for chunk in chunks)
+            )
+            pcm_bytes = audio_utils.base64_encoded_len(
+                sum(frame.data.nbytes for frame in frames)
+            )
+            self.emit(
+                "metrics_collected",
+                UploadSTTMetrics(
+                    request_id=request_id,
+                    timestamp=time.time(),
+                    duration=time.perf_counter() - start_time,
+                    label=self._label,
+                    audio_duration=audio_duration,
+                    streamed=False,
+                    metadata=Metadata(
+                        model_name=self.model, model_provider=self.provider
+                    ),
+                    upload_codec=codec,
+                    upload_bytes=upload_bytes,
+                    pcm_bytes=pcm_bytes,
+                    bytes_saved=pcm_bytes - upload_bytes,
+                    encode_duration=encode_duration,
+                    trimmed_audio_duration=trimmed_duration,
+                    hedged=hedged,
+                ),
+            )
+
             return stt.SpeechEvent(
                 type=stt.SpeechEventType.FINAL_TRANSCRIPT,
+                request_id=request_id,
                 alternatives=[
                     stt.SpeechData(
                         text=text,
@@ -245,9 +568,228 @@ class STT(stt.STT):
                 request_id=e.response.headers.get("X-Request-Id", ""),
                 body=e.response.text,
             ) from None
+        except APIError:
+            # 非 200 响应、对冲等处已映射为 APIError，保留原类型供重试与故障切换判断
+            raise
         except Exception as e:
             raise APIConnectionError() from e
 
     async def aclose(self) -> None:
-        """关闭客户端"""
-        await self._client.aclose()
+        """释放客户端（共享连接池在最后一个使用者释放时关闭）"""
+        await http_pool.release_client(self._client)
+        if self._hedge is not None:
+            await http_pool.release_client(self._hedge.client)
+
+
+class SpeechStream(stt.SpeechStream):
+    """
+    基于 DashScope 实时识别 WebSocket 协议的流式识别。
+
+    用户说话期间持续上传 100ms 的 PCM 分片，服务端返回的
+    conversation.item.input_audio_transcription.text 作为中间结果，
+    completed 事件作为最终结果。
+    """
+
+    def __init__(
+        self, *, stt: STT, conn_options: APIConnectOptions, language: str
+    ) -> None:
+        super().__init__(stt=stt, conn_options=conn_options, sample_rate=SAMPLE_RATE)
+        self._stt: STT = stt
+        self._language = language
+        self._request_id = ""
+        # 自上一次最终结果以来上传的音频时长，用于上报识别用量
+        self._pending_audio_duration = 0.0
+
+    def _session_update(self) -> dict[str, Any]:
+        opts = self._stt._opts
+        turn_detection: dict[str, Any] | None = None
+        if opts.server_vad:
+            turn_detection = {
+                "type": "server_vad",
+                "silence_duration_ms": opts.silence_duration_ms,
+            }
+
+        return {
+            "event_id": _event_id(),
+            "type": "session.update",
+            "session": {
+                "modalities": ["text"],
+                "input_audio_format": "pcm",
+                "sample_rate": SAMPLE_RATE,
+                "input_audio_transcription": {"language": self._language},
+                "turn_detection": turn_detection,
+            },
+        }
+
+    async def _run(self) -> None:
+        closing_ws = False
+
+        async def send_task(ws: aiohttp.ClientWebSocketResponse) -> None:
+            nonlocal closing_ws
+
+            audio_bstream = utils.audio.AudioByteStream(
+                sample_rate=SAMPLE_RATE,
+                num_channels=NUM_CHANNELS,
+                samples_per_channel=STREAM_CHUNK_SAMPLES,
+            )
+
+            async for data in self._input_ch:
+                if isinstance(data, rtc.AudioFrame):
+                    frames = audio_bstream.write(data.data.tobytes())
+                else:
+                    frames = audio_bstream.flush()
+
+                for frame in frames:
+                    self._pending_audio_duration += frame.duration
+                    await ws.send_str(
+                        json.dumps(
+                            {
+                                "event_id": _event_id(),
+                                "type": "input_audio_buffer.append",
+                                "audio": base64.b64encode(frame.data).decode("utf-8"),
+                            }
+                        )
+                    )
+
+                # 未启用服务端 VAD 时，由 flush（本地 VAD 判定说话结束）触发提交
+                if isinstance(data, self._FlushSentinel) and not self._stt._opts.server_vad:
+                    await ws.send_str(
+                        json.dumps(
+                            {"event_id": _event_id(), "type": "input_audio_buffer.commit"}
+                        )
+                    )
+
+            closing_ws = True
+            await ws.send_str(
+                json.dumps({"event_id": _event_id(), "type": "session.finish"})
+            )
+
+        async def recv_task(ws: aiohttp.ClientWebSocketResponse) -> None:
+            while True:
+                msg = await ws.receive()
+                if msg.type in (
+                    aiohttp.WSMsgType.CLOSED,
+                    aiohttp.WSMsgType.CLOSE,
+                    aiohttp.WSMsgType.CLOSING,
+                ):
+                    if closing_ws:
+                        return
+                    # 抛出 APIStatusError 交给基类重试
+                    raise APIStatusError(
+                        message="Qwen3-ASR realtime connection closed unexpectedly",
+                        request_id=self._request_id,
+                    )
+
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    continue
+
+                data = json.loads(msg.data)
+                if self._handle_event(data):
+                    return
+
+        url = self._stt._realtime_url()
+        headers = {
+            "Authorization": f"Bearer {self._stt._api_key}",
+            "OpenAI-Beta": "realtime=v1",
+        }
+
+        try:
+            ws = await asyncio.wait_for(
+                self._stt._ensure_session().ws_connect(url, headers=headers),
+                self._conn_options.timeout,
+            )
+        except asyncio.TimeoutError:
+            raise APITimeoutError() from None
+        except aiohttp.ClientResponseError as e:
+            raise APIStatusError(
+                message=f"Qwen3-ASR realtime handshake failed: {e.message}",
+                status_code=e.status,
+            ) from None
+        except aiohttp.ClientError as e:
+            raise APIConnectionError() from e
+
+        try:
+            await ws.send_str(json.dumps(self._session_update()))
+
+            tasks = [
+                asyncio.create_task(send_task(ws)),
+                asyncio.create_task(recv_task(ws)),
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                await utils.aio.gracefully_cancel(*tasks)
+        finally:
+            await ws.close()
+
+    def _handle_event(self, data: dict[str, Any]) -> bool:
+        """处理服务端事件，返回 True 表示会话已结束"""
+        event_type = data.get("type")
+
+        if event_type == "session.created":
+            self._request_id = data.get("session", {}).get("id", "")
+        elif event_type == "input_audio_buffer.speech_started":
+            self._event_ch.send_nowait(
+                stt.SpeechEvent(
+                    type=stt.SpeechEventType.START_OF_SPEECH,
+                    request_id=self._request_id,
+                )
+            )
+        elif event_type == "input_audio_buffer.speech_stopped":
+            self._event_ch.send_nowait(
+                stt.SpeechEvent(
+                    type=stt.SpeechEventType.END_OF_SPEECH,
+                    request_id=self._request_id,
+                )
+            )
+        elif event_type == "conversation.item.input_audio_transcription.text":
+            # text 为已确认部分，stash 为尚未确认的尾部
+            text = data.get("text", "") + data.get("stash", "")
+            if text:
+                self._event_ch.send_nowait(
+                    stt.SpeechEvent(
+                        type=stt.SpeechEventType.INTERIM_TRANSCRIPT,
+                        request_id=self._request_id,
+                        alternatives=[
+                            stt.SpeechData(text=text, language=self._language)
+                        ],
+                    )
+                )
+        elif event_type == "conversation.item.input_audio_transcription.completed":
+            transcript = data.get("transcript", "")
+            if transcript:
+                self._event_ch.send_nowait(
+                    stt.SpeechEvent(
+                        type=stt.SpeechEventType.FINAL_TRANSCRIPT,
+                        request_id=self._request_id,
+                        alternatives=[
+                            stt.SpeechData(text=transcript, language=self._language)
+                        ],
+                    )
+                )
+            if self._pending_audio_duration > 0:
+                self._event_ch.send_nowait(
+                    stt.SpeechEvent(
+                        type=stt.SpeechEventType.RECOGNITION_USAGE,
+                        request_id=self._request_id,
+                        recognition_usage=stt.RecognitionUsage(
+                            audio_duration=self._pending_audio_duration
+                        ),
+                    )
+                )
+                self._pending_audio_duration = 0.0
+        elif event_type == "error":
+            error = data.get("error", {})
+            raise APIStatusError(
+                message=f"Qwen3-ASR realtime error: {error.get('message', '')}",
+                request_id=self._request_id,
+                body=error,
+            )
+        elif event_type == "session.finished":
+            return True
+
+        return False
+
+
+def _event_id() -> str:
+    return f"event_{uuid.uuid4().hex[:16]}"
@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import importlib
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# 已配置 provider 的模块导入总耗时超过该值（秒）时输出警告
+DEFAULT_IMPORT_BUDGET = 1.0
+
+# 未指定 TTS_CACHE_DIR 时合成缓存的磁盘目录。默认的进程执行器中每个通话一个进程，
+# 只有磁盘层能在通话之间命中
+DEFAULT_TTS_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "voice-agent-tts")
+
+
+@dataclass(frozen=True)
+class ProviderSpec:
+    module: str
+    factory: str
+    """模块中的工厂，可以是类名或 "类名.类方法"（如 "LLM.with_deepseek"）"""
+    options: dict[str, Any] = field(default_factory=dict)
+    env: dict[str, str] = field(default_factory=dict)
+    """参数名 -> 环境变量名，环境变量非空时覆盖 options"""
+    warm: str | None = None
+    """模块中按相同参数生成 keep_warm.WarmTarget 的函数名，只有本地 TTS 提供"""
+
+    def resolve_options(self, overrides: dict[str, Any] | None = None) -> dict[str, Any]:
+        options = dict(self.options)
+        for name, var in self.env.items():
+            if value := os.environ.get(var):
+                options[name] = value
+        options.update(overrides or {})
+        return options
+
+
+STT_PROVIDERS: dict[str, ProviderSpec] = {
+    "qwen": ProviderSpec(
+        "providers.qwen_asr_stt",
+        "STT",
+        options={"model": "qwen3-asr-flash", "language": "zh", "enable_itn": True},
+        env={"api_key": "DASHSCOPE_API_KEY", "base_url": "DASHSCOPE_BASE_URL"},
+    ),
+}
+
+LLM_PROVIDERS: dict[str, ProviderSpec] = {
+    "siliconflow": ProviderSpec(
+        "livekit.plugins.openai",
+        "LLM.with_deepseek",
+        options={"model": "Qwen/Qwen3-8B", "base_url": "https://api.siliconflow.cn/v1"},
+        env={"api_key": "SILICONFLOW_API_KEY"},
+    ),
+    "deepseek": ProviderSpec(
+        "livekit.plugins.openai", "LLM.with_deepseek", options={"model": "deepseek-chat"}
+    ),
+}
+
+TTS_PROVIDERS: dict[str, ProviderSpec] = {
+    "kokoro": ProviderSpec(
+        "providers.kokoro_tts",
+        "TTS",
+        env={"base_url": "KOKORO_BASE_URL"},
+        warm="warm_target",
+    ),
+    "indextts": ProviderSpec(
+        "providers.local_indexTTS",
+        "IndexTTS",
+        options={"voice": "jay_klee", "response_format": "wav", "timeout": 30.0},
+        env={"base_url": "INDEXTTS_BASE_URL", "voice": "INDEXTTS_VOICE"},
+        warm="warm_target",
+    ),
+    "indextts_chaos": ProviderSpec(
+        "providers.local_indextts_chaos",
+        "TTS",
+        options={"speaker": "忧伤女声.pt", "volume": 1.9},
+        env={"base_url": "INDEXTTS_CHAOS_BASE_URL", "speaker": "INDEXTTS_CHAOS_SPEAKER"},
+        warm="warm_target",
+    ),
+    "minimax": ProviderSpec(
+        "livekit.plugins.minimax",
+        "TTS",
+        options={
+            "base_url": "https://api.minimaxi.com",
+            "model": "speech-2.6-hd",
+            "voice": "Chinese (Mandarin)_Gentleman",
+        },
+    ),
+}
+
+_FAILOVER = ProviderSpec("providers.tts_failover", "FailoverTTS")
+_CACHE = ProviderSpec("providers.tts_cache", "CachedTTS")
+
+
+def _lookup(kind: str, providers: dict[str, ProviderSpec], name: str) -> ProviderSpec:
+    if name not in providers:
+        raise ValueError(
+            f"unknown {kind} provider {name!r}, expected one of {', '.join(providers)}"
+        )
+    return providers[name]
+
+
+class ProviderConfig:
+    """
+    按配置选择 STT/LLM/TTS 后端，只导入实际用到的模块。
+
+    构造时只校验配置，不导入任何 provider：worker 主进程（以及 forkserver）导入
+    agent server 模块时不再加载 openai 等插件。所选模块在第一次调用 create_*() 时
+    导入（通常在 job 进程的 prewarm 中），各模块的导入耗时记录在 import_seconds，
+    总耗时超过 import_budget 时输出警告。
+
+    livekit 插件只能在主线程注册。进程模式下 prewarm 在 job 进程的主线程执行；
+    线程模式（console、Windows）下 job 与 prewarm 在 worker 进程的其他线程中运行，
+    需要在启动 worker 前于主线程调用 preload()。
+    warm_targets() 供 worker 主进程保温使用，只导入本地 TTS 模块，不构造 provider。
+
+    tts 可以是逗号分隔的多个后端，此时 create_tts() 返回按健康度切换的 FailoverTTS。
+    tts_cache 为 True（或给出 tts_cache_dir）时 create_tts() 的结果再包一层 CachedTTS，
+    常用短句直接从缓存播放。磁盘层目录为 tts_cache_dir，未给出时使用 DEFAULT_TTS_CACHE_DIR：
+    内存层随 job 进程结束，磁盘层由同一主机上的所有通话共享。
+    """
+
+    def __init__(
+        self,
+        *,
+        stt: str,
+        llm: str,
+        tts: str,
+        tts_cache: bool = False,
+        tts_cache_dir: str | None = None,
+        import_budget: float = DEFAULT_IMPORT_BUDGET,
+    ) -> None:
+        self.stt = stt
+        self.llm = llm
+        self.tts = [name.strip() for name in tts.split(",") if name.strip()]
+        if not self.tts:
+            raise ValueError("at least one TTS provider is required")
+        self.tts_cache = tts_cache or bool(tts_cache_dir)
+        self._tts_cache_dir = tts_cache_dir or DEFAULT_TTS_CACHE_DIR
+
+        self._stt_spec = _lookup("stt", STT_PROVIDERS, stt)
+        self._llm_spec = _lookup("llm", LLM_PROVIDERS, llm)
+        self._tts_specs = {name: _lookup("tts", TTS_PROVIDERS, name) for name in self.tts}
+
+        self._specs = [self._stt_spec, self._llm_spec, *self._tts_specs.values()]
+        if len(self.tts) > 1:
+            self._specs.append(_FAILOVER)
+        if self.tts_cache:
+            self._specs.append(_CACHE)
+
+        self.import_seconds: dict[str, float] = {}
+        self._import_budget = import_budget
+        self._over_budget = False
+        self._factories: dict[tuple[str, str], Callable[..., Any]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, *, stt: str, llm: str, tts: str, **kwargs: Any) -> ProviderConfig:
+        """
+        读取 STT_PROVIDER / LLM_PROVIDER / TTS_PROVIDER，未设置或为空时使用传入的默认值；
+        TTS_CACHE=1 启用合成缓存，TTS_CACHE_DIR 指定磁盘层目录
+        """
+        kwargs.setdefault("tts_cache", os.environ.get("TTS_CACHE", "0") not in ("", "0"))
+        kwargs.setdefault("tts_cache_dir", os.environ.get("TTS_CACHE_DIR") or None)
+        return cls(
+            stt=os.environ.get("STT_PROVIDER") or stt,
+            llm=os.environ.get("LLM_PROVIDER") or llm,
+            tts=os.environ.get("TTS_PROVIDER") or tts,
+            **kwargs,
+        )
+
+    def preload(self) -> None:
+        """立即导入所有所选模块，供线程模式在主线程提前调用"""
+        for spec in self._specs:
+            self._factory(spec)
+
+    def _factory(self, spec: ProviderSpec) -> Callable[..., Any]:
+        key = (spec.module, spec.factory)
+        with self._lock:
+            factory = self._factories.get(key)
+            if factory is None:
+                factory = self._factories[key] = self._load(spec)
+            return factory
+
+    def _load(self, spec: ProviderSpec) -> Callable[..., Any]:
+        start = time.perf_counter()
+        factory: Any = importlib.import_module(spec.module)
+        self.import_seconds.setdefault(spec.module, time.perf_counter() - start)
+        for attr in spec.factory.split("."):
+            factory = getattr(factory, attr)
+
+        total = sum(self.import_seconds.values())
+        if total > self._import_budget and not self._over_budget:
+            self._over_budget = True
+            logger.warning(
+                "provider imports took %.2fs (budget %.2fs): %s",
+                total,
+                self._import_budget,
+                ", ".join(f"{m} {s:.2f}s" for m, s in self.import_seconds.items()),
+            )
+        return factory
+
+    def _create(self, spec: ProviderSpec, overrides: dict[str, Any] | None) -> Any:
+        return self._factory(spec)(**spec.resolve_options(overrides))
+
+    def create_stt(self, **overrides: dict[str, Any]) -> Any:
+        """overrides 按 provider 名给出额外参数，只对被选中的 provider 生效"""
+        return self._create(self._stt_spec, overrides.get(self.stt))
+
+    def create_llm(self, **overrides: dict[str, Any]) -> Any:
+        return self._create(self._llm_spec, overrides.get(self.llm))
+
+    def create_tts(self, **overrides: dict[str, Any]) -> Any:
+        backends = [
+            self._create(spec, overrides.get(name))
+            for name, spec in self._tts_specs.items()
+        ]
+        if len(backends) == 1:
+            tts = backends[0]
+        else:
+            tts = self._factory(_FAILOVER)(backends)
+        if self.tts_cache:
+            tts = self._factory(_CACHE)(tts, disk_dir=self._tts_cache_dir)
+        return tts
+
+    def warm_targets(self, **overrides: dict[str, Any]) -> list[Any]:
+        """
+        所配置 TTS 中本地后端的 keep_warm.WarmTarget，参数与 create_tts() 相同。
+        不创建任何 TTS，云端后端（没有 warm 函数）跳过，其插件不会被导入。
+        """
+        targets = []
+        for name, spec in self._tts_specs.items():
+            if spec.warm is None:
+                logger.debug("tts provider %s has no warm target, not keeping it warm", name)
+                continue
+            warm_target = self._factory(ProviderSpec(spec.module, spec.warm))
+            targets.append(warm_target(**spec.resolve_options(overrides.get(name))))
+        return targets
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import asyncio
+import re
+
+from livekit import rtc
+from livekit.agents import APIConnectOptions, tts, utils
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS
+
+from .audio_utils import FramedEmitter
+
+# 句末标点：遇到即断句
+SENTENCE_TERMINATORS = "。！？；!?;…\n"
+# 分句标点：只有片段足够长时才在此处断开
+CLAUSE_DELIMITERS = "，、：,:—"
+# 紧跟在句末标点后、应归入上一句的字符
+CLOSING_PUNCTUATION = "”’」』）》】)]\"'"
+
+DEFAULT_PIPELINE_DEPTH = 2
+
+_LEADING_WHITESPACE = re.compile(r"\s*")
+
+# 整个流只重试内部的逐句合成，外层不重试（输入文本已被消费）
+_STREAM_CONN_OPTIONS = APIConnectOptions(
+    max_retry=0, timeout=DEFAULT_API_CONNECT_OPTIONS.timeout
+)
+
+
+class SentenceSplitter:
+    """
+    面向中英文混合 LLM 输出的增量断句器。
+
+    - 句末标点（。！？；… 及换行、英文 !?;）处断句，后续的引号括号归入上一句
+    - 英文句点只有后面跟空白时才视为句末，避免切断 3.14 之类的小数
+    - 第一段在 first_clause_len 字后遇到逗号等分句标点即输出，让回答尽早开口；
+      之后只有超过 max_clause_len 字的长句才在分句标点处切开
+    - 短于 min_sentence_len 的句子与下一句合并，避免语气断续
+
+    已确认不是切分点的前缀不会重复扫描，每个 token 的开销与其长度而非缓冲区长度成正比。
+    """
+
+    def __init__(
+        self,
+        *,
+        min_sentence_len: int = 4,
+        first_clause_len: int = 6,
+        max_clause_len: int = 40,
+    ) -> None:
+        self._min_sentence_len = min_sentence_len
+        self._first_clause_len = first_clause_len
+        self._max_clause_len = max_clause_len
+        self._buf = ""
+        self._emitted = 0
+        # 已扫描且确认不是切分点的前缀长度，以及其中最后一个非空白字符的下标
+        self._scan = 0
+        self._last_visible = -1
+
+    def push(self, text: str) -> list[str]:
+        self._buf += text
+        sentences = []
+        while (cut := self._find_cut()) is not None:
+            sentence = self._buf[:cut].strip()
+            self._buf = self._buf[cut:]
+            self._scan = 0
+            self._last_visible = -1
+            if sentence:
+                sentences.append(sentence)
+                self._emitted += 1
+        return sentences
+
+    def flush(self) -> list[str]:
+        """输出缓冲中剩余的文本，并重置为新一段回复的状态"""
+        sentence = self._buf.strip()
+        self._buf = ""
+        self._emitted = 0
+        self._scan = 0
+        self._last_visible = -1
+        return [sentence] if sentence else []
+
+    def _find_cut(self) -> int | None:
+        buf = self._buf
+        n = len(buf)
+        # buf[:k].strip() 的长度 = 最后一个非空白字符下标 + 1 - 前导空白长度
+        lead = _LEADING_WHITESPACE.match(buf).end()
+        last_visible = self._last_visible
+        i = self._scan
+        while i < n:
+            ch = buf[i]
+            end: int | None = None
+            if ch in SENTENCE_TERMINATORS:
+                end = i + 1
+                while end < n and (
+                    buf[end] in SENTENCE_TERMINATORS or buf[end] in CLOSING_PUNCTUATION
+                ):
+                    end += 1
+                if end == n:
+                    # 后面可能还有引号或连续的标点，等下一个 token 再决定
+                    break
+            elif ch == ".":
+                if i + 1 == n:
+                    break
+                if buf[i + 1].isspace():
+                    end = i + 1
+            elif ch in CLAUSE_DELIMITERS:
+                limit = self._first_clause_len if self._emitted == 0 else self._max_clause_len
+                if last_visible + 1 - lead >= limit:
+                    return i + 1
+
+            if end is not None:
+                visible = last_visible
+                for j in range(i, end):
+                    if not buf[j].isspace():
+                        visible = j
+                if visible + 1 - lead >= self._min_sentence_len:
+                    return end
+
+            if not ch.isspace():
+                last_visible = i
+            i += 1
+
+        self._scan = i
+        self._last_visible = last_visible
+        return None
+
+
+class PipelinedSynthesizeStream(tts.SynthesizeStream):
+    """
+    按句流水线合成的 SynthesizeStream。
+
+    输入 token 经 SentenceSplitter 切句后立即调用 tts.synthesize() 发起请求，
+    同时在途的请求不超过 depth 个；播放严格按句子顺序进行，
+    从而让 LLM 生成、合成与播放三者重叠。
+
+    每句的 ChunkedStream 照常上报自己的指标（streamed=False）；整段另由基类上报一条
+    streamed=True 的指标，首包延迟从收到第一个 token 算起，包含断句等待的时间。
+    输出的采样率与声道数取第一帧音频，之后采样率不同的句子会被重采样。
+    """
+
+    def __init__(
+        self,
+        *,
+        tts: tts.TTS,
+        conn_options: APIConnectOptions,
+        depth: int = DEFAULT_PIPELINE_DEPTH,
+    ) -> None:
+        super().__init__(tts=tts, conn_options=_STREAM_CONN_OPTIONS)
+        self._sentence_conn_options = conn_options
+        self._depth = max(1, depth)
+
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        emitter = FramedEmitter(output_emitter)
+        initialized = False
+
+        def _initialize(sample_rate: int, num_channels: int) -> None:
+            nonlocal initialized
+            emitter.initialize(
+                request_id=utils.shortuuid(),
+                sample_rate=sample_rate,
+                num_channels=num_channels,
+                mime_type="audio/pcm",
+                stream=True,
+            )
+            emitter.start_segment(segment_id=utils.shortuuid())
+            initialized = True
+
+        splitter = SentenceSplitter()
+        slots = asyncio.Semaphore(self._depth)
+        pending: asyncio.Queue[tts.ChunkedStream | None] = asyncio.Queue()
+
+        async def _submit(sentences: list[str]) -> None:
+            for sentence in sentences:
+                await slots.acquire()
+                pending.put_nowait(
+                    self._tts.synthesize(
+                        sentence, conn_options=self._sentence_conn_options
+                    )
+                )
+
+        async def _forward_input() -> None:
+            async for data in self._input_ch:
+                if isinstance(data, self._FlushSentinel):
+                    await _submit(splitter.flush())
+                else:
+                    self._mark_started()
+                    await _submit(splitter.push(data))
+
+            await _submit(splitter.flush())
+            pending.put_nowait(None)
+
+        async def _playback() -> None:
+            sample_rate = 0
+            while (stream := await pending.get()) is not None:
+                resampler: rtc.AudioResampler | None = None
+                try:
+                    async with stream:
+                        async for audio in stream:
+                            frame = audio.frame
+                            if not initialized:
+                                sample_rate = frame.sample_rate
+                                _initialize(sample_rate, frame.num_channels)
+                            elif resampler is None and frame.sample_rate != sample_rate:
+                                resampler = rtc.AudioResampler(
+                                    frame.sample_rate,
+                                    sample_rate,
+                                    num_channels=frame.num_channels,
+                                )
+                            if resampler is None:
+                                emitter.push(frame.data)
+                            else:
+                                for resampled in resampler.push(frame):
+                                    emitter.push(resampled.data)
+                    if resampler is not None:
+                        for resampled in resampler.flush():
+                            emitter.push(resampled.data)
+                    if initialized:
+                        emitter.flush()
+                finally:
+                    slots.release()
+
+        tasks = [
+            asyncio.create_task(_forward_input()),
+            asyncio.create_task(_playback()),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+            if not initialized:
+                # 没有产出任何音频（如输入为空），按 TTS 声明的格式结束
+                _initialize(self._tts.sample_rate, self._tts.num_channels)
+        finally:
+            await utils.aio.cancel_and_wait(*tasks)
+            # 取消时关闭已发起但尚未播放的请求
+            while not pending.empty():
+                if stream := pending.get_nowait():
+                    await stream.aclose()
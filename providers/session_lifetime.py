@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Coroutine
+from typing import Any, TypeVar
+
+from livekit import rtc
+from livekit.agents import AgentSession, CloseEvent
+from livekit.agents.utils import aio
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_STEP_TIMEOUT = 5.0
+
+
+class SessionLifetime:
+    """
+    单个 job 的会话生命周期：等待 AgentSession 关闭或房间断开，然后按固定顺序清理。
+
+    监听在构造时注册，wait() 之前发生的关闭/断开也不会错过。aclose() 的顺序为：
+    1. 关闭 AgentSession，之后不会再发起新的 STT/LLM/TTS 请求
+    2. 按注册顺序执行 add_cleanup() 登记的步骤（provider、指标连接等）
+    3. 取消经 create_task() 创建、仍在运行的后台任务
+
+    每一步最多等待 step_timeout 秒，出错或超时只记录日志，后续步骤照常执行。
+    aclose() 可以重复调用（例如同时注册为 job 的 shutdown 回调），只会清理一次。
+    """
+
+    def __init__(
+        self,
+        session: AgentSession,
+        room: rtc.Room | None = None,
+        *,
+        step_timeout: float = DEFAULT_STEP_TIMEOUT,
+    ) -> None:
+        self._session = session
+        self._room = room
+        self._step_timeout = step_timeout
+        self._cleanups: list[tuple[str, Callable[[], Awaitable[Any]]]] = []
+        self._tasks: set[asyncio.Task[Any]] = set()
+        self._ended: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+        self._close_task: asyncio.Task[None] | None = None
+
+        session.on("close", self._on_session_close)
+        if room is not None:
+            room.on("disconnected", self._on_room_disconnected)
+
+    @property
+    def ended(self) -> bool:
+        return self._ended.done()
+
+    def _end(self, reason: str) -> None:
+        if not self._ended.done():
+            self._ended.set_result(reason)
+
+    def _on_session_close(self, ev: CloseEvent) -> None:
+        self._end(f"session closed: {ev.reason.value}")
+
+    def _on_room_disconnected(self, *args: Any) -> None:
+        self._end("room disconnected")
+
+    async def wait(self) -> str:
+        """等待会话关闭或房间断开，返回结束原因"""
+        return await asyncio.shield(self._ended)
+
+    def add_cleanup(self, name: str, fn: Callable[[], Awaitable[Any]]) -> None:
+        self._cleanups.append((name, fn))
+
+    def create_task(
+        self, coro: Coroutine[Any, Any, T], *, name: str | None = None
+    ) -> asyncio.Task[T]:
+        """创建随会话结束而取消的后台任务"""
+        task = asyncio.create_task(coro, name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def aclose(self, reason: str = "job shutdown") -> None:
+        self._end(reason)
+        if self._close_task is None:
+            self._close_task = asyncio.create_task(self._cleanup())
+        await asyncio.shield(self._close_task)
+
+    async def _step(self, name: str, fn: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            await asyncio.wait_for(fn(), self._step_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("session cleanup step %s timed out", name)
+        except Exception:
+            logger.exception("session cleanup step %s failed", name)
+
+    async def _cleanup(self) -> None:
+        self._session.off("close", self._on_session_close)
+        if self._room is not None:
+            self._room.off("disconnected", self._on_room_disconnected)
+
+        await self._step("session", self._session.aclose)
+        for name, fn in self._cleanups:
+            await self._step(name, fn)
+        if self._tasks:
+            tasks = list(self._tasks)
+            await self._step("tasks", lambda: aio.cancel_and_wait(*tasks))
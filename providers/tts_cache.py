@@ -0,0 +1,392 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, is_dataclass
+from pathlib import Path
+
+from livekit.agents import APIConnectOptions, tts, utils
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS
+from livekit.agents.utils import aio
+
+from .audio_utils import FramedEmitter
+from .sentence_stream import DEFAULT_PIPELINE_DEPTH, PipelinedSynthesizeStream
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_MEMORY_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 1024 * 1024 * 1024
+DEFAULT_MAX_TEXT_CHARS = 120
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """NFKC 规范化（全角转半角等）并合并空白"""
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+@dataclass
+class CacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    memory_evictions: int = 0
+    disk_evictions: int = 0
+    memory_bytes: int = 0
+    disk_bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / total if total else 0.0
+
+
+@dataclass
+class _CacheEntry:
+    pcm: bytes
+    sample_rate: int
+    num_channels: int
+
+
+class SynthesisCache:
+    """
+    两级合成结果缓存：按字节数限容的内存 LRU，加可选的磁盘 PCM 存储。
+
+    磁盘条目文件名为 ``<key>_<sample_rate>_<num_channels>.pcm``，命中时在线程中读取
+    并提升到内存层，不阻塞事件循环；磁盘同样按总字节数做 LRU 淘汰（启动时按 mtime
+    恢复顺序）。读取失败或长度不是整数个采样的条目视为损坏，删除后不再计入 disk_bytes。
+
+    内存层只在本进程内有效。默认的进程执行器中每个通话一个进程，跨通话的命中来自磁盘层：
+    多个 job 进程可以共用同一目录，各自在创建时扫描已有条目，写入经临时文件原子替换。
+    每个进程只统计和淘汰自己见过的条目，目录总大小因此可能略超过 max_disk_bytes；
+    已被其他进程淘汰的条目在读取时直接忽略。
+    """
+
+    def __init__(
+        self,
+        *,
+        max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES,
+        disk_dir: str | os.PathLike[str] | None = None,
+        max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES,
+    ) -> None:
+        self._max_memory_bytes = max_memory_bytes
+        self._max_disk_bytes = max_disk_bytes
+        self._memory: OrderedDict[str, _CacheEntry] = OrderedDict()
+        # key -> (文件路径, 字节数)
+        self._disk: OrderedDict[str, tuple[Path, int]] = OrderedDict()
+        self._disk_dir = Path(disk_dir) if disk_dir else None
+        self.stats = CacheStats()
+
+        if self._disk_dir:
+            self._disk_dir.mkdir(parents=True, exist_ok=True)
+            files = sorted(self._disk_dir.glob("*.pcm"), key=lambda p: p.stat().st_mtime)
+            for path in files:
+                size = path.stat().st_size
+                self._disk[path.stem.split("_", 1)[0]] = (path, size)
+                self.stats.disk_bytes += size
+            self._evict_disk()
+
+    @staticmethod
+    def make_key(*, provider: str, params: dict, text: str) -> str:
+        raw = json.dumps(
+            {"provider": provider, "params": params, "text": normalize_text(text)},
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._memory or key in self._disk
+
+    def get(self, key: str) -> _CacheEntry | None:
+        """内存命中"""
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            self.stats.memory_hits += 1
+        return entry
+
+    async def get_disk(self, key: str) -> _CacheEntry | None:
+        """磁盘命中，在线程中读取整个条目并提升到内存层"""
+        item = self._disk.get(key)
+        if item is None:
+            return None
+
+        path, _ = item
+        _, sample_rate, num_channels = path.stem.split("_")
+        try:
+            pcm = await asyncio.to_thread(path.read_bytes)
+        except FileNotFoundError:
+            # 已被共用该目录的其他进程淘汰
+            self._forget_disk(key)
+            return None
+        except OSError:
+            # 文件不可读
+            pcm = b""
+        if not pcm or len(pcm) % (2 * int(num_channels)):
+            self._drop_disk(key)
+            return None
+
+        entry = _CacheEntry(pcm, int(sample_rate), int(num_channels))
+        if key in self._disk:
+            self._disk.move_to_end(key)
+        self.stats.disk_hits += 1
+        self.put(key, entry)
+        return entry
+
+    def put(self, key: str, entry: _CacheEntry) -> None:
+        if len(entry.pcm) > self._max_memory_bytes:
+            return
+
+        if key in self._memory:
+            self.stats.memory_bytes -= len(self._memory.pop(key).pcm)
+        self._memory[key] = entry
+        self.stats.memory_bytes += len(entry.pcm)
+
+        while self.stats.memory_bytes > self._max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self.stats.memory_bytes -= len(evicted.pcm)
+            self.stats.memory_evictions += 1
+
+    async def put_disk(self, key: str, entry: _CacheEntry) -> None:
+        if not self._disk_dir or key in self._disk:
+            return
+
+        path = self._disk_dir / f"{key}_{entry.sample_rate}_{entry.num_channels}.pcm"
+        # 临时文件名带 pid，多个进程同时写入同一条目时互不干扰
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+
+        def _write() -> None:
+            tmp.write_bytes(entry.pcm)
+            os.replace(tmp, path)
+
+        try:
+            await asyncio.to_thread(_write)
+        except OSError:
+            logger.warning("failed to write tts cache entry %s", path, exc_info=True)
+            return
+
+        self._disk[key] = (path, len(entry.pcm))
+        self.stats.disk_bytes += len(entry.pcm)
+        self._evict_disk()
+
+    def _forget_disk(self, key: str) -> Path | None:
+        item = self._disk.pop(key, None)
+        if item is None:
+            return None
+        path, size = item
+        self.stats.disk_bytes -= size
+        return path
+
+    def _drop_disk(self, key: str) -> None:
+        """删除损坏的磁盘条目"""
+        path = self._forget_disk(key)
+        if path is None:
+            return
+        logger.warning("dropping corrupt tts cache entry %s", path)
+        try:
+            path.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+    def _evict_disk(self) -> None:
+        while self._disk and self.stats.disk_bytes > self._max_disk_bytes:
+            _, (path, size) = self._disk.popitem(last=False)
+            self.stats.disk_bytes -= size
+            self.stats.disk_evictions += 1
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                logger.warning("failed to remove tts cache entry %s", path, exc_info=True)
+
+
+class CachedTTS(tts.TTS):
+    """
+    为任意 TTS provider 增加合成结果缓存。
+
+    缓存键为 (provider, provider 的 _opts 配置, 规范化后的文本)，因此 speaker/voice、
+    speed/volume 变化后自然不会命中旧条目。命中时直接推送缓存的 PCM，不发起 HTTP 请求。
+    超过 max_text_chars 的文本不缓存，避免一次性长回复挤出常用短语。
+    未传入 cache 时新建一个 SynthesisCache，disk_dir 非空时启用磁盘层。
+
+    包装 FailoverTTS 时缓存键不区分实际出声的后端，命中的可能是另一个后端合成的音频。
+    """
+
+    def __init__(
+        self,
+        tts: tts.TTS,
+        *,
+        cache: SynthesisCache | None = None,
+        disk_dir: str | os.PathLike[str] | None = None,
+        max_text_chars: int = DEFAULT_MAX_TEXT_CHARS,
+        prewarm_phrases: list[str] | None = None,
+        pipeline_depth: int = DEFAULT_PIPELINE_DEPTH,
+    ) -> None:
+        super().__init__(
+            capabilities=tts.capabilities,
+            sample_rate=tts.sample_rate,
+            num_channels=tts.num_channels,
+        )
+        self._wrapped_tts = tts
+        self._cache = cache or SynthesisCache(disk_dir=disk_dir)
+        self._max_text_chars = max_text_chars
+        self._prewarm_phrases = list(prewarm_phrases or [])
+        self._pipeline_depth = pipeline_depth
+        self._prewarm_task: asyncio.Task | None = None
+
+    @property
+    def model(self) -> str:
+        return self._wrapped_tts.model
+
+    @property
+    def provider(self) -> str:
+        return self._wrapped_tts.provider
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._cache.stats
+
+    @property
+    def backends(self) -> list[tts.TTS]:
+        """被包装的实际后端，供 KeepWarm 等按后端处理的组件使用"""
+        return getattr(self._wrapped_tts, "backends", None) or [self._wrapped_tts]
+
+    def cache_key(self, text: str) -> str | None:
+        if len(text) > self._max_text_chars:
+            return None
+
+        opts = getattr(self._wrapped_tts, "_opts", None)
+        params = asdict(opts) if is_dataclass(opts) else {}
+        return SynthesisCache.make_key(
+            provider=self._wrapped_tts.label, params=params, text=text
+        )
+
+    def synthesize(
+        self,
+        text: str,
+        *,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+    ) -> CachedChunkedStream:
+        return CachedChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+    def stream(
+        self, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS
+    ) -> PipelinedSynthesizeStream:
+        # 逐句走 synthesize()，常用短句同样可以命中缓存
+        return PipelinedSynthesizeStream(
+            tts=self, conn_options=conn_options, depth=self._pipeline_depth
+        )
+
+    def prewarm(self) -> None:
+        self._wrapped_tts.prewarm()
+        if self._prewarm_phrases:
+            self._prewarm_task = asyncio.create_task(
+                self.fill(self._prewarm_phrases)
+            )
+
+    async def fill(self, phrases: list[str]) -> None:
+        """依次合成尚未缓存的短语"""
+        for phrase in phrases:
+            key = self.cache_key(phrase)
+            if key is None or key in self._cache:
+                continue
+            try:
+                async with self.synthesize(phrase) as stream:
+                    async for _ in stream:
+                        pass
+            except Exception:
+                logger.warning("failed to prewarm tts cache for %r", phrase, exc_info=True)
+
+    async def aclose(self) -> None:
+        if self._prewarm_task:
+            await aio.cancel_and_wait(self._prewarm_task)
+        await self._wrapped_tts.aclose()
+
+
+class CachedChunkedStream(tts.ChunkedStream):
+    def __init__(
+        self, *, tts: CachedTTS, input_text: str, conn_options: APIConnectOptions
+    ) -> None:
+        # 重试交给内部 provider 的 ChunkedStream，外层不重试，避免重复推送音频
+        super().__init__(
+            tts=tts,
+            input_text=input_text,
+            conn_options=APIConnectOptions(max_retry=0, timeout=conn_options.timeout),
+        )
+        self._tts: CachedTTS = tts
+        self._wrapped_conn_options = conn_options
+
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        emitter = FramedEmitter(output_emitter)
+        cache = self._tts._cache
+        key = self._tts.cache_key(self.input_text)
+
+        if key is not None:
+            if entry := cache.get(key):
+                emitter.initialize(
+                    request_id=utils.shortuuid(),
+                    sample_rate=entry.sample_rate,
+                    num_channels=entry.num_channels,
+                    mime_type="audio/pcm",
+                )
+                emitter.push(entry.pcm)
+                emitter.flush()
+                return
+
+            if entry := await cache.get_disk(key):
+                emitter.initialize(
+                    request_id=utils.shortuuid(),
+                    sample_rate=entry.sample_rate,
+                    num_channels=entry.num_channels,
+                    mime_type="audio/pcm",
+                )
+                emitter.push(entry.pcm)
+                emitter.flush()
+                return
+
+        cache.stats.misses += 1
+        pcm = bytearray()
+        initialized = False
+        sample_rate = self._tts.sample_rate
+        num_channels = self._tts.num_channels
+
+        async with self._tts._wrapped_tts.synthesize(
+            self.input_text, conn_options=self._wrapped_conn_options
+        ) as stream:
+            async for audio in stream:
+                if not initialized:
+                    sample_rate = audio.frame.sample_rate
+                    num_channels = audio.frame.num_channels
+                    emitter.initialize(
+                        request_id=audio.request_id or utils.shortuuid(),
+                        sample_rate=sample_rate,
+                        num_channels=num_channels,
+                        mime_type="audio/pcm",
+                    )
+                    initialized = True
+
+                emitter.push(audio.frame.data)
+                if key is not None:
+                    pcm += audio.frame.data
+
+        if not initialized:
+            emitter.initialize(
+                request_id=utils.shortuuid(),
+                sample_rate=sample_rate,
+                num_channels=num_channels,
+                mime_type="audio/pcm",
+            )
+        emitter.flush()
+
+        if key is not None and pcm:
+            entry = _CacheEntry(bytes(pcm), sample_rate, num_channels)
+            cache.put(key, entry)
+            await cache.put_disk(key, entry)
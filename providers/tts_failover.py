@@ -0,0 +1,438 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from typing import Literal
+
+from livekit import rtc
+from livekit.agents import (
+    APIConnectionError,
+    APIConnectOptions,
+    APIError,
+    APITimeoutError,
+    tts,
+    utils,
+)
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS
+from livekit.agents.utils import aio
+
+from . import worker_state
+from .audio_utils import FramedEmitter
+from .sentence_stream import DEFAULT_PIPELINE_DEPTH, PipelinedSynthesizeStream
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROBE_TEXT = "测试"
+# 从 worker 载入健康度时重放的最近事件数；alpha=0.2 时更早的事件对 EWMA 的影响已可忽略
+HEALTH_EVENTS = 100
+
+# 没有延迟样本的后端按该首包延迟参与排序，列表靠前的后端优先
+_UNKNOWN_TTFB = 0.5
+# 成功率的下限，避免分数除以 0
+_MIN_SUCCESS_RATE = 0.05
+
+_PROBE_CONN_OPTIONS = APIConnectOptions(
+    max_retry=0, timeout=DEFAULT_API_CONNECT_OPTIONS.timeout
+)
+
+CircuitState = Literal["closed", "open", "half_open"]
+
+
+@dataclass
+class BackendStatus:
+    label: str
+    state: CircuitState
+    ttfb: float | None
+    """首包延迟的 EWMA（秒），没有样本时为 None"""
+    success_rate: float
+    requests: int
+    failures: int
+
+
+class _Backend:
+    """
+    单个后端的滚动健康度与熔断状态。
+
+    每次成功/失败同时作为事件 [时间, 首包延迟或 None] 追加到 worker 主进程的
+    shared_key 下（见 worker_state），replay() 用 worker 中最近的事件重建健康度，
+    同一 worker 中各通话的请求因此共同决定分数与熔断。时间取 time.monotonic()，
+    同一主机上各进程之间可以比较。requests / failures 只统计本进程。
+    """
+
+    def __init__(self, tts: tts.TTS, *, alpha: float) -> None:
+        self.tts = tts
+        self.shared_key = f"{tts.label} {getattr(tts, 'base_url', '')}".rstrip()
+        self._alpha = alpha
+        self.ttfb: float | None = None
+        self.success_rate = 1.0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.trips = 0
+        self.updated_at = 0.0
+
+    def state(self, now: float) -> CircuitState:
+        if self.open_until == 0.0:
+            return "closed"
+        return "open" if now < self.open_until else "half_open"
+
+    def score(self) -> float:
+        """预计首包延迟 / 成功率，越小越好"""
+        ttfb = _UNKNOWN_TTFB if self.ttfb is None else self.ttfb
+        return ttfb / max(self.success_rate, _MIN_SUCCESS_RATE)
+
+    def record_success(self, ttfb: float) -> None:
+        self.requests += 1
+        now = time.monotonic()
+        self._apply_success(now, ttfb)
+        worker_state.append("tts_health", self.shared_key, [now, ttfb])
+
+    def _apply_success(self, now: float, ttfb: float) -> None:
+        self.updated_at = now
+        if self.ttfb is None:
+            self.ttfb = ttfb
+        else:
+            self.ttfb += self._alpha * (ttfb - self.ttfb)
+        self.success_rate += self._alpha * (1.0 - self.success_rate)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.trips = 0
+
+    def record_failure(
+        self, now: float, *, failure_threshold: int, open_duration: float
+    ) -> bool:
+        """返回 True 表示本次失败使熔断器打开"""
+        self.requests += 1
+        self.failures += 1
+        worker_state.append("tts_health", self.shared_key, [now, None])
+        return self._apply_failure(
+            now, failure_threshold=failure_threshold, open_duration=open_duration
+        )
+
+    def _apply_failure(
+        self, now: float, *, failure_threshold: int, open_duration: float
+    ) -> bool:
+        self.updated_at = now
+        self.success_rate -= self._alpha * self.success_rate
+        self.consecutive_failures += 1
+        # 半开状态下的试探失败立即重新打开，打开时长按次数指数退避
+        if self.consecutive_failures < failure_threshold:
+            return False
+        self.open_until = now + open_duration * 2 ** min(self.trips, 4)
+        self.trips += 1
+        return True
+
+    def replay(
+        self, events: list[list], *, failure_threshold: int, open_duration: float
+    ) -> None:
+        """按 worker 中的事件从头重建健康度，没有事件时保持不变"""
+        if not events:
+            return
+        self.ttfb = None
+        self.success_rate = 1.0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.trips = 0
+        for at, ttfb in events:
+            if ttfb is None:
+                self._apply_failure(
+                    at, failure_threshold=failure_threshold, open_duration=open_duration
+                )
+            else:
+                self._apply_success(at, ttfb)
+
+
+class FailoverTTS(tts.TTS):
+    """
+    按健康度在多个 TTS 后端之间路由并自动切换。
+
+    每个后端维护首包延迟与成功率的 EWMA（来自真实请求和 prewarm 探测），
+    每句合成选择“首包延迟 / 成功率”最小的可用后端。后端在 first_audio_timeout
+    内没有返回音频或请求失败时，只要还没有推送任何音频就立即换下一个后端重试。
+
+    连续失败 failure_threshold 次后熔断器打开，open_duration 内不再分配请求
+    （多次打开按指数退避）；到期后进入半开状态，由后台探测或下一次请求试探，
+    成功则恢复，失败则重新打开。所有后端都熔断时仍按分数尝试，而不是直接报错。
+    prewarm() 启动后台探测：每 probe_interval 秒探测半开以及超过 stale_after 秒没有
+    新样本的后端（启动时没有样本的后端都算在内）。
+
+    健康度在同一 worker 的各 job 进程之间共享（见 _Backend 与 worker_state）：创建时
+    载入 worker 中最近的事件，之后每 probe_interval 秒同步一次，因此新通话直接沿用
+    已有的分数与熔断状态，其他通话发现的故障最多 probe_interval 秒后生效。每个后端的
+    探测需要先向 worker 申请探测权，同时开始的 N 个通话在每个 probe_interval 内对
+    每个后端合计只探测一次。未调用 worker_state.listen() 时各进程独立，与单个通话相同。
+
+    输出采样率取第一个后端的采样率，其他后端的音频会被重采样。
+    """
+
+    def __init__(
+        self,
+        tts: list[tts.TTS],
+        *,
+        first_audio_timeout: float = 3.0,
+        failure_threshold: int = 3,
+        open_duration: float = 10.0,
+        probe_interval: float = 5.0,
+        stale_after: float = 60.0,
+        probe_text: str = DEFAULT_PROBE_TEXT,
+        alpha: float = 0.2,
+        pipeline_depth: int = DEFAULT_PIPELINE_DEPTH,
+    ) -> None:
+        if not tts:
+            raise ValueError("at least one TTS backend is required")
+
+        super().__init__(
+            capabilities=tts[0].capabilities,
+            sample_rate=tts[0].sample_rate,
+            num_channels=tts[0].num_channels,
+        )
+        self._backends = [_Backend(t, alpha=alpha) for t in tts]
+        self._first_audio_timeout = first_audio_timeout
+        self._failure_threshold = failure_threshold
+        self._open_duration = open_duration
+        self._probe_interval = probe_interval
+        self._stale_after = stale_after
+        self._probe_text = probe_text
+        self._pipeline_depth = pipeline_depth
+        self._probe_task: asyncio.Task | None = None
+        # 通常在 prewarm 中创建，同步载入 worker 的健康度不会阻塞事件循环
+        for backend in self._backends:
+            events = worker_state.history("tts_health", backend.shared_key, HEALTH_EVENTS)
+            self._replay(backend, events)
+
+    @property
+    def model(self) -> str:
+        return "failover"
+
+    @property
+    def provider(self) -> str:
+        return "+".join(b.tts.provider for b in self._backends)
+
+    @property
+    def backends(self) -> list[tts.TTS]:
+        return [b.tts for b in self._backends]
+
+    def status(self) -> list[BackendStatus]:
+        now = time.monotonic()
+        return [
+            BackendStatus(
+                label=b.tts.label,
+                state=b.state(now),
+                ttfb=b.ttfb,
+                success_rate=b.success_rate,
+                requests=b.requests,
+                failures=b.failures,
+            )
+            for b in self._backends
+        ]
+
+    def _ranked(self) -> list[_Backend]:
+        """可用后端按分数排序在前，熔断中的按恢复时间排在最后"""
+        now = time.monotonic()
+        available = [b for b in self._backends if b.state(now) != "open"]
+        tripped = [b for b in self._backends if b.state(now) == "open"]
+        available.sort(key=_Backend.score)
+        tripped.sort(key=lambda b: b.open_until)
+        return available + tripped
+
+    def _record_failure(self, backend: _Backend, error: Exception) -> None:
+        opened = backend.record_failure(
+            time.monotonic(),
+            failure_threshold=self._failure_threshold,
+            open_duration=self._open_duration,
+        )
+        if opened:
+            logger.warning(
+                "tts backend %s circuit opened after %d failures: %s",
+                backend.tts.label,
+                backend.consecutive_failures,
+                error,
+            )
+
+    async def _attempt(
+        self, backend: _Backend, text: str, conn_options: APIConnectOptions
+    ) -> AsyncIterator[rtc.AudioFrame]:
+        """
+        在单个后端上合成并逐帧产出音频，按需重采样。
+
+        首帧超过 first_audio_timeout 视为失败；后端的成功/失败在这里记录。
+        """
+        start = time.perf_counter()
+        resampler: rtc.AudioResampler | None = None
+        first = True
+        try:
+            stream = backend.tts.synthesize(text, conn_options=conn_options)
+            async with stream:
+                frames = stream.__aiter__()
+                while True:
+                    try:
+                        if first:
+                            audio = await asyncio.wait_for(
+                                frames.__anext__(), self._first_audio_timeout
+                            )
+                        else:
+                            audio = await frames.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        raise APITimeoutError(
+                            f"no audio from {backend.tts.label} within "
+                            f"{self._first_audio_timeout}s"
+                        ) from None
+
+                    if first:
+                        backend.record_success(time.perf_counter() - start)
+                        first = False
+                        if audio.frame.sample_rate != self.sample_rate:
+                            resampler = rtc.AudioResampler(
+                                audio.frame.sample_rate,
+                                self.sample_rate,
+                                num_channels=audio.frame.num_channels,
+                            )
+
+                    if resampler is None:
+                        yield audio.frame
+                    else:
+                        for frame in resampler.push(audio.frame):
+                            yield frame
+
+                if resampler is not None:
+                    for frame in resampler.flush():
+                        yield frame
+        except Exception as e:
+            self._record_failure(backend, e)
+            raise
+
+    def _replay(self, backend: _Backend, events: list[list]) -> None:
+        backend.replay(
+            events,
+            failure_threshold=self._failure_threshold,
+            open_duration=self._open_duration,
+        )
+
+    async def _sync_health(self) -> None:
+        """用 worker 中最近的事件更新各后端的健康度（包括本进程已上报的事件）"""
+        for backend in self._backends:
+            events = await asyncio.to_thread(
+                worker_state.history, "tts_health", backend.shared_key, HEALTH_EVENTS
+            )
+            self._replay(backend, events)
+
+    async def _probe(self, backend: _Backend) -> None:
+        """合成一句探测文本，结果计入健康度"""
+        try:
+            async for _ in self._attempt(
+                backend,
+                self._probe_text,
+                _PROBE_CONN_OPTIONS,
+            ):
+                pass
+        except Exception:
+            logger.debug("tts probe failed for %s", backend.tts.label, exc_info=True)
+
+    async def _probe_if_claimed(self, backend: _Backend) -> None:
+        # 同一 worker 中其他通话本轮已经探测过该后端时跳过
+        key = f"tts_probe {backend.shared_key}"
+        if await worker_state.claim(key, self._probe_interval):
+            await self._probe(backend)
+
+    async def _probe_loop(self) -> None:
+        # 探测熔断到期（半开）的后端，以及因分数靠后而长期没有流量、或还没有样本的后端，
+        # 让它们的分数有机会恢复；启动时 worker 中没有近期样本的后端都会被测一遍
+        while True:
+            await self._sync_health()
+            now = time.monotonic()
+            due = [
+                b
+                for b in self._backends
+                if b.state(now) == "half_open"
+                or (
+                    b.state(now) == "closed"
+                    and (b.updated_at == 0.0 or now - b.updated_at > self._stale_after)
+                )
+            ]
+            await asyncio.gather(*(self._probe_if_claimed(b) for b in due))
+            await asyncio.sleep(self._probe_interval)
+
+    def synthesize(
+        self,
+        text: str,
+        *,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+    ) -> FailoverChunkedStream:
+        return FailoverChunkedStream(
+            tts=self, input_text=text, conn_options=conn_options
+        )
+
+    def stream(
+        self, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS
+    ) -> PipelinedSynthesizeStream:
+        # 逐句走 synthesize()，每句都可以独立切换后端
+        return PipelinedSynthesizeStream(
+            tts=self, conn_options=conn_options, depth=self._pipeline_depth
+        )
+
+    def prewarm(self) -> None:
+        for backend in self._backends:
+            backend.tts.prewarm()
+        if self._probe_task is None:
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    async def aclose(self) -> None:
+        if self._probe_task:
+            await aio.cancel_and_wait(self._probe_task)
+        for backend in self._backends:
+            await backend.tts.aclose()
+
+
+class FailoverChunkedStream(tts.ChunkedStream):
+    def __init__(
+        self, *, tts: FailoverTTS, input_text: str, conn_options: APIConnectOptions
+    ) -> None:
+        # 切换后端代替重试：外层与各后端都不重试，超时由各后端请求自己控制
+        super().__init__(
+            tts=tts,
+            input_text=input_text,
+            conn_options=APIConnectOptions(max_retry=0, timeout=conn_options.timeout),
+        )
+        self._tts: FailoverTTS = tts
+        self._backend_conn_options = APIConnectOptions(
+            max_retry=0, timeout=conn_options.timeout
+        )
+
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        emitter = FramedEmitter(output_emitter)
+        emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=self._tts.sample_rate,
+            num_channels=self._tts.num_channels,
+            mime_type="audio/pcm",
+        )
+
+        errors: list[Exception] = []
+        for backend in self._tts._ranked():
+            pushed = False
+            try:
+                async for frame in self._tts._attempt(
+                    backend, self.input_text, self._backend_conn_options
+                ):
+                    emitter.push(frame.data)
+                    pushed = True
+                emitter.flush()
+                return
+            except Exception as e:
+                # 已经推送过音频时换后端会重复播放前半句，只能整体失败
+                if pushed or not isinstance(e, APIError):
+                    raise
+                logger.warning(
+                    "tts backend %s failed, trying next: %s", backend.tts.label, e
+                )
+                errors.append(e)
+
+        raise APIConnectionError(
+            f"all tts backends failed: {'; '.join(str(e) for e in errors)}"
+        )
@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Literal
+
+from livekit.agents import utils
+from livekit.agents.utils.hw import get_cpu_monitor
+
+if TYPE_CHECKING:
+    from livekit.agents import AgentServer, JobRequest
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SESSIONS = 20
+DEFAULT_MAX_LOOP_LAG = 0.2
+DEFAULT_MAX_INFLIGHT = 32
+
+LOOP_MONITOR_INTERVAL = 0.1
+CPU_SAMPLE_INTERVAL = 0.5
+# job 进程的上报超过该时长没有更新即视为已退出
+REPORT_STALE_AFTER = 1.0
+
+# worker 主进程接收 job 进程负载上报的地址（host:port），由 WorkerLoad 设置，
+# 之后启动的 job 进程继承该环境变量
+REPORT_ADDR_ENV = "VOICE_AGENT_LOAD_REPORT_ADDR"
+# 上报内容：pid、事件循环调度延迟（秒）、进行中的 STT/TTS 请求数、空闲时长（秒）
+_REPORT = struct.Struct("!qdid")
+
+RequestKind = Literal["stt", "tts"]
+
+# 进程内正在进行的 STT/TTS 请求数，由各 provider 在请求开始/结束时更新
+_inflight: dict[str, int] = {"stt": 0, "tts": 0}
+# 最近一次 STT/TTS 请求开始或结束的时间
+_last_request = time.monotonic()
+# 事件循环 id -> 最近的调度延迟（秒）
+_loop_lag: dict[int, float] = {}
+_lock = threading.Lock()
+
+
+def request_started(kind: RequestKind) -> None:
+    global _last_request
+    with _lock:
+        _inflight[kind] += 1
+        _last_request = time.monotonic()
+
+
+def request_finished(kind: RequestKind) -> None:
+    global _last_request
+    with _lock:
+        _inflight[kind] -= 1
+        _last_request = time.monotonic()
+
+
+def inflight_requests() -> dict[str, int]:
+    with _lock:
+        return dict(_inflight)
+
+
+def _local_idle_seconds() -> float:
+    with _lock:
+        if any(_inflight.values()):
+            return 0.0
+        return time.monotonic() - _last_request
+
+
+def idle_seconds() -> float:
+    """
+    worker 没有 STT/TTS 请求的时长：有请求在进行时为 0，否则为距最近一次请求结束的秒数。
+    在 worker 主进程中（已创建 WorkerLoad）同时计入 job 进程上报的请求。
+    """
+    idle = _local_idle_seconds()
+    reports = _JobReports._instance
+    if reports is not None:
+        idle = min(idle, reports.idle_seconds())
+    return idle
+
+
+def loop_lag() -> float:
+    """进程内所有被监控事件循环中最大的调度延迟"""
+    with _lock:
+        return max(_loop_lag.values(), default=0.0)
+
+
+async def monitor_event_loop(interval: float = LOOP_MONITOR_INTERVAL) -> None:
+    """
+    周期性 sleep，以实际唤醒时间相对预期的延迟衡量当前事件循环的拥塞程度，
+    取最近 10 次的平均值。一直运行到被取消。
+
+    在 job 进程中运行时，每次采样后把本进程的调度延迟与进行中的请求数上报给
+    worker 主进程，计入 load_fnc。
+    """
+    key = id(asyncio.get_running_loop())
+    lag = utils.MovingAverage(10)
+    reporter = _Reporter.from_env()
+    try:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lag.add_sample(max(time.perf_counter() - start - interval, 0.0))
+            with _lock:
+                _loop_lag[key] = lag.get_avg()
+            if reporter is not None:
+                reporter.send(
+                    loop_lag(), sum(inflight_requests().values()), _local_idle_seconds()
+                )
+    finally:
+        with _lock:
+            _loop_lag.pop(key, None)
+        # 不再上报后，主进程在 REPORT_STALE_AFTER 之后丢弃本进程的数据
+        if reporter is not None:
+            reporter.close()
+
+
+class _Reporter:
+    """job 进程一侧：把本进程的调度延迟、进行中请求数与空闲时长以 UDP 发给 worker 主进程"""
+
+    def __init__(self, addr: tuple[str, int]) -> None:
+        self._addr = addr
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+
+    @classmethod
+    def from_env(cls) -> _Reporter | None:
+        value = os.environ.get(REPORT_ADDR_ENV)
+        if not value:
+            return None
+        host, port = value.rsplit(":", 1)
+        return cls((host, int(port)))
+
+    def send(self, lag: float, inflight: int, idle: float) -> None:
+        try:
+            self._sock.sendto(
+                _REPORT.pack(os.getpid(), lag, inflight, idle), self._addr
+            )
+        except OSError:
+            # 主进程已退出或缓冲区满，丢弃这次上报
+            pass
+
+    def close(self) -> None:
+        self._sock.close()
+
+
+class _JobReports:
+    """
+    worker 主进程一侧：接收各 job 进程的上报。
+
+    job 默认以独立进程运行，调度延迟和进行中的请求数只存在于 job 进程中，
+    load_fnc 却在主进程中调用，因此由 job 进程中的 monitor_event_loop 每次采样后上报。
+    本进程自己的上报（job 以线程方式运行时）直接读取本地值，这里忽略。
+    """
+
+    _instance: _JobReports | None = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self) -> None:
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind(("127.0.0.1", 0))
+        host, port = self._sock.getsockname()
+        os.environ[REPORT_ADDR_ENV] = f"{host}:{port}"
+        # pid -> (收到的时间, 调度延迟, 进行中请求数)
+        self._reports: dict[int, tuple[float, float, int]] = {}
+        # 各 job 进程最近一次 STT/TTS 请求的时间，job 进程退出后仍然保留
+        self._last_request = time.monotonic()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, daemon=True, name="worker_load_job_reports"
+        )
+        self._thread.start()
+
+    @classmethod
+    def get(cls) -> _JobReports:
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = _JobReports()
+            return cls._instance
+
+    def _run(self) -> None:
+        own_pid = os.getpid()
+        while True:
+            data = self._sock.recv(_REPORT.size)
+            if len(data) != _REPORT.size:
+                continue
+            pid, lag, inflight, idle = _REPORT.unpack(data)
+            if pid == own_pid:
+                continue
+            now = time.monotonic()
+            with self._lock:
+                self._reports[pid] = (now, lag, inflight)
+                self._last_request = max(self._last_request, now - idle)
+
+    def _fresh_reports(self) -> list[tuple[float, float, int]]:
+        now = time.monotonic()
+        with self._lock:
+            for pid in [
+                pid
+                for pid, (at, _, _) in self._reports.items()
+                if now - at > REPORT_STALE_AFTER
+            ]:
+                del self._reports[pid]
+            return list(self._reports.values())
+
+    def totals(self) -> tuple[float, int]:
+        """仍在上报的 job 进程中最大的调度延迟与进行中请求数之和"""
+        reports = self._fresh_reports()
+        return (
+            max((lag for _, lag, _ in reports), default=0.0),
+            sum(inflight for _, _, inflight in reports),
+        )
+
+    def idle_seconds(self) -> float:
+        """所有 job 进程都没有 STT/TTS 请求的时长"""
+        if any(inflight for _, _, inflight in self._fresh_reports()):
+            return 0.0
+        with self._lock:
+            return time.monotonic() - self._last_request
+
+
+class _CpuSampler:
+    """后台线程按 CPU_SAMPLE_INTERVAL 采样 CPU 使用率，取最近 5 次的平均值"""
+
+    _instance: _CpuSampler | None = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self) -> None:
+        self._avg = utils.MovingAverage(5)
+        self._monitor = get_cpu_monitor()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, daemon=True, name="worker_load_cpu_sampler"
+        )
+        self._thread.start()
+
+    @classmethod
+    def get(cls) -> _CpuSampler:
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = _CpuSampler()
+            return cls._instance
+
+    def _run(self) -> None:
+        while True:
+            cpu = self._monitor.cpu_percent(interval=CPU_SAMPLE_INTERVAL)
+            with self._lock:
+                self._avg.add_sample(cpu)
+
+    def cpu(self) -> float:
+        with self._lock:
+            return self._avg.get_avg()
+
+
+@dataclass
+class LoadSnapshot:
+    sessions: int
+    cpu: float
+    """CPU 使用率（0~1）"""
+    loop_lag: float
+    """事件循环调度延迟（秒）"""
+    inflight: int
+    """正在进行的 STT + TTS 请求数"""
+    load: float
+
+
+class WorkerLoad:
+    """
+    worker 的综合负载，作为 WorkerOptions 的 load_fnc 上报给 LiveKit 调度。
+
+    负载取以下各项中最大的一项（各项达到上限时为 1.0）：
+    - 活跃会话数 / max_sessions
+    - CPU 使用率
+    - 事件循环调度延迟 / max_loop_lag
+    - 正在进行的 STT/TTS 请求数 / max_inflight
+
+    任一资源接近饱和时 worker 即不再接收新的 job（负载超过 load_threshold，
+    生产模式默认 0.7），调度器会把通话分到其他节点，而不是等延迟恶化后才反应。
+
+    job 以进程方式运行时，各 job 进程中的 monitor_event_loop 把调度延迟和
+    进行中的请求数上报给 worker 主进程（见 _JobReports），与主进程自身的值合并：
+    延迟取最大值，请求数求和；上报的空闲时长同时计入主进程的 idle_seconds()。
+    WorkerLoad 需要在 worker 启动前（run_app 之前）创建，job 进程才能继承上报地址。
+
+    同时作为 request_fnc 使用时，会话数达到 max_sessions 后直接拒绝新的 job
+    （开发模式不启用 load_threshold，也能限制单个 worker 的会话密度）。
+    """
+
+    def __init__(
+        self,
+        *,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        max_loop_lag: float = DEFAULT_MAX_LOOP_LAG,
+        max_inflight: int = DEFAULT_MAX_INFLIGHT,
+    ) -> None:
+        if max_sessions < 1:
+            raise ValueError("max_sessions must be at least 1")
+        self._max_sessions = max_sessions
+        self._max_loop_lag = max_loop_lag
+        self._max_inflight = max_inflight
+        self._active_jobs = 0
+        # 上次计算负载之后接受的 job，尚未出现在 worker.active_jobs 中
+        self._accepted = 0
+        self._last = LoadSnapshot(sessions=0, cpu=0.0, loop_lag=0.0, inflight=0, load=0.0)
+        self._reports = _JobReports.get()
+
+    @property
+    def last(self) -> LoadSnapshot:
+        """最近一次计算的负载"""
+        return self._last
+
+    def __call__(self, worker: AgentServer) -> float:
+        self._active_jobs = len(worker.active_jobs)
+        self._accepted = 0
+        return self.snapshot(self._active_jobs).load
+
+    def snapshot(self, sessions: int) -> LoadSnapshot:
+        cpu = _CpuSampler.get().cpu()
+        job_lag, job_inflight = self._reports.totals()
+        lag = max(loop_lag(), job_lag)
+        inflight = sum(inflight_requests().values()) + job_inflight
+        load = max(
+            sessions / self._max_sessions,
+            cpu,
+            lag / self._max_loop_lag,
+            inflight / self._max_inflight,
+        )
+        self._last = LoadSnapshot(
+            sessions=sessions,
+            cpu=cpu,
+            loop_lag=lag,
+            inflight=inflight,
+            load=min(load, 1.0),
+        )
+        return self._last
+
+    async def request_fnc(self, req: JobRequest) -> None:
+        if self._active_jobs + self._accepted >= self._max_sessions:
+            logger.info(
+                "rejecting job %s: %d sessions (max %d)",
+                req.job.id,
+                self._active_jobs + self._accepted,
+                self._max_sessions,
+            )
+            await req.reject()
+            return
+        self._accepted += 1
+        await req.accept()
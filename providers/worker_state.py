@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from collections import deque
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# worker 主进程接收共享状态的地址（host:port），由 listen() 设置，之后启动的 job 进程继承
+STATE_ADDR_ENV = "VOICE_AGENT_STATE_ADDR"
+# 主进程为每个 (kind, key) 保留的最近记录数
+HISTORY_LIMIT = 1000
+# job 进程等待主进程回复的时长，超时按没有共享状态处理
+REQUEST_TIMEOUT = 0.2
+# 本机 UDP 单个报文的上限
+_MAX_MESSAGE_BYTES = 65507
+
+
+class _StateServer:
+    """
+    worker 主进程一侧：为各 job 进程保存最近的记录，并分配探测权。
+
+    默认的进程执行器中每个通话一个 job 进程，进程内的延迟分布、健康度在通话结束时
+    随进程一起丢弃。job 进程把记录追加到这里（append），新的 job 启动时取回同一
+    (kind, key) 的最近记录（history）作为初始状态，历史因此跨通话累积。
+    各 job 也可以共用一个令牌桶（deposit / withdraw），按 worker 整体限制某类操作的比例。
+    所有消息在同一个线程中按到达顺序处理，不需要加锁。
+    """
+
+    _instance: _StateServer | None = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self) -> None:
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind(("127.0.0.1", 0))
+        host, port = self._sock.getsockname()
+        os.environ[STATE_ADDR_ENV] = f"{host}:{port}"
+        self._history: dict[tuple[str, str], deque[Any]] = {}
+        # 探测权 -> 到期时间
+        self._claims: dict[str, float] = {}
+        self._tokens: dict[str, float] = {}
+        self._thread = threading.Thread(
+            target=self._run, daemon=True, name="worker_state"
+        )
+        self._thread.start()
+
+    @classmethod
+    def get(cls) -> _StateServer:
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = _StateServer()
+            return cls._instance
+
+    def _run(self) -> None:
+        while True:
+            data, addr = self._sock.recvfrom(_MAX_MESSAGE_BYTES)
+            try:
+                reply = self._handle(json.loads(data))
+            except (ValueError, TypeError, IndexError):
+                logger.debug("dropping malformed worker state message", exc_info=True)
+                continue
+            if reply is None:
+                continue
+            try:
+                self._sock.sendto(json.dumps(reply).encode(), addr)
+            except OSError:
+                # job 进程已退出
+                pass
+
+    def _handle(self, message: list[Any]) -> list[Any] | None:
+        op = message[0]
+        if op == "append":
+            _, kind, key, entry = message
+            history = self._history.get((kind, key))
+            if history is None:
+                history = self._history[(kind, key)] = deque(maxlen=HISTORY_LIMIT)
+            history.append(entry)
+            return None
+        if op == "history":
+            _, request_id, kind, key, limit = message
+            history = self._history.get((kind, key), ())
+            return [request_id, list(history)[-limit:] if limit > 0 else []]
+        if op == "deposit":
+            _, key, amount, capacity, initial = message
+            tokens = self._tokens.get(key, initial)
+            self._tokens[key] = min(tokens + amount, capacity)
+            return None
+        if op == "withdraw":
+            _, request_id, key = message
+            tokens = self._tokens.get(key, 0.0)
+            granted = tokens >= 1.0
+            if granted:
+                self._tokens[key] = tokens - 1.0
+            return [request_id, granted]
+        if op == "claim":
+            _, request_id, key, ttl = message
+            now = time.monotonic()
+            granted = self._claims.get(key, 0.0) <= now
+            if granted:
+                self._claims[key] = now + ttl
+            return [request_id, granted]
+        raise ValueError(f"unknown worker state op {op!r}")
+
+
+class _Client:
+    """job 进程一侧：追加记录不等待回复，查询在 REQUEST_TIMEOUT 内等待主进程回复"""
+
+    def __init__(self, addr: tuple[str, int]) -> None:
+        self._addr = addr
+        self._send_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._send_sock.setblocking(False)
+        self._request_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._request_sock.bind(("127.0.0.1", 0))
+        self._request_id = 0
+        self._lock = threading.Lock()
+
+    def send(self, message: list[Any]) -> None:
+        try:
+            self._send_sock.sendto(json.dumps(message).encode(), self._addr)
+        except OSError:
+            # 主进程已退出或缓冲区满，丢弃这条记录
+            pass
+
+    def request(self, op: str, *args: Any) -> Any:
+        """返回主进程的回复，超时或主进程不可用时返回 None"""
+        with self._lock:
+            self._request_id += 1
+            request_id = self._request_id
+            deadline = time.monotonic() + REQUEST_TIMEOUT
+            try:
+                self._request_sock.sendto(
+                    json.dumps([op, request_id, *args]).encode(), self._addr
+                )
+                while (remaining := deadline - time.monotonic()) > 0:
+                    self._request_sock.settimeout(remaining)
+                    reply_id, result = json.loads(
+                        self._request_sock.recv(_MAX_MESSAGE_BYTES)
+                    )
+                    # 之前超时的请求的迟到回复
+                    if reply_id == request_id:
+                        return result
+            except (OSError, ValueError, TypeError):
+                pass
+            logger.debug("no reply from worker state for %s", op)
+            return None
+
+
+_client: _Client | None = None
+_client_addr: str | None = None
+_client_lock = threading.Lock()
+
+
+def _get_client() -> _Client | None:
+    global _client, _client_addr
+    value = os.environ.get(STATE_ADDR_ENV)
+    if not value:
+        return None
+    with _client_lock:
+        if _client is None or _client_addr != value:
+            host, port = value.rsplit(":", 1)
+            _client = _Client((host, int(port)))
+            _client_addr = value
+        return _client
+
+
+def listen() -> None:
+    """
+    在 worker 主进程中开始保存各 job 进程共享的状态，需要在 job 进程启动前
+    （run_app 之前）调用。未调用时 append() 不做任何事，history() 返回空列表，
+    claim() 总是成功，各进程只使用自己的状态。
+    """
+    _StateServer.get()
+
+
+def append(kind: str, key: str, entry: Any) -> None:
+    """把一条可 JSON 序列化的记录追加到 worker 的 (kind, key) 历史"""
+    if (client := _get_client()) is not None:
+        client.send(["append", kind, key, entry])
+
+
+def history(kind: str, key: str, limit: int = HISTORY_LIMIT) -> list[Any]:
+    """
+    worker 中 (kind, key) 最近的 limit 条记录，按追加顺序排列。
+    同步等待主进程回复（本机通常不到 1ms，最多 REQUEST_TIMEOUT），应在创建 provider 时调用。
+    """
+    if (client := _get_client()) is None:
+        return []
+    return client.request("history", kind, key, limit) or []
+
+
+async def claim(key: str, ttl: float) -> bool:
+    """
+    申请 ttl 秒内的独占权（如对某个后端的探测），同一 worker 的各 job 进程中只有一个成功。
+    主进程不可用时返回 True，各进程自行决定。
+    """
+    if (client := _get_client()) is None:
+        return True
+    granted = await asyncio.to_thread(client.request, "claim", key, ttl)
+    return True if granted is None else bool(granted)
+
+
+def deposit(key: str, amount: float, *, capacity: float, initial: float = 0.0) -> None:
+    """向 worker 的令牌桶 key 存入 amount 个令牌（上限 capacity），首次使用时从 initial 开始"""
+    if (client := _get_client()) is not None:
+        client.send(["deposit", key, amount, capacity, initial])
+
+
+async def withdraw(key: str) -> bool | None:
+    """从 worker 的令牌桶 key 取出一个令牌，不足时返回 False；主进程不可用时返回 None"""
+    if (client := _get_client()) is None:
+        return None
+    granted = await asyncio.to_thread(client.request, "withdraw", key)
+    return None if granted is None else bool(granted)
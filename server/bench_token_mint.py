@@ -0,0 +1,136 @@
+"""
+Token minting throughput, in tokens/sec per core.
+
+Measures, on a single core:
+  - the legacy path (AccessToken builder + to_jwt per token)
+  - _mint_tokens() one token at a time (what /token does)
+  - _mint_tokens() in batches (what /tokens does)
+  - HTTP /token vs /tokens through the ASGI app (room cache warm, no RPC cost)
+and then the batch path across --processes worker processes to show how
+multi-process serving scales.
+
+Usage (from the server/ directory):
+    python bench_token_mint.py --tokens 20000 --batch 100 --processes 4
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+
+import httpx
+from livekit import api
+
+os.environ.update(
+    LIVEKIT_URL="http://127.0.0.1:1",
+    LIVEKIT_API_KEY="devkey",
+    LIVEKIT_API_SECRET="bench-secret-bench-secret-bench-secret",
+)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import server  # noqa: E402
+
+
+def _legacy(n: int) -> None:
+    for i in range(n):
+        grants = api.VideoGrants(
+            room_join=True,
+            room="bench-room",
+            can_publish=True,
+            can_subscribe=True,
+            can_publish_data=True,
+        )
+        (
+            api.AccessToken(server.LIVEKIT_API_KEY, server.LIVEKIT_API_SECRET)
+            .with_identity(f"user_{i}")
+            .with_name(f"user_{i}")
+            .with_grants(grants)
+            .to_jwt()
+        )
+
+
+def _single(n: int) -> None:
+    for i in range(n):
+        server._mint_tokens("bench-room", [(f"user_{i}", f"user_{i}")])
+
+
+def _batched(n: int, batch: int) -> None:
+    for start in range(0, n, batch):
+        participants = [
+            (f"user_{i}", f"user_{i}") for i in range(start, min(start + batch, n))
+        ]
+        server._mint_tokens("bench-room", participants)
+
+
+def _rate(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return args[0] / (time.perf_counter() - start)
+
+
+async def _http_rate(n: int, batch: int) -> tuple[float, float]:
+    # Mark the room as known so the numbers only reflect request handling + signing
+    server._remember_room("bench-room")
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        for i in range(n):
+            resp = await client.post(
+                "/token", json={"room": "bench-room", "identity": f"user_{i}"}
+            )
+            resp.raise_for_status()
+        single = n / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for offset in range(0, n, batch):
+            resp = await client.post(
+                "/tokens",
+                json={
+                    "room": "bench-room",
+                    "count": min(batch, n - offset),
+                    "identity_prefix": f"user_{offset}",
+                },
+            )
+            resp.raise_for_status()
+        batched = n / (time.perf_counter() - start)
+    return single, batched
+
+
+def _worker(args: tuple[int, int]) -> float:
+    n, batch = args
+    return _rate(_batched, n, batch)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    legacy = _rate(_legacy, args.tokens)
+    single = _rate(_single, args.tokens)
+    batched = _rate(_batched, args.tokens, args.batch)
+    http_single, http_batched = asyncio.run(_http_rate(args.tokens // 4, args.batch))
+
+    print(f"{args.tokens} tokens, batch size {args.batch}")
+    print("single core, tokens/sec:")
+    print(f"  AccessToken per token:  {legacy:9.0f}")
+    print(f"  _mint_tokens x1:        {single:9.0f}")
+    print(f"  _mint_tokens batched:   {batched:9.0f}")
+    print(f"  HTTP /token:            {http_single:9.0f}")
+    print(f"  HTTP /tokens:           {http_batched:9.0f}")
+
+    with multiprocessing.Pool(args.processes) as pool:
+        start = time.perf_counter()
+        rates = pool.map(_worker, [(args.tokens, args.batch)] * args.processes)
+        total = args.processes * args.tokens / (time.perf_counter() - start)
+    print(
+        f"{args.processes} processes, batched: {total:9.0f} tokens/sec total, "
+        f"{sum(rates) / len(rates):9.0f} per core"
+    )
+
+
+if __name__ == "__main__":
+    main()
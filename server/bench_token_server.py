@@ -0,0 +1,120 @@
+"""
+Token server load test against a local stand-in for the LiveKit RoomService.
+
+Compares the legacy /token path (new LiveKitAPI session + CreateRoom RPC on every
+request) with the lifespan-scoped client and room TTL cache.
+
+Usage (from the server/ directory):
+    python bench_token_server.py --requests 2000 --concurrency 50 --rooms 20
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+from aiohttp import web
+from livekit import api
+
+
+class FakeRoomService:
+    """Answers Twirp CreateRoom calls with a fixed latency and counts them."""
+
+    def __init__(self, latency_ms: float):
+        self.latency_ms = latency_ms
+        self.calls = 0
+        self.url = ""
+        self._runner: web.AppRunner | None = None
+
+    async def _create_room(self, request: web.Request) -> web.Response:
+        self.calls += 1
+        req = api.CreateRoomRequest()
+        req.ParseFromString(await request.read())
+        await asyncio.sleep(self.latency_ms / 1000)
+        return web.Response(
+            body=api.Room(name=req.name).SerializeToString(),
+            content_type="application/protobuf",
+        )
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/twirp/livekit.RoomService/CreateRoom", self._create_room)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+
+async def _legacy_ensure_room(room_name: str):
+    """The original per-request implementation, kept for comparison."""
+    async with api.LiveKitAPI() as lkapi:
+        await lkapi.room.create_room(api.CreateRoomRequest(name=room_name))
+
+
+async def _drive(app, requests: int, concurrency: int, rooms: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        counter = iter(range(requests))
+
+        async def worker():
+            for i in counter:
+                resp = await client.post(
+                    "/token",
+                    json={"room": f"room-{i % rooms}", "identity": f"user-{i}"},
+                )
+                resp.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return requests / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    fake = FakeRoomService(args.latency_ms)
+    await fake.start()
+    os.environ.update(
+        LIVEKIT_URL=fake.url,
+        LIVEKIT_API_KEY="devkey",
+        LIVEKIT_API_SECRET="bench-secret-bench-secret-bench-secret",
+    )
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import server
+
+    original_ensure_room = server._ensure_room
+    server._ensure_room = _legacy_ensure_room
+    before = await _drive(server.app, args.requests, args.concurrency, args.rooms)
+    before_calls, fake.calls = fake.calls, 0
+
+    server._ensure_room = original_ensure_room
+    async with server.lifespan(server.app):
+        after = await _drive(server.app, args.requests, args.concurrency, args.rooms)
+    after_calls = fake.calls
+
+    await fake.stop()
+
+    print(
+        f"{args.requests} requests, concurrency {args.concurrency}, "
+        f"{args.rooms} rooms, CreateRoom latency {args.latency_ms:.0f} ms"
+    )
+    print(f"before: {before:8.1f} req/s  ({before_calls} CreateRoom calls)")
+    print(f"after:  {after:8.1f} req/s  ({after_calls} CreateRoom calls)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
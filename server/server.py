@@ -1,6 +1,13 @@
+import asyncio
+import calendar
+import datetime
+import functools
 import os
-from typing import Optional
+import time
+from contextlib import asynccontextmanager
+from typing import Annotated, Optional
 
+import jwt
 import uvicorn
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException
@@ -13,21 +20,78 @@ LIVEKIT_URL = os.getenv("LIVEKIT_URL")
 LIVEKIT_API_KEY = os.getenv("LIVEKIT_API_KEY")
 LIVEKIT_API_SECRET = os.getenv("LIVEKIT_API_SECRET")
 
+# Rooms confirmed to exist are not re-created for this many seconds (0 disables the cache)
+ROOM_CACHE_TTL = float(os.getenv("ROOM_CACHE_TTL", "300"))
+ROOM_CACHE_MAX = 10000
+
+# Upper bound on identities minted by one /tokens call
+MAX_BATCH_TOKENS = 1000
+# Token validity, same default as livekit.api.AccessToken
+TOKEN_TTL = datetime.timedelta(hours=6)
+
+# _mint_tokens signs claims directly, so the empty-identity check that
+# AccessToken.to_jwt() does for room_join tokens is enforced here instead
+Identity = Annotated[str, Field(min_length=1)]
+
 
 class TokenRequest(BaseModel):
     room: str = Field(..., description="Room to join or create")
-    identity: str = Field(..., description="Unique participant identity")
+    identity: Identity = Field(..., description="Unique participant identity")
     name: Optional[str] = Field(None, description="Optional display name")
     auto_create_room: bool = Field(
         True, description="Create the room ahead of token issuance"
     )
 
 
+class BatchTokenRequest(BaseModel):
+    room: str = Field(..., description="Room every participant joins")
+    identities: Optional[list[Identity]] = Field(
+        None,
+        max_length=MAX_BATCH_TOKENS,
+        description="Participant identities; if omitted, `count` identities are generated",
+    )
+    names: Optional[list[str]] = Field(
+        None, description="Display names, parallel to `identities`"
+    )
+    count: Optional[int] = Field(
+        None,
+        ge=1,
+        le=MAX_BATCH_TOKENS,
+        description="Number of identities to generate when `identities` is omitted",
+    )
+    identity_prefix: str = Field(
+        "user", description="Prefix for generated identities (`<prefix>_<n>`)"
+    )
+    auto_create_room: bool = Field(
+        True, description="Create the room ahead of token issuance"
+    )
+
+
 class RoomCreateRequest(BaseModel):
     name: str = Field(..., description="Room name")
 
 
-app = FastAPI(title="LiveKit Demo Server")
+_lkapi: Optional[api.LiveKitAPI] = None
+_known_rooms: dict[str, float] = {}  # room name -> expiry (monotonic)
+_pending_rooms: dict[str, asyncio.Task] = {}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Share one LiveKitAPI client (and its HTTP connection pool) for the app's lifetime."""
+    global _lkapi
+    if LIVEKIT_URL and LIVEKIT_API_KEY and LIVEKIT_API_SECRET:
+        _lkapi = api.LiveKitAPI(LIVEKIT_URL, LIVEKIT_API_KEY, LIVEKIT_API_SECRET)
+    try:
+        yield
+    finally:
+        if _lkapi:
+            await _lkapi.aclose()
+            _lkapi = None
+        _known_rooms.clear()
+
+
+app = FastAPI(title="LiveKit Demo Server", lifespan=lifespan)
 
 
 def _require_config():
@@ -38,11 +102,13 @@ def _require_config():
         )
 
 
-async def _ensure_room(room_name: str):
-    """Create the room if it does not already exist."""
+async def _create_room(room_name: str):
     try:
-        async with api.LiveKitAPI() as lkapi:
-            await lkapi.room.create_room(api.CreateRoomRequest(name=room_name))
+        if _lkapi:
+            await _lkapi.room.create_room(api.CreateRoomRequest(name=room_name))
+        else:
+            async with api.LiveKitAPI() as lkapi:
+                await lkapi.room.create_room(api.CreateRoomRequest(name=room_name))
     except Exception as exc:  # LiveKit throws if the room already exists
         msg = str(exc).lower()
         if "already exists" in msg or "exists" in msg:
@@ -50,6 +116,73 @@ async def _ensure_room(room_name: str):
         raise HTTPException(status_code=500, detail=f"Failed to create room: {exc}")
 
 
+def _on_room_created(room_name: str, task: asyncio.Task):
+    _pending_rooms.pop(room_name, None)
+    if ROOM_CACHE_TTL > 0 and not task.cancelled() and task.exception() is None:
+        _remember_room(room_name)
+
+
+def _remember_room(room_name: str):
+    now = time.monotonic()
+    if len(_known_rooms) >= ROOM_CACHE_MAX:
+        for name, expiry in list(_known_rooms.items()):
+            if expiry <= now:
+                del _known_rooms[name]
+    if len(_known_rooms) < ROOM_CACHE_MAX:
+        _known_rooms[room_name] = now + ROOM_CACHE_TTL
+
+
+async def _ensure_room(room_name: str):
+    """Create the room if it does not already exist."""
+    if ROOM_CACHE_TTL > 0 and _known_rooms.get(room_name, 0) > time.monotonic():
+        return
+
+    # Concurrent joins to the same new room share a single create_room call
+    task = _pending_rooms.get(room_name)
+    if task is None:
+        task = asyncio.create_task(_create_room(room_name))
+        _pending_rooms[room_name] = task
+        task.add_done_callback(lambda t: _on_room_created(room_name, t))
+
+    await asyncio.shield(task)
+
+
+@functools.lru_cache(maxsize=1024)
+def _claims_template(room_name: str) -> dict:
+    """JWT claims shared by every participant of a room (grants only, no identity)."""
+    grants = api.VideoGrants(
+        room_join=True,
+        room=room_name,
+        can_publish=True,
+        can_subscribe=True,
+        can_publish_data=True,
+    )
+    token = api.AccessToken(LIVEKIT_API_KEY, LIVEKIT_API_SECRET).with_grants(grants)
+    return token.claims.asdict()
+
+
+def _mint_tokens(room_name: str, participants: list[tuple[str, str]]) -> list[str]:
+    """
+    Sign one token per (identity, name) pair.
+
+    Produces the same claims as ``AccessToken.with_identity().with_name().with_grants()``
+    but builds the grant dict and timestamps once per call instead of once per token.
+    """
+    template = _claims_template(room_name)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    nbf = calendar.timegm(now.utctimetuple())
+    exp = calendar.timegm((now + TOKEN_TTL).utctimetuple())
+
+    tokens = []
+    for identity, name in participants:
+        claims = dict(template)
+        if name:
+            claims["name"] = name
+        claims.update(sub=identity, iss=LIVEKIT_API_KEY, nbf=nbf, exp=exp)
+        tokens.append(jwt.encode(claims, LIVEKIT_API_SECRET, algorithm="HS256"))
+    return tokens
+
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
@@ -62,29 +195,53 @@ async def get_token(body: TokenRequest):
     if body.auto_create_room:
         await _ensure_room(body.room)
 
-    grants = api.VideoGrants(
-        room_join=True,
-        room=body.room,
-        can_publish=True,
-        can_subscribe=True,
-        can_publish_data=True,
-    )
-
-    token = (
-        api.AccessToken(LIVEKIT_API_KEY, LIVEKIT_API_SECRET)
-        .with_identity(body.identity)
-        .with_name(body.name or body.identity)
-        .with_grants(grants)
-    )
+    (token,) = _mint_tokens(body.room, [(body.identity, body.name or body.identity)])
 
     return {
-        "token": token.to_jwt(),
+        "token": token,
         "url": LIVEKIT_URL,
         "identity": body.identity,
         "room": body.room,
     }
 
 
+@app.post("/tokens")
+async def get_tokens(body: BatchTokenRequest):
+    """Mint tokens for many participants of one room in a single request."""
+    _require_config()
+
+    if body.identities is not None:
+        identities = body.identities
+    elif body.count is not None:
+        identities = [f"{body.identity_prefix}_{i}" for i in range(body.count)]
+    else:
+        raise HTTPException(status_code=422, detail="Either identities or count is required")
+
+    names = body.names or []
+    if len(names) > len(identities):
+        raise HTTPException(status_code=422, detail="More names than identities")
+    if len(set(identities)) != len(identities):
+        raise HTTPException(status_code=422, detail="Identities must be unique")
+
+    if body.auto_create_room:
+        await _ensure_room(body.room)
+
+    participants = [
+        (identity, names[i] if i < len(names) else identity)
+        for i, identity in enumerate(identities)
+    ]
+    tokens = _mint_tokens(body.room, participants)
+
+    return {
+        "url": LIVEKIT_URL,
+        "room": body.room,
+        "tokens": [
+            {"identity": identity, "token": token}
+            for identity, token in zip(identities, tokens)
+        ],
+    }
+
+
 @app.post("/rooms")
 async def create_room(body: RoomCreateRequest):
     _require_config()
@@ -94,4 +251,10 @@ async def create_room(body: RoomCreateRequest):
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", "8008"))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # Token signing is CPU-bound; WORKERS > 1 runs that many uvicorn processes on one
+    # port. Each process keeps its own LiveKitAPI client and room cache.
+    workers = int(os.getenv("WORKERS", "1"))
+    if workers > 1:
+        uvicorn.run("server:app", host="0.0.0.0", port=port, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port)
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from providers.audio_utils import (
+    WAVE_FORMAT_IEEE_FLOAT,
+    WAVE_FORMAT_PCM,
+    WavStreamParser,
+    float32_to_pcm16,
+)
+
+SAMPLE_RATE = 24000
+
+
+def _chunk(chunk_id: bytes, payload: bytes, size: int | None = None) -> bytes:
+    size = len(payload) if size is None else size
+    # chunk 数据按偶数字节对齐
+    return chunk_id + size.to_bytes(4, "little") + payload + b"\x00" * (len(payload) & 1)
+
+
+def _fmt(audio_format: int, bits: int, sample_rate: int = SAMPLE_RATE) -> bytes:
+    block_align = bits // 8
+    return _chunk(
+        b"fmt ",
+        audio_format.to_bytes(2, "little")
+        + (1).to_bytes(2, "little")
+        + sample_rate.to_bytes(4, "little")
+        + (sample_rate * block_align).to_bytes(4, "little")
+        + block_align.to_bytes(2, "little")
+        + bits.to_bytes(2, "little"),
+    )
+
+
+def _wav(*chunks: bytes) -> bytes:
+    return b"RIFF" + b"\xff\xff\xff\xff" + b"WAVE" + b"".join(chunks)
+
+
+def _feed(parser: WavStreamParser, data: bytes, sizes: list[int]) -> bytes:
+    """按循环使用的分片长度把 data 切开喂给解析器"""
+    out = bytearray()
+    pos = i = 0
+    while pos < len(data):
+        size = sizes[i % len(sizes)]
+        out += parser.feed(data[pos : pos + size])
+        pos += size
+        i += 1
+    out += parser.flush()
+    return bytes(out)
+
+
+def _parser() -> WavStreamParser:
+    return WavStreamParser(sample_rate=16000, num_channels=2)
+
+
+PCM = np.arange(-500, 500, dtype=np.int16).tobytes()
+
+
+@pytest.mark.parametrize("sizes", [[1], [3], [7, 1, 13], [len(PCM) + 100]])
+def test_pcm16_across_odd_chunk_boundaries(sizes: list[int]) -> None:
+    parser = _parser()
+    out = _feed(parser, _wav(_fmt(WAVE_FORMAT_PCM, 16), _chunk(b"data", PCM)), sizes)
+
+    assert out == PCM
+    assert parser.ready
+    assert parser.mime_type == "audio/pcm"
+    assert (parser.sample_rate, parser.num_channels) == (SAMPLE_RATE, 1)
+
+
+@pytest.mark.parametrize("sizes", [[1], [3], [5, 2]])
+def test_float32_across_odd_chunk_boundaries(sizes: list[int]) -> None:
+    samples = np.linspace(-1.0, 1.0, 301, dtype=np.float32).tobytes()
+    data = _wav(_fmt(WAVE_FORMAT_IEEE_FLOAT, 32), _chunk(b"data", samples))
+
+    assert _feed(_parser(), data, sizes) == float32_to_pcm16(samples)
+
+
+def test_list_chunks_are_skipped() -> None:
+    # 奇数长度的 LIST 块带一个对齐字节；data 之后的 LIST 块不属于音频
+    info = _chunk(b"LIST", b"INFOISFT\x05\x00\x00\x00Lavf\x00")
+    data = _wav(_fmt(WAVE_FORMAT_PCM, 16), info, _chunk(b"data", PCM), info)
+
+    for sizes in ([1], [4], [len(data)]):
+        assert _feed(_parser(), data, sizes) == PCM
+
+
+@pytest.mark.parametrize("size", [0, 0xFFFFFFFF])
+def test_unbounded_data_size_reads_to_end(size: int) -> None:
+    # 流式服务写头部时不知道总长度，data 长度为 0 时读到流结束
+    data = _wav(_fmt(WAVE_FORMAT_PCM, 16), _chunk(b"data", PCM, size=size))
+
+    assert _feed(_parser(), data, [5]) == PCM
+
+
+def test_non_wav_passthrough() -> None:
+    parser = WavStreamParser(
+        sample_rate=SAMPLE_RATE, num_channels=1, fallback_mime_type="audio/mpeg"
+    )
+    mp3 = b"ID3\x04" + bytes(100)
+
+    assert _feed(parser, mp3, [3]) == mp3
+    assert parser.mime_type == "audio/mpeg"
+
+
+def test_truncated_header_is_not_wav() -> None:
+    parser = _parser()
+
+    assert _feed(parser, b"RIFF\x00", [2]) == b"RIFF\x00"
+    assert parser.mime_type is None
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from providers import worker_state
+from providers.hedging import HedgePolicy
+
+
+@pytest.fixture
+def no_worker_state(monkeypatch: pytest.MonkeyPatch) -> None:
+    # 其他测试可能已在本进程调用 listen()
+    monkeypatch.delenv(worker_state.STATE_ADDR_ENV, raising=False)
+
+
+def test_token_bucket(no_worker_state: None) -> None:
+    # 选 2 的幂作预算，令牌数的累加没有舍入误差
+    policy = HedgePolicy(budget=0.25, max_tokens=4.0)
+
+    # 初始令牌 max_tokens * budget
+    assert policy.try_acquire()
+    assert not policy.try_acquire()
+
+    for _ in range(3):
+        policy.on_request()
+    assert not policy.try_acquire()
+    policy.on_request()
+    assert policy.try_acquire()
+
+    # 空闲期间积累的令牌不超过 max_tokens
+    for _ in range(100):
+        policy.on_request()
+    assert [policy.try_acquire() for _ in range(5)] == [True] * 4 + [False]
+
+
+def test_acquire_without_worker_uses_local_bucket(no_worker_state: None) -> None:
+    policy = HedgePolicy(budget=0.25, max_tokens=4.0, shared_key="http://primary.test")
+
+    async def _run() -> list[bool]:
+        return [await policy.acquire() for _ in range(2)]
+
+    assert asyncio.run(_run()) == [True, False]
+
+
+def test_worker_bucket_shared_between_policies() -> None:
+    worker_state.listen()
+    key = "http://shared-budget.test"
+    a = HedgePolicy(budget=0.25, max_tokens=8.0, shared_key=key)
+    b = HedgePolicy(budget=0.25, max_tokens=8.0, shared_key=key)
+
+    async def _run() -> list[bool]:
+        # worker 的令牌桶在第一次存入时以 max_tokens * budget 开始
+        a.on_request()
+        return [await a.acquire(), await b.acquire(), await a.acquire()]
+
+    # 2.25 个令牌由两个通话共用，而不是各自 2 个
+    assert asyncio.run(_run()) == [True, True, False]
+    # 各自本进程的令牌桶没有被消耗
+    assert b.try_acquire()
+
+
+def test_delay(no_worker_state: None) -> None:
+    policy = HedgePolicy(min_samples=20, initial_delay=2.0, min_delay=0.2, max_delay=1.0)
+    for _ in range(19):
+        policy.record(0.5)
+    assert policy.delay() == 2.0
+
+    policy.record(0.5)
+    assert policy.delay() == pytest.approx(0.5, rel=0.05)
+
+    # 阈值限制在 min_delay~max_delay 之间
+    for _ in range(100):
+        policy.record(5.0)
+    assert policy.delay() == 1.0
+    for _ in range(1000):
+        policy.record(0.01)
+    assert policy.delay() == 0.2
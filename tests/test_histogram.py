@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import math
+
+import pytest
+
+from providers.histogram import LogHistogram, WindowedHistogram
+
+# 8 桶/倍程时分位数的相对误差不超过半个桶宽
+MAX_RELATIVE_ERROR = 2 ** (0.5 / 8) - 1
+
+
+def test_percentiles_within_half_bucket() -> None:
+    hist = LogHistogram()
+    values = [i / 1000 for i in range(1, 1001)]
+    for value in values:
+        hist.record(value)
+
+    assert hist.count == 1000
+    assert hist.sum == pytest.approx(sum(values))
+    for q in (0.5, 0.95, 0.99):
+        exact = values[math.ceil(q * len(values)) - 1]
+        assert hist.percentile(q) == pytest.approx(exact, rel=MAX_RELATIVE_ERROR)
+    assert hist.percentile(1.0) == pytest.approx(1.0, rel=MAX_RELATIVE_ERROR)
+
+
+def test_percentile_clamped_to_observed_range() -> None:
+    hist = LogHistogram()
+    assert hist.percentile(0.5) == 0.0
+
+    hist.record(0.2)
+    # 只有一个样本时分位数就是该值，而不是桶的几何中点
+    assert hist.percentile(0.01) == 0.2
+    assert hist.percentile(0.99) == 0.2
+
+    # 负数与 NaN 被忽略，超出范围的值计入首尾两个桶
+    hist.record(-1.0)
+    hist.record(math.nan)
+    hist.record(1e6)
+    assert hist.count == 2
+    assert hist.max == 1e6
+    assert hist.percentile(1.0) == pytest.approx(1e3, rel=2 ** (1 / 8) - 1)
+
+
+def test_merge() -> None:
+    a, b = LogHistogram(), LogHistogram()
+    for _ in range(90):
+        a.record(0.1)
+    for _ in range(10):
+        b.record(1.0)
+    a.merge(b)
+
+    assert a.count == 100
+    assert a.min == 0.1 and a.max == 1.0
+    assert a.percentile(0.9) == pytest.approx(0.1, rel=MAX_RELATIVE_ERROR)
+    assert a.percentile(0.91) == pytest.approx(1.0, rel=MAX_RELATIVE_ERROR)
+
+    with pytest.raises(ValueError):
+        a.merge(LogHistogram(buckets_per_octave=4))
+
+
+def test_windowed_histogram_drops_old_samples() -> None:
+    hist = WindowedHistogram(window=10)
+    for _ in range(10):
+        hist.record(1.0)
+    for _ in range(5):
+        hist.record(2.0)
+    # 上一个窗口与当前窗口合并查询
+    snapshot = hist.snapshot()
+    assert snapshot.count == 15
+    assert snapshot.min == 1.0
+
+    for _ in range(5):
+        hist.record(2.0)
+    for _ in range(3):
+        hist.record(3.0)
+    # 当前窗口满 10 个后轮换，全部为 1.0 的窗口被丢弃
+    snapshot = hist.snapshot()
+    assert snapshot.count == 13
+    assert snapshot.min == 2.0
+    assert snapshot.max == 3.0
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import pytest
+
+from providers.sentence_stream import SentenceSplitter
+
+MIXED = (
+    "你好，我是小助手。How are you? The price is 3.14 dollars. "
+    "他说：“今天天气很好。”然后我们出发了！OK"
+)
+
+
+def _split(text: str, step: int) -> list[str]:
+    splitter = SentenceSplitter()
+    sentences = []
+    for i in range(0, len(text), step):
+        sentences += splitter.push(text[i : i + step])
+    return sentences + splitter.flush()
+
+
+@pytest.mark.parametrize("step", [1, 2, 3, len(MIXED)])
+def test_mixed_chinese_english(step: int) -> None:
+    # 结果与 LLM 输出的 token 边界无关
+    assert _split(MIXED, step) == [
+        "你好，我是小助手。",
+        "How are you?",
+        "The price is 3.14 dollars.",
+        "他说：“今天天气很好。”",
+        "然后我们出发了！",
+        "OK",
+    ]
+
+
+def test_first_clause_and_short_sentences() -> None:
+    text = "好的，我来帮你查一下今天北京的天气，稍等，马上就好。好。对。我明白了。"
+
+    # 第一段在够长的逗号处尽早输出，之后的逗号不切；过短的句子与下一句合并
+    assert _split(text, 1) == [
+        "好的，我来帮你查一下今天北京的天气，",
+        "稍等，马上就好。",
+        "好。对。",
+        "我明白了。",
+    ]
+
+
+def test_waits_for_closing_punctuation() -> None:
+    splitter = SentenceSplitter()
+
+    assert splitter.push("他说：“走吧。") == []
+    assert splitter.push("”好") == ["他说：“走吧。”"]
+    assert splitter.push("的 v1.") == []
+    assert splitter.push("2 版本") == []
+    assert splitter.flush() == ["好的 v1.2 版本"]
+
+
+def test_flush_starts_new_reply() -> None:
+    splitter = SentenceSplitter()
+    assert splitter.push("我来帮你查一下，") == ["我来帮你查一下，"]
+    assert splitter.push("请稍等。") == []
+    assert splitter.flush() == ["请稍等。"]
+
+    # 新一段回复的第一段重新按 first_clause_len 尽早输出
+    assert splitter.push("没问题，马上为您处理，请稍等") == ["没问题，马上为您处理，"]
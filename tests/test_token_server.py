@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+from server import server
+
+API_KEY = "devkey"
+API_SECRET = "secret-for-tests-only-0123456789"
+
+
+@pytest.fixture
+def client(monkeypatch: pytest.MonkeyPatch) -> TestClient:
+    monkeypatch.setattr(server, "LIVEKIT_URL", "ws://localhost:7880")
+    monkeypatch.setattr(server, "LIVEKIT_API_KEY", API_KEY)
+    monkeypatch.setattr(server, "LIVEKIT_API_SECRET", API_SECRET)
+    server._claims_template.cache_clear()
+    # 不进入 lifespan，不创建 LiveKitAPI 客户端；auto_create_room=False 不访问 LiveKit
+    return TestClient(server.app)
+
+
+def _decode(token: str) -> dict:
+    return jwt.decode(token, API_SECRET, algorithms=["HS256"])
+
+
+def test_tokens_match_identities_and_names(client: TestClient) -> None:
+    response = client.post(
+        "/tokens",
+        json={
+            "room": "r1",
+            "identities": ["a", "b", "c"],
+            "names": ["Alice", "Bob"],
+            "auto_create_room": False,
+        },
+    )
+    assert response.status_code == 200
+    tokens = response.json()["tokens"]
+    assert [t["identity"] for t in tokens] == ["a", "b", "c"]
+
+    claims = [_decode(t["token"]) for t in tokens]
+    assert [c["sub"] for c in claims] == ["a", "b", "c"]
+    # 名字少于身份时，其余参与者以身份作为名字
+    assert [c["name"] for c in claims] == ["Alice", "Bob", "c"]
+    assert all(c["video"]["room"] == "r1" and c["video"]["roomJoin"] for c in claims)
+
+
+def test_tokens_rejects_more_names_than_identities(client: TestClient) -> None:
+    response = client.post(
+        "/tokens",
+        json={
+            "room": "r1",
+            "identities": ["a"],
+            "names": ["Alice", "Bob"],
+            "auto_create_room": False,
+        },
+    )
+    assert response.status_code == 422
+
+
+def test_tokens_rejects_empty_and_duplicate_identities(client: TestClient) -> None:
+    for identities in (["a", ""], ["a", "a"]):
+        response = client.post(
+            "/tokens",
+            json={"room": "r1", "identities": identities, "auto_create_room": False},
+        )
+        assert response.status_code == 422, identities
+
+
+def test_token_rejects_empty_identity(client: TestClient) -> None:
+    response = client.post(
+        "/token", json={"room": "r1", "identity": "", "auto_create_room": False}
+    )
+    assert response.status_code == 422
+
+
+def test_generated_identities(client: TestClient) -> None:
+    response = client.post(
+        "/tokens",
+        json={
+            "room": "r1",
+            "count": 3,
+            "identity_prefix": "bot",
+            "auto_create_room": False,
+        },
+    )
+    assert response.status_code == 200
+    identities = [t["identity"] for t in response.json()["tokens"]]
+    assert identities == ["bot_0", "bot_1", "bot_2"]
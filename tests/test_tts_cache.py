@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from pathlib import Path
+
+from providers.tts_cache import SynthesisCache, _CacheEntry
+
+
+def _entry(size: int) -> _CacheEntry:
+    return _CacheEntry(bytes(size), 24000, 1)
+
+
+def test_memory_lru_eviction() -> None:
+    cache = SynthesisCache(max_memory_bytes=300)
+    cache.put("a", _entry(100))
+    cache.put("b", _entry(100))
+    cache.put("c", _entry(100))
+    # 读取 a 后它成为最近使用，超出容量时先淘汰 b
+    assert cache.get("a") is not None
+    cache.put("d", _entry(100))
+
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in ("a", "c", "d"))
+    assert cache.stats.memory_evictions == 1
+    assert cache.stats.memory_bytes == 300
+    assert cache.stats.memory_hits == 4
+
+    # 超过整个内存层的条目不缓存，也不挤掉已有条目
+    cache.put("huge", _entry(400))
+    assert cache.get("huge") is None
+    assert cache.stats.memory_bytes == 300
+
+
+def test_disk_lru_eviction(tmp_path: Path) -> None:
+    async def _run() -> SynthesisCache:
+        cache = SynthesisCache(max_memory_bytes=0, disk_dir=tmp_path, max_disk_bytes=300)
+        for key in ("a", "b", "c"):
+            await cache.put_disk(key, _entry(100))
+        assert await cache.get_disk("a") is not None
+        await cache.put_disk("d", _entry(100))
+        return cache
+
+    cache = asyncio.run(_run())
+
+    assert "b" not in cache
+    assert sorted(p.name.split("_")[0] for p in tmp_path.glob("*.pcm")) == ["a", "c", "d"]
+    assert cache.stats.disk_evictions == 1
+    assert cache.stats.disk_bytes == 300
+    assert cache.stats.disk_hits == 1
+
+
+def test_disk_order_restored_from_mtime(tmp_path: Path) -> None:
+    for i, key in enumerate(("c", "a", "b")):
+        path = tmp_path / f"{key}_24000_1.pcm"
+        path.write_bytes(bytes(100))
+        os.utime(path, (1000 + i, 1000 + i))
+
+    # 新进程扫描已有条目，按 mtime 淘汰最旧的 c
+    cache = SynthesisCache(disk_dir=tmp_path, max_disk_bytes=200)
+
+    assert "c" not in cache and "a" in cache and "b" in cache
+    assert not (tmp_path / "c_24000_1.pcm").exists()
+    assert cache.stats.disk_bytes == 200
+
+
+def test_disk_entry_removed_by_other_process(tmp_path: Path) -> None:
+    async def _run() -> tuple[SynthesisCache, _CacheEntry | None]:
+        cache = SynthesisCache(max_memory_bytes=0, disk_dir=tmp_path)
+        await cache.put_disk("a", _entry(100))
+        for path in tmp_path.glob("*.pcm"):
+            path.unlink()
+        return cache, await cache.get_disk("a")
+
+    cache, entry = asyncio.run(_run())
+
+    assert entry is None
+    assert "a" not in cache
+    assert cache.stats.disk_bytes == 0
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import pytest
+from livekit.agents import APIConnectionError, tts
+
+from providers import worker_state
+from providers.tts_failover import FailoverTTS, _Backend
+
+THRESHOLD = 3
+OPEN_DURATION = 10.0
+
+
+class _SilentTTS(tts.TTS):
+    def __init__(self, label: str) -> None:
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=False), sample_rate=24000, num_channels=1
+        )
+        self._label = label
+
+    @property
+    def label(self) -> str:
+        return self._label
+
+    def synthesize(self, text: str, *, conn_options=None) -> tts.ChunkedStream:
+        raise NotImplementedError
+
+
+@pytest.fixture(autouse=True)
+def _no_worker_state(monkeypatch: pytest.MonkeyPatch) -> None:
+    # 其他测试可能已在本进程调用 listen()，这里只测试单个进程内的熔断器
+    monkeypatch.delenv(worker_state.STATE_ADDR_ENV, raising=False)
+
+
+def _fail(backend: _Backend, now: float) -> bool:
+    return backend.record_failure(
+        now, failure_threshold=THRESHOLD, open_duration=OPEN_DURATION
+    )
+
+
+def test_breaker_transitions() -> None:
+    backend = _Backend(_SilentTTS("a"), alpha=0.2)
+    assert backend.state(0.0) == "closed"
+
+    # 连续失败达到阈值才打开
+    assert not _fail(backend, 1.0)
+    assert not _fail(backend, 2.0)
+    assert backend.state(2.0) == "closed"
+    assert _fail(backend, 3.0)
+    assert backend.state(3.0 + OPEN_DURATION - 0.1) == "open"
+    assert backend.state(3.0 + OPEN_DURATION) == "half_open"
+
+    # 半开时试探失败立即重新打开，时长翻倍
+    assert _fail(backend, 20.0)
+    assert backend.state(20.0 + 2 * OPEN_DURATION - 0.1) == "open"
+    assert backend.state(20.0 + 2 * OPEN_DURATION) == "half_open"
+
+    # 试探成功后关闭，退避与连续失败次数一并清零
+    backend.record_success(0.3)
+    assert backend.state(100.0) == "closed"
+    assert not _fail(backend, 100.0)
+    assert not _fail(backend, 101.0)
+    assert _fail(backend, 102.0)
+    assert backend.state(102.0 + OPEN_DURATION - 0.1) == "open"
+    assert backend.state(102.0 + OPEN_DURATION) == "half_open"
+    assert (backend.requests, backend.failures) == (8, 7)
+
+
+def test_open_duration_backoff_is_capped() -> None:
+    backend = _Backend(_SilentTTS("a"), alpha=0.2)
+    now = 0.0
+    for _ in range(THRESHOLD - 1):
+        _fail(backend, now)
+    for _ in range(8):
+        assert _fail(backend, now)
+        duration = backend.open_until - now
+        now = backend.open_until
+
+    assert duration == OPEN_DURATION * 2**4
+
+
+def test_open_backend_ranked_last() -> None:
+    failover = FailoverTTS(
+        [_SilentTTS("primary"), _SilentTTS("secondary")],
+        failure_threshold=THRESHOLD,
+        open_duration=OPEN_DURATION,
+    )
+    primary, secondary = failover._backends
+    primary.record_success(0.1)
+    secondary.record_success(0.5)
+    assert failover._ranked() == [primary, secondary]
+
+    for _ in range(THRESHOLD):
+        failover._record_failure(primary, APIConnectionError())
+
+    assert [s.state for s in failover.status()] == ["open", "closed"]
+    assert failover._ranked() == [secondary, primary]
+    assert failover.status()[0].failures == THRESHOLD
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing as mp
+import time
+from types import SimpleNamespace
+
+from livekit.agents import JobContext, JobProcess
+from livekit.agents.ipc.job_proc_executor import ProcJobExecutor
+from livekit.agents.job import JobAcceptArguments, RunningJobInfo
+from livekit.protocol import agent, models
+
+from providers import worker_load
+from providers.worker_load import WorkerLoad, monitor_event_loop
+
+BLOCK_SECONDS = 0.3
+
+
+def _prewarm(proc: JobProcess) -> None:
+    pass
+
+
+async def _blocking_entrypoint(ctx: JobContext) -> None:
+    # 一个进行中的 TTS 请求，外加周期性阻塞事件循环的同步调用
+    worker_load.request_started("tts")
+    asyncio.create_task(monitor_event_loop())
+    while True:
+        time.sleep(BLOCK_SECONDS)
+        await asyncio.sleep(0.01)
+
+
+def _fake_job() -> RunningJobInfo:
+    return RunningJobInfo(
+        worker_id="test-worker",
+        accept_arguments=JobAcceptArguments(identity="agent", name="", metadata=""),
+        job=agent.Job(
+            id="fake-job-load",
+            room=models.Room(sid="FAKE_RM_load", name="load"),
+            type=agent.JobType.JT_ROOM,
+        ),
+        url="ws://localhost:7880",
+        token="",
+        fake_job=True,
+    )
+
+
+def test_process_job_lag_reaches_load_fnc() -> None:
+    load = WorkerLoad(max_sessions=10)
+    idle = None
+
+    async def _run() -> None:
+        nonlocal idle
+        executor = ProcJobExecutor(
+            initialize_process_fnc=_prewarm,
+            job_entrypoint_fnc=_blocking_entrypoint,
+            session_end_fnc=None,
+            inference_executor=None,
+            initialize_timeout=30.0,
+            close_timeout=2.0,
+            memory_warn_mb=0,
+            memory_limit_mb=0,
+            ping_interval=2.5,
+            ping_timeout=60.0,
+            high_ping_threshold=0.5,
+            http_proxy=None,
+            mp_ctx=mp.get_context("forkserver"),
+            loop=asyncio.get_running_loop(),
+        )
+        await executor.start()
+        try:
+            await executor.initialize()
+            await executor.launch_job(_fake_job())
+            worker = SimpleNamespace(active_jobs=[executor.running_job])
+
+            deadline = time.monotonic() + 20.0
+            while time.monotonic() < deadline:
+                load(worker)
+                if load.last.loop_lag > BLOCK_SECONDS / 3 and load.last.inflight:
+                    idle = worker_load.idle_seconds()
+                    break
+                await asyncio.sleep(0.2)
+        finally:
+            await executor.aclose()
+
+    asyncio.run(_run())
+
+    # 延迟与请求只发生在 job 进程中，主进程能看到说明上报生效
+    assert worker_load.loop_lag() == 0.0
+    assert load.last.loop_lag > BLOCK_SECONDS / 3
+    assert load.last.inflight == 1
+    # job 进程中的请求同样计入主进程的空闲判断（KeepWarm 据此暂停）
+    assert idle == 0.0
+    assert load.last.load >= min(load.last.loop_lag / worker_load.DEFAULT_MAX_LOOP_LAG, 1.0)
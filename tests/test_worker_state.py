@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing as mp
+
+from livekit.agents import APIConnectionError, tts
+
+from providers import adaptive_timeout, worker_state
+from providers.tts_failover import FailoverTTS
+
+BACKEND = "http://fake-tts.test"
+CEILING = 30.0
+
+
+def _record_samples(count: int) -> None:
+    latency = adaptive_timeout.tracker(BACKEND, "ttfb")
+    for _ in range(count):
+        latency.record(0.1)
+
+
+def _timeout() -> float:
+    return adaptive_timeout.tracker(BACKEND, "ttfb").timeout(ceiling=CEILING)
+
+
+def _in_new_process(fn, *args):
+    # 每次都是新进程，模拟默认执行器中每个通话一个 job 进程
+    with mp.get_context("spawn").Pool(1) as pool:
+        return pool.apply(fn, args)
+
+
+def test_latency_history_outlives_job_process() -> None:
+    worker_state.listen()
+
+    # 单个进程不到 min_samples 时一直使用上限
+    assert _in_new_process(_timeout) == CEILING
+    _in_new_process(_record_samples, 10)
+    _in_new_process(_record_samples, 10)
+
+    # 两个已退出进程的样本合计达到 min_samples，新进程直接使用自适应超时
+    assert _in_new_process(_timeout) < CEILING
+    assert len(worker_state.history("latency", f"{BACKEND} ttfb")) == 20
+
+
+def test_claim_is_exclusive_until_ttl() -> None:
+    worker_state.listen()
+
+    async def _run() -> list[bool]:
+        return await asyncio.gather(*(worker_state.claim("probe x", 60.0) for _ in range(5)))
+
+    assert sorted(asyncio.run(_run())) == [False] * 4 + [True]
+
+
+class _SilentTTS(tts.TTS):
+    def __init__(self, label: str) -> None:
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=False), sample_rate=24000, num_channels=1
+        )
+        self._label = label
+
+    @property
+    def label(self) -> str:
+        return self._label
+
+    def synthesize(self, text: str, *, conn_options=None) -> tts.ChunkedStream:
+        raise NotImplementedError
+
+
+def _fail_backend(label: str, failures: int) -> None:
+    failover = FailoverTTS([_SilentTTS(label), _SilentTTS("other")])
+    for _ in range(failures):
+        failover._record_failure(failover._backends[0], APIConnectionError())
+
+
+def _backend_state(label: str) -> str:
+    return FailoverTTS([_SilentTTS(label), _SilentTTS("other")]).status()[0].state
+
+
+def test_failover_health_outlives_job_process() -> None:
+    worker_state.listen()
+
+    # 两个通话各失败 2 次，合计达到 failure_threshold=3，熔断器在 worker 级别打开
+    _in_new_process(_fail_backend, "flaky", 2)
+    _in_new_process(_fail_backend, "flaky", 2)
+    assert _in_new_process(_backend_state, "flaky") == "open"
+    assert _in_new_process(_backend_state, "healthy") == "closed"